@@ -1,14 +1,39 @@
 import cv2
 import numpy as np
 
-def align_using_features(copy_img, template_img):
-    img1 = cv2.cvtColor(template_img, cv2.COLOR_BGR2GRAY)
-    img2 = cv2.cvtColor(copy_img, cv2.COLOR_BGR2GRAY)
-
-    sift = cv2.SIFT_create()
-
-    kp1, des1 = sift.detectAndCompute(img1, None)
-    kp2, des2 = sift.detectAndCompute(img2, None)
+# rectangles (y0, y1, x0, x1) des blocs dans le repère du template
+NAME_BLOCK = (140, 1357, 240, 1550)  #  SURNAME + FIRST NAME
+QUESTION_BLOCK = (1357, 2280, 190, 1590)  # Q1 à Q200
+
+
+def to_gray(img):
+    """
+    Grayscale version of an image, the image itself (no copy) when it is already gray
+    """
+    return img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def sift_features(gray):
+    """
+    SIFT keypoint coordinates (N, 2) and descriptors of a grayscale image
+    """
+    keypoints, descriptors = cv2.SIFT_create().detectAndCompute(gray, None)
+    points = np.float32([k.pt for k in keypoints]).reshape(-1, 2)
+    return points, descriptors
+
+
+def estimate_homography(copy_img, template_img=None, template_features=None):
+    """
+    Homography mapping the copy onto the template, or None if it cannot be estimated
+    :param template_features: precomputed sift_features of the template (see templates.py)
+    """
+    if template_features is None:
+        template_features = sift_features(to_gray(template_img))
+    pts1, des1 = template_features
+    pts2, des2 = sift_features(to_gray(copy_img))
+    if des1 is None or des2 is None or len(des2) < 2:
+        print(" Pas assez de points caractéristiques sur la copie")
+        return None
 
     index_params = dict(algorithm=1, trees=5)
     search_params = dict(checks=50)
@@ -17,21 +42,27 @@ def align_using_features(copy_img, template_img):
     matches = flann.knnMatch(des1, des2, k=2)
 
     good = []
-    for m, n in matches:
-        if m.distance < 0.7 * n.distance:
-            good.append(m)
+    for pair in matches:
+        if len(pair) == 2 and pair[0].distance < 0.7 * pair[1].distance:
+            good.append(pair[0])
 
     if len(good) < 10:
         print(" Pas assez de bons points pour estimer l'homographie")
-        return copy_img, False
+        return None
 
-    src_pts = np.float32([kp1[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
-    dst_pts = np.float32([kp2[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+    src_pts = pts1[[m.queryIdx for m in good]].reshape(-1, 1, 2)
+    dst_pts = pts2[[m.trainIdx for m in good]].reshape(-1, 1, 2)
 
     M, mask = cv2.findHomography(dst_pts, src_pts, cv2.RANSAC, 5.0)
 
     if M is None:
         print(" Homographie échouée")
+    return M
+
+
+def align_using_features(copy_img, template_img, template_features=None):
+    M = estimate_homography(copy_img, template_img, template_features)
+    if M is None:
         return copy_img, False
 
     h, w = template_img.shape[:2]
@@ -40,9 +71,48 @@ def align_using_features(copy_img, template_img):
     return aligned, True
 
 
-
-def extract_blocks(aligned_img):
-    block_name = aligned_img[140:1357, 240:1550]  #  SURNAME + FIRST NAME
-    block_questions = aligned_img[1357:2280, 190:1590]  # Q1 à Q200
+def block_homography(M, block):
+    """
+    Homography mapping the copy straight onto one block: M followed by the
+    translation bringing the block origin to (0, 0)
+    :return: the composed homography and the block size (w, h)
+    """
+    y0, y1, x0, x1 = block
+    T = np.array([[1, 0, -x0], [0, 1, -y0], [0, 0, 1]], dtype=np.float64)
+    return T @ M, (x1 - x0, y1 - y0)
+
+
+def align_blocks(copy_img, template_img, template_features=None,
+                 name_block=NAME_BLOCK, question_block=QUESTION_BLOCK, full_page=False):
+    """
+    Name and question blocks of a copy aligned on the template. Only the two
+    blocks are warped (the margins are never computed), unless the full aligned
+    page is requested, in which case it is warped once and the blocks are views of it.
+    If the homography cannot be estimated, nothing is returned but ok=False.
+    :param full_page: also return the whole aligned page
+    :return: (name block, question block, aligned page or None, ok)
+    """
+    M = estimate_homography(copy_img, template_img, template_features)
+    if M is None:
+        return None, None, None, False
+
+    if full_page:
+        h, w = template_img.shape[:2]
+        aligned = cv2.warpPerspective(copy_img, M, (w, h))
+        block_name, block_questions = extract_blocks(aligned, name_block, question_block)
+        return block_name, block_questions, aligned, True
+
+    block_name = cv2.warpPerspective(copy_img, *block_homography(M, name_block))
+    block_questions = cv2.warpPerspective(copy_img, *block_homography(M, question_block))
+    return block_name, block_questions, None, True
+
+
+def extract_blocks(aligned_img, name_block=NAME_BLOCK, question_block=QUESTION_BLOCK):
+    """
+    Name and question blocks of an aligned page, as views (no copy)
+    """
+    y0, y1, x0, x1 = name_block
+    block_name = aligned_img[y0:y1, x0:x1]
+    y0, y1, x0, x1 = question_block
+    block_questions = aligned_img[y0:y1, x0:x1]
     return block_name, block_questions
-
@@ -0,0 +1,159 @@
+# benchmark.py
+"""
+Runs synthetic sheets (see synthetic_sheets.py) through the real grading pipeline
+and writes throughput, per-stage latency, peak RSS and accuracy to a JSON file.
+
+Usage : python benchmark.py SHEETS_DIR [--output bench_results.json] [--workers 4] [--limit N]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os.path import join, splitext
+
+import numpy as np
+
+from constants import TEMPLATES_DIR
+from circle_classifier import get_model_meta, model_path
+from image_worker import ImageProcessingWorker
+from profiling import aggregate_profiles
+from templates import default_registry
+
+
+def peak_rss_mb():
+    """Peak resident memory of the process, in MB"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ko sous Linux, octets sous macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+
+def load_ground_truth(sheets_dir, limit=None):
+    records = []
+    with open(join(sheets_dir, "ground_truth.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+    return records[:limit] if limit else records
+
+
+def grade_sheet(record, sheets_dir, project_path, template):
+    """
+    Grade one synthetic sheet and compare it with its ground truth
+    """
+    # un sous-dossier par feuille : les dossiers copy_N ne peuvent pas se mélanger
+    sheet_dir = join(project_path, splitext(record["file"])[0])
+    os.makedirs(sheet_dir, exist_ok=True)
+    path = join(sheet_dir, record["file"])
+    shutil.copy(join(sheets_dir, record["file"]), path)
+
+    worker = ImageProcessingWorker(path, template, project_path)
+    start = time.perf_counter()
+    result = worker.process()
+    elapsed = time.perf_counter() - start
+
+    with open(join(result["copy_dir"], "meta.json"), "r") as f:
+        meta = json.load(f)
+
+    pred = np.array(result["filled"], dtype=bool)
+    truth = np.array(record["filled"], dtype=bool)
+    if pred.shape != truth.shape:
+        bubbles_ok, questions_ok = 0, 0
+    else:
+        bubbles_ok = int((pred == truth).sum())
+        questions_ok = int((pred.reshape(-1, 4) == truth.reshape(-1, 4)).all(axis=1).sum())
+
+    return {
+        "file": record["file"],
+        "seconds": elapsed,
+        "timings": result.get("timings", {}),
+        "bubbles_ok": bubbles_ok,
+        "bubbles_total": int(truth.size),
+        "questions_ok": questions_ok,
+        "questions_total": int(truth.size // 4),
+        "name_ok": meta.get("nom", "") == record["name"],
+        "doubtful": len(result.get("douteux") or {}),
+        "cascade": result.get("cascade", {}),
+    }
+
+
+def run_benchmark(sheets_dir, output, workers=1, limit=None, keep=False):
+    records = load_ground_truth(sheets_dir, limit)
+    template = default_registry()
+    if not len(template):
+        raise FileNotFoundError(f"Aucun modèle de feuille dans {TEMPLATES_DIR}")
+
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    project_path = join(work_dir, "bench_project")
+    os.makedirs(project_path)
+    shutil.copy(join(sheets_dir, "answer_key.csv"), join(project_path, "toeic_correction.csv"))
+
+    results, failures = [], []
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(grade_sheet, r, sheets_dir, project_path, template): r for r in records}
+        for future, record in futures.items():
+            try:
+                results.append(future.result())
+            except Exception as e:
+                failures.append({"file": record["file"], "error": str(e)})
+    elapsed = time.perf_counter() - start
+
+    bubbles_total = sum(r["bubbles_total"] for r in results) or 1
+    questions_total = sum(r["questions_total"] for r in results) or 1
+    patches = sum(r["cascade"].get("patches", 0) for r in results)
+    resolved = sum(r["cascade"].get("resolved", 0) for r in results)
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            "sheets_dir": os.path.abspath(sheets_dir),
+            "sheets": len(records),
+            "workers": workers,
+            "model": os.path.basename(model_path),
+            "cascade": get_model_meta()["cascade"],
+        },
+        "pages_per_second": round(len(results) / elapsed, 3) if elapsed else 0.0,
+        "seconds_per_page_p50": round(float(np.median([r["seconds"] for r in results])), 4) if results else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "bubble_accuracy": round(sum(r["bubbles_ok"] for r in results) / bubbles_total, 5),
+        "question_accuracy": round(sum(r["questions_ok"] for r in results) / questions_total, 5),
+        "name_accuracy": round(sum(r["name_ok"] for r in results) / len(results), 5) if results else None,
+        "doubtful_copies": sum(1 for r in results if r["doubtful"]),
+        "cascade_resolved_fraction": round(resolved / patches, 5) if patches else None,
+        "stage_latency": aggregate_profiles([r["timings"] for r in results]),
+        "failures": failures,
+    }
+
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    if not keep:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"[BENCH] {len(results)} pages en {elapsed:.1f}s → {report['pages_per_second']} pages/s, "
+          f"RSS max {report['peak_rss_mb']} Mo")
+    print(f"[BENCH] précision cases {report['bubble_accuracy']:.4f}, questions {report['question_accuracy']:.4f}, "
+          f"noms {report['name_accuracy']}")
+    print(f"[BENCH] cases tranchées par la cascade : {report['cascade_resolved_fraction']}")
+    print(f"[BENCH] résultats écrits dans {output}")
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline de correction sur des copies synthétiques")
+    parser.add_argument("sheets_dir")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--keep", action="store_true", help="conserver le projet temporaire")
+    args = parser.parse_args()
+    run_benchmark(args.sheets_dir, args.output, args.workers, args.limit, args.keep)
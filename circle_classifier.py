@@ -0,0 +1,182 @@
+# circle_classifier.py
+import json
+import sys
+import threading
+from os.path import abspath, dirname, exists, join, splitext
+
+import numpy as np
+
+from patch_features import compute_features, extract_patches, inner_disk_stats
+
+MODEL_FILE = "circle_patch_classifier.joblib"
+
+
+def resource_path(relative_path: str) -> str:
+    """Retourne le chemin absolu vers une ressource embarquée
+    compatible dev (fichiers à côté du code) et PyInstaller (--onefile or folder)."""
+    if getattr(sys, 'frozen', False):
+        # quand PyInstaller gèle (--onefile et --onedir)
+        base = getattr(sys, '_MEIPASS', dirname(sys.executable))
+    else:
+        base = abspath(dirname(__file__))
+    return join(base, relative_path)
+
+
+model_path = resource_path(MODEL_FILE)
+
+DEFAULT_META = {
+    "version": 1,
+    "features": "raw",
+    # seuils sur la part de pixels sombres du disque intérieur ; null tant que non calibrés
+    "cascade": {
+        "feature": "dark_ratio",
+        "empty_max": None,
+        "filled_min": None,
+        "agreement": None,
+        "coverage": None,
+    },
+}
+
+_model = None
+_meta = None
+_lock = threading.Lock()
+
+
+def meta_path_for(path=model_path):
+    """Sidecar JSON stored next to the joblib file"""
+    return splitext(path)[0] + ".json"
+
+
+def load_model_meta(path=model_path):
+    meta = json.loads(json.dumps(DEFAULT_META))
+    sidecar = meta_path_for(path)
+    if exists(sidecar):
+        try:
+            with open(sidecar, "r") as f:
+                data = json.load(f)
+            meta.update({k: v for k, v in data.items() if k != "cascade"})
+            meta["cascade"].update(data.get("cascade", {}))
+        except Exception as e:
+            print(f"[WARN] Métadonnées du modèle illisibles ({sidecar}) : {e}")
+    return meta
+
+
+def save_model_meta(meta, path=model_path):
+    with open(meta_path_for(path), "w") as f:
+        json.dump(meta, f, indent=2)
+
+
+class ThresholdClassifier:
+    """
+    One-feature model: filled when the feature (a column of the feature matrix)
+    is at or above the threshold chosen on the training set
+    """
+
+    def __init__(self, column=-1):
+        self.column = column
+        self.threshold = None
+        self.classes_ = np.array([0, 1])
+
+    def fit(self, X, y):
+        values = np.asarray(X, dtype=float)[:, self.column]
+        y = np.asarray(y).astype(bool)
+        order = np.argsort(values, kind="stable")
+        v, lab = values[order], y[order]
+        # erreurs si le seuil est placé avant l'élément i : remplis à gauche + vides à droite
+        errors = np.concatenate([[0], np.cumsum(lab)]) + (np.sum(~lab) - np.concatenate([[0], np.cumsum(~lab)]))
+        best = int(np.argmin(errors))
+        self.threshold = float(v[best]) if best < len(v) else float(v[-1]) + 1e-9
+        return self
+
+    def predict_proba(self, X):
+        filled = (np.asarray(X, dtype=float)[:, self.column] >= self.threshold).astype(float)
+        return np.column_stack([1 - filled, filled])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
+def get_model():
+    """
+    The RandomForest, loaded on first use only (and once for all workers)
+    """
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                from joblib import load
+                _model = load(model_path)
+    return _model
+
+
+def get_model_meta():
+    global _meta
+    if _meta is None:
+        _meta = load_model_meta()
+    return _meta
+
+
+def cascade_decisions(patches, cascade):
+    """
+    Patches the intensity cascade can decide alone
+    :return: (empty, filled) boolean masks
+    """
+    empty = np.zeros(len(patches), dtype=bool)
+    filled = np.zeros(len(patches), dtype=bool)
+    if cascade.get("empty_max") is None and cascade.get("filled_min") is None:
+        return empty, filled
+    _, dark = inner_disk_stats(patches)
+    if cascade.get("empty_max") is not None:
+        empty = dark <= cascade["empty_max"]
+    if cascade.get("filled_min") is not None:
+        filled = (dark >= cascade["filled_min"]) & ~empty
+    return empty, filled
+
+
+def predict_patches(patches, valid, stats=None):
+    """
+    Probability of being filled for every patch. Obvious patches are decided by
+    the cascade (0 or 1), the others go through the model in a single batch.
+    :param patches: (N, 30, 30) array
+    :param valid: (N,) mask, invalid patches get 0
+    :param stats: optional dict {"patches", "resolved"} updated in place
+    """
+    probas = np.zeros(len(patches), dtype=float)
+    empty, filled = cascade_decisions(patches, get_model_meta()["cascade"])
+    probas[valid & filled] = 1.0
+    todo = valid & ~empty & ~filled
+    if todo.any():
+        features = compute_features(patches[todo], get_model_meta()["features"])
+        probas[todo] = get_model().predict_proba(features)[:, 1]
+
+    if stats is not None:
+        stats["patches"] = stats.get("patches", 0) + int(valid.sum())
+        stats["resolved"] = stats.get("resolved", 0) + int(valid.sum() - todo.sum())
+    return probas
+
+
+def filter_relative_winner(scores, margin=0.2, question_number=None, parent=None):
+    if len(scores) != 4:
+        raise ValueError("Chaque question doit avoir exactement 4 scores")
+
+    max_idx = int(np.argmax(scores))
+    max_val = scores[max_idx]
+    others = [s for i, s in enumerate(scores) if i != max_idx]
+
+    if all(max_val - o > margin for o in others):
+        return [i == max_idx for i in range(4)]
+
+    # si doute → on stocke
+    if parent is not None and question_number is not None:
+        parent.douteux[question_number] = scores
+    return [False] * 4
+
+
+def predict_centers(gray, centers, stats=None):
+    """
+    Probability of being filled of the bubble under every centre
+    """
+    if len(centers) == 0:
+        return np.zeros(0, dtype=float)
+    patches, valid = extract_patches(gray, centers)
+    return predict_patches(patches, valid, stats)
@@ -1,6 +1,9 @@
 import cv2
 import numpy as np
-from sklearn.cluster import DBSCAN, KMeans
+# sklearn.cluster est importé dans les fonctions : chargé à la première correction, pas au démarrage
+
+from alignment import to_gray
+from overlay import question_mask, render_overlay
 
 
 def detect_and_align_circles(img: np.ndarray,
@@ -16,7 +19,7 @@ def detect_and_align_circles(img: np.ndarray,
                              eps_y: int = 10,
                              min_samples: int = 3,
                              debug: bool = False) -> np.ndarray:
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    gray = to_gray(img)
     blurred = cv2.GaussianBlur(gray, blur_kernel, 0)
 
     circles = cv2.HoughCircles(
@@ -38,7 +41,7 @@ def detect_and_align_circles(img: np.ndarray,
     grid = [(int(x), int(y)) for y in row_y for x in col_x]
 
     if debug:
-        vis = img.copy()
+        vis = cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
         for x, y in grid:
             cv2.circle(vis, (x, y), 10, (0, 255, 0), 2)
         cv2.imwrite("outputs/debug_aligned_circles.jpg", vis)
@@ -47,28 +50,11 @@ def detect_and_align_circles(img: np.ndarray,
 
 
 def trace_circles(img, centers, filled, output_path, douteux_centers=None, modified_questions=None, hide_douteux=False):
-    douteux_centers = douteux_centers or []
-    modified_questions = modified_questions or set()
-    output = img.copy()
-
-    for i, (x, y) in enumerate(centers):
-        try:
-            x, y = int(x), int(y)
-            q_num = (i // 4) + 1
-            pt = (x, y)
-
-            #  Cercle douteux toujours tracé en jaune
-            if pt in douteux_centers and not hide_douteux:
-                cv2.circle(output, pt, 12, (0, 255, 255), 2)  # jaune
-
-            #  Cercle marqué comme rempli → vert ou bleu
-            if filled[i]:
-                color = (255, 0, 0) if q_num in modified_questions else (0, 255, 0)
-                cv2.circle(output, pt, 12, color, 2)
-
-        except Exception as e:
-            print(f"[TRACE ERROR] cercle {i} ignoré : {e}")
+    douteux_set = set() if hide_douteux else {(int(x), int(y)) for x, y in douteux_centers or []}
+    doubtful = [(int(x), int(y)) in douteux_set for x, y in centers]
+    modified = question_mask(len(centers), modified_questions)
 
+    output = render_overlay(img, centers, filled, doubtful, modified)
     cv2.imwrite(output_path, output)
 
 
@@ -100,6 +86,7 @@ def classify_filled_circles(img: np.ndarray, centers: np.ndarray) -> list[bool]:
     fill_array = np.array(fill_ratios).reshape(-1, 1)
 
     # Clustering en 2 groupes : rempli / vide
+    from sklearn.cluster import KMeans
     kmeans = KMeans(n_clusters=2, n_init=10, random_state=42)
     labels = kmeans.fit_predict(fill_array)
 
@@ -135,6 +122,7 @@ def classify_filled_circles_name(img: np.ndarray, centers: np.ndarray,
         return [False] * len(centers)
 
     valid_vals = np.array([fill_ratios[i] for i in valid_indices]).reshape(-1, 1)
+    from sklearn.cluster import KMeans
     kmeans = KMeans(n_clusters=2, n_init=10, random_state=42)
     labels = kmeans.fit_predict(valid_vals)
 
@@ -185,6 +173,7 @@ def classify_filled_circles_questions(img: np.ndarray, centers: np.ndarray) -> l
         fill_ratios.append(ratio)
 
     fill_array = np.array(fill_ratios).reshape(-1, 1)
+    from sklearn.cluster import KMeans
     kmeans = KMeans(n_clusters=2, n_init=10, random_state=42)
     labels = kmeans.fit_predict(fill_array)
 
@@ -212,6 +201,7 @@ def extract_columns_from_circle_x(centers: np.ndarray,
 
     xs = centers[:, 0].reshape(-1, 1)
 
+    from sklearn.cluster import DBSCAN
     clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(xs)
     labels = clustering.labels_
 
@@ -238,6 +228,7 @@ def extract_lines_from_circle_y(centers: np.ndarray,
     ys = centers[:, 1].reshape(-1, 1)
 
     # Clustering des Y proches
+    from sklearn.cluster import DBSCAN
     clustering = DBSCAN(eps=eps, min_samples=min_samples).fit(ys)
     labels = clustering.labels_
 
@@ -259,6 +250,7 @@ def recentre_colonnes_nom_prenom(centers, debug=False):
     centers = np.array(centers)
 
     # Recentrage des colonnes (x) par clustering
+    from sklearn.cluster import DBSCAN
     db_x = DBSCAN(eps=10, min_samples=2)
     labels_x = db_x.fit_predict(centers[:, 0].reshape(-1, 1))
     col_x = []
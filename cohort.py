@@ -0,0 +1,197 @@
+# cohort.py
+import csv
+import json
+import os
+from os.path import exists, isdir, join
+
+import numpy as np
+
+from item_analysis import item_statistics
+from meta_updater import TOEIC_STRUCTURE, iter_copy_dirs, iter_copy_metas
+from score_export import NB_QUESTIONS, answer_key_indices, response_matrix
+
+COHORT_CACHE = ".cohort_cache.json"
+CACHE_FORMAT = 3   # 2 : valeurs manquantes gardées à null (et non comptées 0) ; 3 : copies en cours exclues
+COHORT_METRICS = ["scaled_total", "scaled_listening", "scaled_reading", "raw_score",
+                  "part1", "part2", "part3", "part4", "part5", "part6", "part7"]
+
+# borne haute (exclue) et largeur des classes d'histogramme de chaque score
+METRIC_SCALES = {"scaled_total": (1000, 50), "scaled_listening": (500, 25), "scaled_reading": (500, 25),
+                 "raw_score": (NB_QUESTIONS + 1, 10)}
+for _section in TOEIC_STRUCTURE.values():
+    for _part, (_first, _last) in _section["subparts"].items():
+        METRIC_SCALES[_part] = (_last - _first + 2, max(1, (_last - _first + 2) // 10))
+
+
+def histogram_edges(metric):
+    """
+    Bin edges of a metric, from 0 to its maximum score (last bin closed)
+    """
+    top, step = METRIC_SCALES[metric]
+    return list(range(0, top, step)) + [top]
+
+
+def list_cohort_projects(projects_dir):
+    """
+    Project folders of the projects directory (temporary and hidden folders excluded)
+    """
+    if not isdir(projects_dir):
+        return []
+    with os.scandir(projects_dir) as it:
+        return sorted(e.name for e in it
+                      if e.is_dir() and not e.name.startswith(".") and e.name != "__temp__")
+
+
+def project_signature(project_path):
+    """
+    (number of graded copies, latest mtime of their meta.json files and of the answer key).
+    Copies still holding the incomplete marker are not counted, so the signature changes
+    when a marker is removed even though no meta.json is touched. Only stat calls.
+    """
+    count, latest = 0, 0.0
+    correction_path = join(project_path, "toeic_correction.csv")
+    if exists(correction_path):
+        latest = os.stat(correction_path).st_mtime
+    for _, meta_path in iter_copy_dirs(project_path):
+        try:
+            mtime = os.stat(meta_path).st_mtime
+        except OSError:
+            continue
+        count += 1
+        latest = max(latest, mtime)
+    return [count, latest]
+
+
+def summarize_project(project_path):
+    """
+    Score vectors and item difficulty of a project, read in one pass over its graded copies
+    :return: {"copies", "scores": {metric: [values]}, "p_value": [200 values or None]}
+    """
+    scores = {m: [] for m in COHORT_METRICS}
+    matrices = []
+    for _, meta in iter_copy_metas(project_path):
+        subparts = meta.get("subparts", {})
+        for m in COHORT_METRICS:
+            value = subparts.get(m) if m.startswith("part") else meta.get(m)
+            # copie sans ce score : ignorée plutôt que comptée 0 (fausserait moyennes et histogrammes)
+            scores[m].append(value if isinstance(value, (int, float)) else None)
+        matrices.append(response_matrix(meta.get("filled", [])))
+
+    responses = np.stack(matrices) if matrices else np.zeros((0, NB_QUESTIONS, 4), dtype=bool)
+    p_value = item_statistics(responses, answer_key_indices(project_path))["p_value"]
+    return {
+        "copies": len(matrices),
+        "scores": scores,
+        # NaN n'est pas du JSON valide
+        "p_value": [None if np.isnan(v) else round(float(v), 4) for v in p_value],
+    }
+
+
+def load_cohort(projects_dir):
+    """
+    Summaries of every project of the projects directory. A summary is only
+    recomputed when the signature (copies, mtimes) of its project changed;
+    the others come from the cache file stored in the projects directory.
+    :return: {project name: summary}
+    """
+    cache_path = join(projects_dir, COHORT_CACHE)
+    cache = {}
+    if exists(cache_path):
+        try:
+            with open(cache_path, "r") as f:
+                cache = json.load(f)
+        except Exception as e:
+            print(f"[WARN] Cache de cohorte illisible, reconstruction : {e}")
+
+    summaries, dirty = {}, False
+    for name in list_cohort_projects(projects_dir):
+        project_path = join(projects_dir, name)
+        signature = project_signature(project_path)
+        cached = cache.get(name)
+        if cached is not None and cached.get("signature") == signature and cached.get("format") == CACHE_FORMAT:
+            summaries[name] = cached
+            continue
+        summary = summarize_project(project_path)
+        summary["signature"] = signature
+        summary["format"] = CACHE_FORMAT
+        summaries[name] = summary
+        dirty = True
+
+    if dirty or set(cache) != set(summaries):
+        try:
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(summaries, f)
+            os.replace(tmp_path, cache_path)
+        except Exception as e:
+            print(f"[WARN] Cache de cohorte non enregistré : {e}")
+    return summaries
+
+
+def distribution(values, metric="scaled_total"):
+    """
+    Descriptive statistics and histogram (bins of the metric, see METRIC_SCALES) of a score
+    vector; missing values (None / NaN) are left out and counted apart
+    """
+    v = np.asarray([np.nan if x is None else x for x in values], dtype=float)
+    missing = int(np.isnan(v).sum())
+    v = v[~np.isnan(v)]
+    if v.size == 0:
+        return {"count": 0, "missing": missing}
+    p25, median, p75 = np.percentile(v, [25, 50, 75])
+    edges = histogram_edges(metric)
+    hist, _ = np.histogram(v, bins=edges)
+    return {
+        "count": int(v.size),
+        "missing": missing,
+        "mean": float(v.mean()),
+        "std": float(v.std()),
+        "min": float(v.min()),
+        "p25": float(p25),
+        "median": float(median),
+        "p75": float(p75),
+        "max": float(v.max()),
+        "histogram": hist.tolist(),
+        "bins": edges,
+    }
+
+
+def cohort_statistics(summaries):
+    """
+    Per-project and global distributions of every metric, plus the global item difficulty
+    :return: {"projects": {name: {metric: distribution}}, "global": {metric: distribution},
+              "p_value": {name: [200], "global": [200]}}
+    """
+    projects = {name: {m: distribution(s["scores"][m], m) for m in COHORT_METRICS}
+                for name, s in summaries.items()}
+    merged = {m: [x for s in summaries.values() for x in s["scores"][m]] for m in COHORT_METRICS}
+
+    p_values = {name: s["p_value"] for name, s in summaries.items()}
+    if summaries:
+        # moyenne pondérée par le nombre de copies, en ignorant les questions sans corrigé
+        p = np.array([[np.nan if x is None else x for x in s["p_value"]] for s in summaries.values()])
+        w = np.array([s["copies"] for s in summaries.values()], dtype=float)[:, None] * ~np.isnan(p)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            global_p = np.nansum(np.nan_to_num(p) * w, axis=0) / w.sum(axis=0)
+        p_values["global"] = [None if np.isnan(x) else float(x) for x in global_p]
+
+    return {
+        "projects": projects,
+        "global": {m: distribution(merged[m], m) for m in COHORT_METRICS},
+        "p_value": p_values,
+    }
+
+
+def export_cohort_csv(stats, path):
+    """
+    One row per project (and one for the whole cohort) with the descriptive statistics of every metric
+    """
+    fields = ["count", "missing", "mean", "std", "min", "p25", "median", "p75", "max"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["project"] + [f"{m}_{k}" for m in COHORT_METRICS for k in fields])
+        rows = list(stats["projects"].items()) + [("__cohorte__", stats["global"])]
+        for name, metrics in rows:
+            writer.writerow([name] + [
+                round(metrics[m][k], 2) if k in metrics[m] else "" for m in COHORT_METRICS for k in fields
+            ])
@@ -0,0 +1,113 @@
+# cohort_dialog.py
+from PySide6 import QtWidgets
+from PySide6.QtWidgets import QFileDialog
+
+from cohort import cohort_statistics, export_cohort_csv, load_cohort
+from score_export import NB_QUESTIONS
+from stats import part_labels, part_names
+
+
+def fmt(value, digits=1):
+    return "N/A" if value is None else f"{value:.{digits}f}"
+
+
+class CohortDialog(QtWidgets.QDialog):
+    def __init__(self, projects_dir, parent=None):
+        """
+        Compares every project (class) of the projects directory
+        :param projects_dir: directory containing the projects
+        :param parent: parent
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Statistiques de cohorte")
+        self.setMinimumSize(900, 500)
+        self.layout = QtWidgets.QVBoxLayout(self)
+
+        self.stats = cohort_statistics(load_cohort(projects_dir))
+        total = self.stats["global"]["scaled_total"]
+
+        export_btn = QtWidgets.QPushButton("📁 Exporter la cohorte (CSV)")
+        export_btn.clicked.connect(self.export_cohort)
+        self.layout.addWidget(export_btn)
+
+        self.layout.addWidget(QtWidgets.QLabel(
+            f"👥 {len(self.stats['projects'])} projets · {total['count'] + total['missing']} copies"))
+
+        tabs = QtWidgets.QTabWidget()
+        tabs.addTab(self.create_scores_table(), "Scores")
+        tabs.addTab(self.create_parts_table(), "Sous-parties")
+        tabs.addTab(self.create_items_table(), "Items")
+        self.layout.addWidget(tabs)
+
+        close_btn = QtWidgets.QPushButton("Fermer")
+        close_btn.clicked.connect(self.accept)
+        self.layout.addWidget(close_btn)
+
+    def rows_with_global(self):
+        return [("Toutes les classes", self.stats["global"])] + list(self.stats["projects"].items())
+
+    def create_scores_table(self):
+        global_mean = self.stats["global"]["scaled_total"].get("mean")
+        headers = ["Projet", "Copies", "Total moy.", "Écart / cohorte", "Écart-type",
+                   "Min", "P25", "Médiane", "P75", "Max", "Listening moy.", "Reading moy."]
+        rows = []
+        for name, metrics in self.rows_with_global():
+            total = metrics["scaled_total"]
+            delta = None
+            if total["count"] and global_mean is not None:
+                delta = total["mean"] - global_mean
+            # copies sans score comptées, mais hors moyennes
+            rows.append([name, str(total["count"] + total["missing"]), fmt(total.get("mean")),
+                         "N/A" if delta is None else f"{delta:+.1f}", fmt(total.get("std")),
+                         fmt(total.get("min"), 0), fmt(total.get("p25")), fmt(total.get("median")),
+                         fmt(total.get("p75")), fmt(total.get("max"), 0),
+                         fmt(metrics["scaled_listening"].get("mean")),
+                         fmt(metrics["scaled_reading"].get("mean"))])
+        return self.create_table(headers, rows)
+
+    def create_parts_table(self):
+        headers = ["Projet"] + [part_labels[p] for p in part_names]
+        rows = [[name] + [fmt(metrics[p].get("mean"), 2) for p in part_names]
+                for name, metrics in self.rows_with_global()]
+        return self.create_table(headers, rows)
+
+    def create_items_table(self):
+        """
+        Share of right answers per question, for the whole cohort and for each project
+        """
+        p_values = self.stats["p_value"]
+        names = list(self.stats["projects"])
+        headers = ["Question", "Cohorte"] + names
+        rows = []
+        for q in range(NB_QUESTIONS):
+            row = [f"Q{q + 1}"]
+            for name in ["global"] + names:
+                values = p_values.get(name)
+                value = values[q] if values else None
+                row.append("N/A" if value is None else f"{value * 100:.0f} %")
+            rows.append(row)
+        return self.create_table(headers, rows)
+
+    def create_table(self, headers, rows):
+        table = QtWidgets.QTableWidget()
+        table.setRowCount(len(rows))
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+
+        for row_idx, row in enumerate(rows):
+            for col_idx, val in enumerate(row):
+                table.setItem(row_idx, col_idx, QtWidgets.QTableWidgetItem(val))
+
+        table.resizeColumnsToContents()
+        return table
+
+    def export_cohort(self):
+        if not self.stats["projects"]:
+            QtWidgets.QMessageBox.warning(self, "Export", "Aucun projet trouvé.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Exporter la cohorte", "cohorte.csv", "CSV (*.csv)")
+        if path:
+            export_cohort_csv(self.stats, path)
+            QtWidgets.QMessageBox.information(self, "Export terminé", f"Fichier exporté :\n{path}")
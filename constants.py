@@ -7,6 +7,8 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
 FOLDER_ICON = os.path.join(BASE_DIR,"resources/icons/folder.svg")
 ADD_ICON = os.path.join(BASE_DIR,"resources/icons/add-button.svg")
+TEMPLATES_DIR = os.path.join(BASE_DIR, "resources/templates")
+TEMPLATE_PATH = os.path.join(TEMPLATES_DIR, "Answer_sheet.jpg")
 
 ACCENTS = ["ˆ", "°", "`", "´", "”", "~", "¸"]
 LETTERS = ["A", "B", "C", "D", "E", "F", "G", "H", "I", "J", "K", "L", "M",
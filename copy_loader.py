@@ -0,0 +1,195 @@
+# copy_loader.py
+import json
+import os
+import threading
+from os.path import basename, isdir, join, exists
+
+from PySide6 import QtCore
+from PySide6.QtCore import QObject, Signal
+
+from circle_classifier import get_model_meta
+from meta_updater import copy_summary
+
+EntryRole = QtCore.Qt.UserRole + 1
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def entry_label(entry):
+    """
+    Text shown in the project list for an entry
+    """
+    if entry["kind"] == "back":
+        return "⬅️ Retour"
+    if entry["kind"] == "file":
+        return basename(entry["path"])
+
+    label = f"[Dossier] {basename(entry['path'])}"
+    summary = entry.get("summary")
+    if summary:
+        label += f"   —   {summary['nom'] or '?'} · {summary['scaled_total']}/990"
+        if summary["doubtful"]:
+            label += "  ⚠️ à vérifier"
+        if summary.get("stale"):
+            label += f"  🔁 ancien modèle (v{summary['model_version']})"
+    return label
+
+
+class DirectoryLoader(QObject):
+    """
+    Scans a folder in a background thread and emits its entries page by page.
+    The first page is sent right away, the next ones when the view asks for
+    them (request_page), so meta.json files are only parsed when needed.
+
+    mode "project": one entry per copy folder, with its summary (name, scaled total, doubtful flag)
+    mode "copy": one entry per image of a copy folder, plus the copy record for `_questions` images
+    """
+    page_ready = Signal(int, list)   # (génération, entrées)
+    finished = Signal(int)
+
+    def __init__(self, folder, mode, generation, page_size=40):
+        super().__init__()
+        self.folder = folder
+        self.mode = mode
+        self.generation = generation
+        self.page_size = page_size
+        self.done = False
+        self._stopped = False
+        self._demand = threading.Semaphore(0)
+        self._lock = threading.Lock()
+        self._requested = False
+
+    def request_page(self):
+        with self._lock:
+            if self._requested or self.done:
+                return
+            self._requested = True
+        self._demand.release()
+
+    def stop(self):
+        self._stopped = True
+        self._demand.release()
+
+    def run(self):
+        try:
+            names = sorted(os.listdir(self.folder))
+        except Exception as e:
+            print(f"[ERREUR] Lecture du dossier {self.folder} : {e}")
+            names = []
+
+        page = []
+        first_page = True
+        for name in names:
+            if self._stopped:
+                break
+            entry = self._load_entry(name)
+            if entry is None:
+                continue
+            page.append(entry)
+            if len(page) >= self.page_size:
+                if not first_page:
+                    self._demand.acquire()
+                    if self._stopped:
+                        break
+                first_page = False
+                with self._lock:
+                    self._requested = False
+                self.page_ready.emit(self.generation, page)
+                page = []
+
+        if page and not self._stopped:
+            if not first_page:
+                self._demand.acquire()
+            if not self._stopped:
+                self.page_ready.emit(self.generation, page)
+        self.done = True
+        self.finished.emit(self.generation)
+
+    def _load_entry(self, name):
+        path = join(self.folder, name)
+
+        if self.mode == "project":
+            if not isdir(path) or name.startswith("."):
+                return None
+            return {"kind": "dir", "path": path, "summary": self._read_summary(join(path, "meta.json"), name)}
+
+        if not name.lower().endswith(IMAGE_EXTENSIONS):
+            return None
+        entry = {"kind": "file", "path": path}
+        meta_path = join(self.folder, "meta.json")
+        if "_questions" in name.lower() and "_questions_clean" not in name.lower() and exists(meta_path):
+            try:
+                with open(meta_path, "r") as f:
+                    data = json.load(f)
+                entry["record"] = {
+                    "image": path,
+                    "filled": data["filled"],
+                    "centers": data["centers"],
+                    "modified_questions": data.get("modified_questions", [])
+                }
+                entry["douteux"] = data.get("douteux", {})
+            except Exception as e:
+                print(f"[ERREUR] Chargement meta.json : {e}")
+        return entry
+
+    def _read_summary(self, meta_path, name):
+        if not exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r") as f:
+                return copy_summary(json.load(f), name, get_model_meta()["version"])
+        except Exception as e:
+            print(f"[ERREUR] Lecture {meta_path} : {e}")
+            return None
+
+
+class CopyListModel(QtCore.QAbstractListModel):
+    """
+    Entries of the project list, filled page by page by a DirectoryLoader
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.entries = []
+        self.loader = None
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entry = self.entries[index.row()]
+        if role == QtCore.Qt.DisplayRole:
+            return entry_label(entry)
+        if role == QtCore.Qt.UserRole:
+            return entry["path"]
+        if role == EntryRole:
+            return entry
+        return None
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self.loader is not None and not self.loader.done
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if self.loader is not None:
+            self.loader.request_page()
+
+    def reset(self, loader=None):
+        self.beginResetModel()
+        self.entries = []
+        self.loader = loader
+        self.endResetModel()
+
+    def append_entries(self, entries):
+        if not entries:
+            return
+        start = len(self.entries)
+        self.beginInsertRows(QtCore.QModelIndex(), start, start + len(entries) - 1)
+        self.entries.extend(entries)
+        self.endInsertRows()
+
+    def find_path(self, path):
+        for row, entry in enumerate(self.entries):
+            if entry["path"] == path:
+                return row
+        return -1
@@ -0,0 +1,157 @@
+# grading_pool.py
+"""
+Bounded producer / consumer pipeline between PDF rendering and grading.
+
+Rendered pages go into a bounded queue consumed by a fixed number of grading
+threads. When the queue is full, the producer (the PDF rendering thread) blocks
+until a page has been taken, so rendered pages on disk, memory and threads stay
+bounded whatever the length of the PDF. Cancellation is cooperative: the
+producer stops before its next page, the pages still waiting are dropped (their
+import journal keeps them unfinished) and the pages being graded are finished.
+"""
+import os
+import queue
+import threading
+import traceback
+
+from PySide6.QtCore import QObject, QThread, Signal
+
+from image_worker import ImageProcessingWorker
+from page_filter import PageSkipped
+
+GRADING_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+MAX_PENDING = 2 * GRADING_WORKERS   # pages rendues en attente de correction
+
+
+class GradingConsumer(QObject):
+    finished = Signal()
+
+    def __init__(self, pool):
+        super().__init__()
+        self.pool = pool
+
+    def run(self):
+        while True:
+            path = self.pool.queue.get()
+            if path is None:
+                break
+            self.pool.grade(path)
+        self.finished.emit()
+
+
+class GradingPool(QObject):
+    processed = Signal(dict)
+    needManualReview = Signal(str, dict)
+    skipped = Signal(dict)
+    failed = Signal(str)
+    error = Signal(str)
+    depth = Signal(int, int)   # pages en attente, pages en cours de correction
+
+    def __init__(self, template, project_path, workers=GRADING_WORKERS, max_pending=MAX_PENDING,
+                 on_copy_dir=None, parent=None):
+        """
+        :param on_copy_dir: callable(page, copy folder), called from the grading thread (see ImageProcessingWorker)
+        """
+        super().__init__(parent)
+        self.template = template
+        self.project_path = project_path
+        self.on_copy_dir = on_copy_dir
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.max_pending = max_pending
+        self._running = 0
+        self._lock = threading.Lock()
+        self.threads = []
+        for _ in range(workers):
+            thread = QThread(self)
+            consumer = GradingConsumer(self)
+            consumer.moveToThread(thread)
+            thread.started.connect(consumer.run)
+            consumer.finished.connect(thread.quit)
+            thread.finished.connect(consumer.deleteLater)
+            thread.start()
+            self.threads.append((thread, consumer))
+
+    def submit(self, path, cancel=None):
+        """
+        Queue a page, blocking while the queue is full (call from the producer thread)
+        :param cancel: threading.Event, stops the wait when set
+        :return: False if cancelled before the page could be queued
+        """
+        while cancel is None or not cancel.is_set():
+            try:
+                self.queue.put(path, timeout=0.2)
+                self._emit_depth()
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def try_submit(self, path):
+        """
+        Queue a page without blocking (GUI thread)
+        :return: False if the queue is full
+        """
+        try:
+            self.queue.put_nowait(path)
+        except queue.Full:
+            return False
+        self._emit_depth()
+        return True
+
+    def drain(self):
+        """
+        Drop the pages not started yet
+        :return: dropped pages
+        """
+        dropped = []
+        while True:
+            try:
+                path = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if path is not None:
+                dropped.append(path)
+        self._emit_depth()
+        return dropped
+
+    @property
+    def busy(self):
+        return self._running > 0 or not self.queue.empty()
+
+    def grade(self, path):
+        with self._lock:
+            self._running += 1
+        self._emit_depth()
+        try:
+            worker = ImageProcessingWorker(path, self.template, self.project_path, self.on_copy_dir)
+            result = worker.process()
+            self.processed.emit(result)
+            if result.get("douteux"):
+                self.needManualReview.emit(result["image"], result["douteux"])
+        except PageSkipped as e:
+            print(f"[Worker] Page ignorée : {e}")
+            self.skipped.emit(e.report)
+        except Exception as e:
+            print("[Worker] CRASH", e)
+            traceback.print_exc()
+            self.failed.emit(path)
+            self.error.emit(str(e))
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._emit_depth()
+
+    def _emit_depth(self):
+        self.depth.emit(self.queue.qsize(), self._running)
+
+    def shutdown(self):
+        """
+        Drop the waiting pages, let the pages in progress finish and stop the threads
+        """
+        self.drain()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread, _ in self.threads:
+            thread.quit()
+            thread.wait()
+        self.threads = []
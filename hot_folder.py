@@ -0,0 +1,247 @@
+# hot_folder.py
+"""
+Watch mode: grades the PDFs and images dropped in a folder (e.g. by a scanner).
+
+Files are only queued once their size and mtime have stopped changing for a
+few seconds (the scanner may still be writing them), and every ingested file
+is recorded in a ledger inside the project, so a restart never grades it twice.
+
+Headless usage : python hot_folder.py PROJECT_PATH [WATCH_DIR] [--interval 2] [--settle 5] [--once]
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from os.path import basename, exists, isdir, join, splitext
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from jobs import INGEST_DIR, ingest_dir
+
+WATCH_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg")
+
+
+def load_watch_dir(project_path):
+    """
+    Folder watched for a project, None if watch mode is off
+    """
+    config_path = join(project_path, INGEST_DIR, "watch.json")
+    if not exists(config_path):
+        return None
+    try:
+        with open(config_path, "r") as f:
+            return json.load(f).get("watch_dir")
+    except Exception as e:
+        print(f"[WARN] Configuration du dossier surveillé illisible : {e}")
+        return None
+
+
+def save_watch_dir(project_path, watch_dir):
+    with open(join(ingest_dir(project_path), "watch.json"), "w") as f:
+        json.dump({"watch_dir": watch_dir}, f, indent=2)
+
+
+def file_key(name, size, mtime_ns):
+    """Identity of a dropped file: same name, size and mtime means same scan"""
+    return f"{name}|{size}|{mtime_ns}"
+
+
+class ProcessedLedger:
+    """
+    Append-only record (one JSON line per file) of the files already ingested in a project
+    """
+
+    def __init__(self, project_path):
+        self.path = join(ingest_dir(project_path), "processed.jsonl")
+        self.keys = set()
+        self._lock = threading.Lock()
+        if exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self.keys.add(json.loads(line)["key"])
+                    except (ValueError, KeyError):
+                        continue   # dernière ligne tronquée par un arrêt brutal
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self.keys
+
+    def add(self, key, source, **info):
+        record = {"key": key, "source": source, "at": time.strftime("%Y-%m-%dT%H:%M:%S"), **info}
+        with self._lock:
+            self.keys.add(key)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+
+class FolderScanner:
+    """
+    Debounced scan of a folder: returns the new files whose size and mtime
+    did not change for settle_seconds
+    """
+
+    def __init__(self, watch_dir, ledger, settle_seconds=5.0):
+        self.watch_dir = watch_dir
+        self.ledger = ledger
+        self.settle_seconds = settle_seconds
+        self.pending = {}    # chemin -> (signature, instant depuis lequel elle est stable)
+        self.queued = set()
+
+    def poll(self, now=None):
+        """
+        :return: list of (path, key) ready to be ingested
+        """
+        now = time.monotonic() if now is None else now
+        ready, seen = [], set()
+        with os.scandir(self.watch_dir) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith(".") or not name.lower().endswith(WATCH_EXTENSIONS) or not entry.is_file():
+                    continue
+                st = entry.stat()
+                key = file_key(name, st.st_size, st.st_mtime_ns)
+                if key in self.queued or key in self.ledger:
+                    continue
+                seen.add(entry.path)
+                previous = self.pending.get(entry.path)
+                if previous is None or previous[0] != key:
+                    self.pending[entry.path] = (key, now)
+                elif st.st_size > 0 and now - previous[1] >= self.settle_seconds:
+                    del self.pending[entry.path]
+                    self.queued.add(key)
+                    ready.append((entry.path, key))
+
+        # fichiers supprimés ou déplacés avant d'être stables
+        for path in set(self.pending) - seen:
+            del self.pending[path]
+        return ready
+
+
+class HotFolderWatcher(QObject):
+    """
+    Polls a FolderScanner from its own thread (network folders can be slow)
+    and emits every file that is ready
+    """
+    file_ready = Signal(str, str)   # (chemin, clé du registre)
+
+    def __init__(self, watch_dir, ledger, interval_ms=2000, settle_seconds=5.0):
+        super().__init__()
+        self.scanner = FolderScanner(watch_dir, ledger, settle_seconds)
+        self.interval_ms = interval_ms
+        self.timer = None
+
+    def start(self):
+        # minuteur créé dans le thread du watcher : il s'arrête avec sa boucle d'événements
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.poll)
+        self.timer.start(self.interval_ms)
+        self.poll()
+
+    def poll(self):
+        try:
+            ready = self.scanner.poll()
+        except OSError as e:
+            print(f"[WARN] Dossier surveillé inaccessible : {e}")
+            return
+        for path, key in ready:
+            print(f"[WATCH] Nouveau fichier : {path}")
+            self.file_ready.emit(path, key)
+
+
+def ingest_file(path, project_path, template):
+    """
+    Grade a PDF or an image synchronously (headless mode)
+    :return: number of graded pages
+    """
+    from image_worker import ImageProcessingWorker
+    from jobs import ImportJob
+    from page_filter import PageSkipped
+    from pdf_manager import PDFConversionManager
+
+    job = None
+    if path.lower().endswith(".pdf"):
+        # journalisé : un arrêt en cours de PDF reprend à la première page non notée
+        job = ImportJob.open(project_path, path)
+        pages, errors = [], []
+        converter = PDFConversionManager(path, project_path, splitext(basename(path))[0], job=job)
+        converter.image_ready.connect(pages.append)
+        converter.error.connect(errors.append)
+        converter.run()
+        if errors:
+            raise RuntimeError(errors[0])
+    else:
+        target = join(project_path, basename(path))
+        shutil.copy(path, target)
+        pages = [target]
+
+    graded = 0
+    for page in pages:
+        n = job.page_for_image(page) if job is not None else None
+        # le journal retient le dossier de la copie dès sa création : nettoyé à la reprise si la correction échoue
+        on_copy_dir = (lambda _, copy_dir: job.mark_grading(n, copy_dir)) if n is not None else None
+        try:
+            result = ImageProcessingWorker(page, template, project_path, on_copy_dir).process()
+            graded += 1
+            if n is not None:
+                job.mark_graded(n, "graded", result["copy_dir"])
+        except PageSkipped as e:
+            print(f"[WATCH] Page ignorée : {e}")
+            if n is not None:
+                job.mark_graded(n, "skipped")
+        except Exception:
+            # retentée à la reprise du journal
+            if n is not None:
+                job.mark_graded(n, "error")
+            raise
+    return graded
+
+
+def watch_headless(project_path, watch_dir, interval=2.0, settle=5.0, once=False):
+    """
+    Watch loop without GUI; with once=True, stops when the folder has nothing left to ingest
+    """
+    from constants import TEMPLATES_DIR
+    from jobs import clean_orphan_copies
+    from templates import default_registry
+
+    template = default_registry()
+    if not len(template):
+        raise FileNotFoundError(f"Aucun modèle de feuille dans {TEMPLATES_DIR}")
+    # les PDF interrompus sont repris par leur journal quand le scanner les retrouve
+    clean_orphan_copies(project_path)
+    ledger = ProcessedLedger(project_path)
+    scanner = FolderScanner(watch_dir, ledger, settle)
+    print(f"[WATCH] Surveillance de {watch_dir} → {project_path}")
+
+    while True:
+        for path, key in scanner.poll():
+            try:
+                pages = ingest_file(path, project_path, template)
+                ledger.add(key, path, pages=pages)
+                print(f"[WATCH] {basename(path)} : {pages} page(s) corrigée(s)")
+            except Exception as e:
+                # pas inscrit au registre : sera retenté au prochain démarrage
+                print(f"[ERREUR] {path} : {e}")
+        if once and not scanner.pending:
+            break
+        time.sleep(interval)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Correction automatique des copies déposées dans un dossier")
+    parser.add_argument("project_path")
+    parser.add_argument("watch_dir", nargs="?", help="par défaut, le dossier configuré pour le projet")
+    parser.add_argument("--interval", type=float, default=2.0, help="secondes entre deux scans")
+    parser.add_argument("--settle", type=float, default=5.0, help="secondes sans modification avant import")
+    parser.add_argument("--once", action="store_true", help="traiter le contenu actuel puis quitter")
+    args = parser.parse_args()
+
+    watch_dir = args.watch_dir or load_watch_dir(args.project_path)
+    if not watch_dir or not isdir(watch_dir):
+        parser.error("dossier surveillé introuvable")
+    watch_headless(args.project_path, watch_dir, args.interval, args.settle, args.once)
@@ -1,30 +1,23 @@
-from PySide6 import QtWidgets, QtGui
+from PySide6 import QtWidgets
 from PySide6.QtWidgets import QDialog
 
+from tiled_viewer import TiledImageView
+
 
 class ImageViewerDialog(QDialog):
-    def __init__(self, pixmap, title, parent=None):
+    def __init__(self, source, title, parent=None):
+        """
+        Image viewer: cached preview first, full-resolution tiles when zooming
+        :param source: FileImageSource or ArrayImageSource (see tiled_viewer)
+        :param title: window title
+        :param parent: parent
+        """
         super().__init__(parent)
         self.setWindowTitle(title)
-        self.view = QtWidgets.QGraphicsView()
-        self.scene = QtWidgets.QGraphicsScene(self)
-        self.view.setScene(self.scene)
-        self.view.setRenderHint(QtGui.QPainter.Antialiasing)
-        self.view.setTransformationAnchor(QtWidgets.QGraphicsView.AnchorUnderMouse)
-
-        self.pixmap_item = QtWidgets.QGraphicsPixmapItem(pixmap)
-        self.scene.addItem(self.pixmap_item)
+        self.view = TiledImageView(source)
+        self.scene = self.view.scene()
 
         layout = QtWidgets.QVBoxLayout(self)
         layout.addWidget(self.view)
         self.setLayout(layout)
         self.resize(800, 600)
-
-        self.scale_factor = 1.0
-
-    def wheelEvent(self, event):
-        angle = event.angleDelta().y()
-        zoom_in = angle > 0
-        factor = 1.25 if zoom_in else 0.8
-        self.scale_factor *= factor
-        self.view.scale(factor, factor)
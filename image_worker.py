@@ -1,193 +1,240 @@
+import os
 import shutil
 import unicodedata
 import cv2
 import json
 import circle_manager as cm
-import sys
-from os import listdir, makedirs, rename
-from os.path import dirname, isdir, join, splitext, basename, exists, abspath
-from PySide6.QtCore import QObject, Signal
-from alignment import align_using_features, extract_blocks
-from meta_updater import update_score_in_meta
-from train_circle_classifier import filter_relative_winner
-from constants import ACCENT_COMBINATIONS, ACCENTS, LETTERS
-import traceback
-
-from joblib import load
+from os import listdir, makedirs, remove, rename
+from os.path import dirname, join, splitext, basename, exists
+from alignment import align_blocks
+from meta_updater import copy_summary, update_score_in_meta
+from name_decoder import decode_name, name_grid
+from templates import TemplateRegistry
+from page_filter import PageSkipped, check_page, record_skipped
+from jobs import INCOMPLETE_MARKER
+from profiling import CopyProfile, record_read, record_write
+from circle_classifier import filter_relative_winner, get_model_meta, predict_centers
 
 import threading
 # adding lockers to prevent conflict issue with folders
 folder_creation_lock = threading.Lock()
 folder_rename_lock = threading.Lock()
 
+# page entière alignée écrite dans le dossier de la copie (débogage, archivage) : sinon seuls
+# les deux blocs sont redressés.
+SAVE_ALIGNED_PAGE = os.environ.get("EEC_SAVE_ALIGNED_PAGE") == "1"
 
-def resource_path(relative_path: str) -> str:
-    """Retourne le chemin absolu vers une ressource embarquée
-    compatible dev (fichiers à côté du code) et PyInstaller (--onefile or folder)."""
-    if getattr(sys, 'frozen', False):
-        # quand PyInstaller gèle (--onefile et --onedir)
-        base = getattr(sys, '_MEIPASS', dirname(sys.executable))
-    else:
-        base = abspath(dirname(__file__))
-    return join(base, relative_path)
-
-model_path = resource_path("circle_patch_classifier.joblib")
-model = load(model_path)
-
-class ImageProcessingWorker(QObject):
-    progress = Signal(int, int)
-    processed = Signal(dict)
-    needManualReview = Signal(str, dict)
-    error = Signal(str)
-    
-    def __init__(self, path, template, project_path):
-        super().__init__()
+
+class ImageProcessingWorker:
+    """
+    Grades one page: pre-filter, alignment, name and question blocks, metadata.
+    Threading and signals are left to the caller (grading_pool.GradingPool in the
+    GUI, hot_folder.ingest_file headless, benchmark.py).
+    """
+
+    def __init__(self, path, template, project_path, on_copy_dir=None):
+        """
+        :param template: TemplateRegistry (each page is matched to its sheet revision) or a single template image
+        :param on_copy_dir: callable(page, copy folder), called when the copy folder is created or renamed
+                            (the import journal records which folder each page owns)
+        """
         self.path = path
-        self.template = template
+        self.on_copy_dir = on_copy_dir
+        self.templates = template if isinstance(template, TemplateRegistry) else TemplateRegistry.from_image(template)
+        self.template = None   # modèle reconnu pour la page en cours
         self.project_path = project_path
         self.douteux = {}
+        self.profile = CopyProfile()
+        self.cascade_stats = {"patches": 0, "resolved": 0}
 
-    def run(self):
-        try:
-            print(f"[Worker] START run() for {self.path}")
-            result = self._process_image(self.path)
-            self.processed.emit(result)
-            if result.get("douteux"): 
-                self.needManualReview.emit(result["image"], result["douteux"])
-        except Exception as e:
-            print("[Worker] CRASH", e)
-            traceback.print_exc()
-            self.error.emit(str(e))
-
-
-    def _process_image(self, path: str) -> dict:
+    def process(self, path: str = None) -> dict:
+        """
+        Grade the page (self.path by default)
+        :return: result dict (copy folder, question block, detections, timings, summary)
+        :raise PageSkipped: page rejected by the pre-filter
+        """
+        path = path or self.path
         self.douteux = {}
+        self.profile = CopyProfile()
+        self.cascade_stats = {"patches": 0, "resolved": 0}
         # (1) Alignement / préparation
-        copy_dir, aligned, base_name, ext = self._prepare_and_align_image(path)
+        with self.profile.stage("align"):
+            copy_dir, img_name, img_questions, base_name, ext = self._prepare_and_align_image(path)
 
-        # (2) Extraction des blocs
-        name_path, qst_path = self._extract_and_save_blocks(aligned, copy_dir, base_name, ext)
+        # (2) Enregistrement des blocs
+        with self.profile.stage("extract_blocks"):
+            name_path, qst_path = self._extract_and_save_blocks(img_name, img_questions, copy_dir, base_name, ext)
 
         # (3) Traitement du nom (écrit la meta si c'est ce que fait ton code)
-        self._process_name_block(name_path, base_name, copy_dir)
+        with self.profile.stage("name"):
+            self._process_name_block(img_name, base_name, copy_dir)
 
         # (4) Traitement questions → retourne (centers, filled, douteux)
-        centers, filled, douteux = self._process_question_block(qst_path, copy_dir)
+        with self.profile.stage("questions"):
+            centers, filled, douteux = self._process_question_block(img_questions, qst_path, copy_dir)
 
         # (6) Renommer le dossier selon meta (I/O pur → OK en worker)
-        new_dir = self._rename_copy_folder_from_meta(copy_dir)
+        with self.profile.stage("rename"):
+            new_dir = self._rename_copy_folder_from_meta(copy_dir)
         if new_dir:
             copy_dir = new_dir
+            if self.on_copy_dir is not None:
+                self.on_copy_dir(path, copy_dir)
             name_path = join(copy_dir, basename(name_path))
             qst_path = join(copy_dir, basename(qst_path))
 
+        timings = self.profile.to_dict()
+        meta = self._save_timings(copy_dir, timings)
+        # copie complète : le dossier ne sera plus pris pour un reste d'import interrompu
+        marker = join(copy_dir, INCOMPLETE_MARKER)
+        if exists(marker):
+            remove(marker)
+
         # (7) Renvoyer des **données pures** à lc’UI
         return {
+            "source": path,             # image reçue (page de PDF ou fichier importé)
             "copy_dir": copy_dir,       # dossier final (évent. renommé)
             "image": qst_path,          # chemin du bloc questions
             "centers": centers,         # données pour mise à jour self.copy_data
             "filled": filled,
             "douteux": douteux,         # pour garder la trace côté UI si tu veux
+            "timings": timings,         # durées par étape (profil de la copie)
+            "cascade": dict(self.cascade_stats),  # cases tranchées sans le modèle
+            "summary": copy_summary(meta, basename(copy_dir), get_model_meta()["version"]),
         }
+
+    def _save_timings(self, copy_dir, timings):
+        """
+        Store per-stage timings (and the recognized template) of the copy in its metadata
+        :param copy_dir:
+        :param timings:
+        :return: the updated metadata
+        """
+        meta_path = join(copy_dir, "meta.json")
+        data = {}
+        try:
+            if exists(meta_path):
+                with open(meta_path, "r") as f:
+                    data = json.load(f)
+            data["timings"] = timings
+            data["template"] = self.template.id
+            # copies notées par un modèle antérieur repérables après un réentraînement
+            data["model_version"] = get_model_meta()["version"]
+            with open(meta_path, "w") as f:
+                json.dump(data, f, indent=2)
+        except Exception as e:
+            print(f"[ERREUR] Enregistrement des durées : {e}")
+        return data
     
     def _prepare_and_align_image(self, path):
         """
-        Align the copy with template and stores aligned image
+        Align the name and question blocks of the copy with the template (the full
+        aligned page is only produced and stored with SAVE_ALIGNED_PAGE)
+        :return: copy folder, name block, question block, base name, extension
         """
         project_dir = dirname(path)
-        
+
+        # tri sur vignette (page blanche, autre document, page à l'envers) et choix
+        # du modèle par empreinte, avant le décodage complet et l'alignement coûteux
+        with self.profile.stage("prefilter"):
+            check = check_page(path, self.templates)
+        if check["status"] not in ("ok", "rotated", "uncertain"):
+            record_skipped(self.project_path, check)
+            raise PageSkipped(check)
+        self.template = self.templates.get(check["template"])
+        print(f"[INFO] Modèle reconnu : {self.template.id} (écart {check['distance']})")
+
+        # la page n'est décodée qu'une fois, directement en niveaux de gris :
+        # la couleur n'est utile qu'aux surcouches de révision (overlay.py)
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            raise ValueError(f"Image illisible : {path}")
+        record_read(path)
+        if check["status"] == "rotated" or check.get("rotated"):
+            print("[INFO] Page à l'envers, retournée avant alignement")
+            img = cv2.rotate(img, cv2.ROTATE_180)
+
+        img_name, img_questions, page, ok = align_blocks(
+            img, self.template.gray, self.template.features(),
+            self.template.name_block, self.template.question_block, full_page=SAVE_ALIGNED_PAGE)
+        if not ok:
+            # ni l'empreinte ni l'alignement ne reconnaissent la feuille : autre document ; feuille
+            # reconnue mais non alignable : des blocs non redressés donneraient des notes fausses
+            check = {**check, "status": "foreign" if check["status"] == "uncertain" else "alignment"}
+            record_skipped(self.project_path, check)
+            raise PageSkipped(check)
+        print("[INFO] Alignement réussi")
+
         with folder_creation_lock:
-            existing = [f for f in listdir(project_dir) if f.startswith("copy_") and isdir(join(project_dir, f))]
-            index = len(existing) + 1
-            copy_dir = join(project_dir, f"copy_{index}")
-            makedirs(copy_dir, exist_ok=True)
+            # après le plus grand indice existant (les dossiers renommés d'après le nom ne comptent
+            # pas) et jamais un dossier existant, même créé par un autre processus
+            indices = [int(f[5:]) for f in listdir(project_dir) if f.startswith("copy_") and f[5:].isdigit()]
+            index = max(indices, default=0) + 1
+            while True:
+                copy_dir = join(project_dir, f"copy_{index}")
+                try:
+                    makedirs(copy_dir)
+                    break
+                except FileExistsError:
+                    index += 1
+            open(join(copy_dir, INCOMPLETE_MARKER), "w").close()
+        if self.on_copy_dir is not None:
+            self.on_copy_dir(path, copy_dir)
 
         base, ext = splitext(path)
         base_name = basename(base)
 
-        img = cv2.imread(path)
-        template = self.template
+        # page alignée (SAVE_ALIGNED_PAGE)
+        if page is not None:
+            new_path = join(copy_dir, basename(path))
+            cv2.imwrite(new_path, page)
+            record_write(new_path)
 
-        aligned, ok = align_using_features(img, template)
-        if not ok:
-            print("[INFO] Alignement échoué, image laissée telle quelle")
-            aligned = img
-
-        new_path = join(copy_dir, basename(path))
-        cv2.imwrite(new_path, aligned)
-        print("[INFO] Alignement réussi")
+        return copy_dir, img_name, img_questions, base_name, ext
 
-        return copy_dir, aligned, base_name, ext
-
-    def _extract_and_save_blocks(self, aligned, copy_dir, base_name, ext):
+    def _extract_and_save_blocks(self, img_name, img_questions, copy_dir, base_name, ext):
         """
-        Extract and save the name and question blocks
-        :param aligned:
+        Save the name and question blocks (without overlay: it is
+        rendered on demand by the viewers, see overlay.py)
+        :param img_name:
+        :param img_questions:
         :param copy_dir:
         :param base_name:
         :param ext:
-        :return:
+        :return: paths of the two blocks
         """
-        img_name, img_questions = extract_blocks(aligned)
-
         name_path = join(copy_dir, base_name + "_name" + ext)
         qst_path = join(copy_dir, base_name + "_questions" + ext)
 
-        clean_name_path = join(copy_dir, base_name + "_name_clean" + ext)
-        clean_qst_path = join(copy_dir, base_name + "_questions_clean" + ext)
-
         cv2.imwrite(name_path, img_name)
         cv2.imwrite(qst_path, img_questions)
-        cv2.imwrite(clean_name_path, img_name)
-        cv2.imwrite(clean_qst_path, img_questions)
+        for p in (name_path, qst_path):
+            record_write(p)
 
         print("Separation des 2 blocs OK")
         return name_path, qst_path
 
-    def _process_name_block(self, name_path, base_name, copy_dir):
+    def _process_name_block(self, gray_name, base_name, copy_dir):
         """
         Name detection from name block and adds it/updates to metadata
 
-        :param name_path:
+        :param gray_name: grayscale name block
         :param base_name:
         :param copy_dir:
         :return:
         """
         try:
-            img_name = cv2.imread(name_path)
-            centers = cm.detect_and_align_circles(img_name)
-            gray_name = cv2.cvtColor(img_name, cv2.COLOR_BGR2GRAY)
+            with self.profile.stage("hough"):
+                centers = cm.detect_and_align_circles(gray_name)
 
-            filled = []
-            for (x, y) in centers:
-                patch = gray_name[y - 15:y + 15, x - 15:x + 15]
-                filled.append(
-                    model.predict_proba(patch.reshape(1, -1))[0, 1] > 0.5 if patch.shape == (30, 30) else False)
+            with self.profile.stage("classifier"):
+                probas = predict_centers(gray_name, centers, self.cascade_stats)
+            filled = probas > 0.5
 
             try:
-                col_x, y_lines = cm.recentre_colonnes_nom_prenom(centers)
-                filled_triplets = [(x, y, int(f)) for (x, y), f in zip(centers, filled)]
-                nom = ""
-
-                for x_ref in col_x:
-                    col_circles = [(x, y) for (x, y, v) in filled_triplets if v and abs(x - x_ref) < 10]
-                    if not col_circles:
-                        nom += " "
-                        continue
-
-                    acc_idx = next((j for j in range(7) if
-                                    j < len(y_lines) and any(abs(yc - y_lines[j]) < 5 for _, yc in col_circles)), -1)
-                    let_idx = next((j - 7 for j in range(7, 35) if
-                                    j < len(y_lines) and any(abs(yc - y_lines[j]) < 5 for _, yc in col_circles)), -1)
-
-                    if let_idx != -1:
-                        char = LETTERS[let_idx]
-                        accent = ACCENTS[acc_idx] if acc_idx != -1 else ""
-                        nom += ACCENT_COMBINATIONS.get((accent, char), accent + char)
-                    else:
-                        nom += " "
-
-                nom = " ".join(nom.strip().split())
+                # colonnes : nombre de centres sur la première ligne de la grille
+                n_cols = int((centers[:, 1] == centers[0, 1]).sum()) if len(centers) else 0
+                nom, _, confidence = decode_name(name_grid(probas, n_cols))
                 print(f"[INFO] Nom détecté : « {nom} »")
 
                 meta_path = join(copy_dir, "meta.json")
@@ -196,38 +243,36 @@ class ImageProcessingWorker(QObject):
                     with open(meta_path, "r") as f:
                         data = json.load(f)
                 data["nom"] = nom
+                data["name_centers"] = [list(map(int, pt)) for pt in centers]
+                data["name_filled"] = [bool(f) for f in filled]
+                data["name_confidence"] = [round(float(c), 3) for c in confidence]
                 with open(meta_path, "w") as f:
                     json.dump(data, f, indent=2)
 
             except Exception as e:
                 print(f"[ERREUR] détection nom/prénom : {e}")
 
-            cm.trace_circles(img_name, centers, filled, name_path, douteux_centers=[])
-
         except Exception as e:
             print(f" Erreur détection cercles (haut) : {e}")
 
-    def _process_question_block(self, qst_path, copy_dir):
+    def _process_question_block(self, gray_questions, qst_path, copy_dir):
         """
         Question detection from name block and adds it/updates to metadata
 
-        :param name_path:
-        :param base_name:
+        :param gray_questions: grayscale question block
+        :param qst_path: saved question block
         :param copy_dir:
         :return:
         """
         try:
-            img_questions = cv2.imread(qst_path)
-            centers = cm.detect_and_align_circles(img_questions)
-            gray_questions = cv2.cvtColor(img_questions, cv2.COLOR_BGR2GRAY)
+            with self.profile.stage("hough"):
+                centers = cm.detect_and_align_circles(gray_questions)
 
-            probas = []
-            for (x, y) in centers:
-                patch = gray_questions[y - 15:y + 15, x - 15:x + 15]
-                probas.append(model.predict_proba(patch.reshape(1, -1))[0, 1] if patch.shape == (30, 30) else 0.0)
+            with self.profile.stage("classifier"):
+                probas = predict_centers(gray_questions, centers, self.cascade_stats).tolist()
 
             # Construction grille
-            nb_rows, nb_cols = 25, 8
+            nb_rows, nb_cols = self.template.layout["question_rows"], self.template.layout["question_cols"]
             grid_scores = [[[] for _ in range(nb_cols)] for _ in range(nb_rows)]
             grid_centers = [[[] for _ in range(nb_cols)] for _ in range(nb_rows)]
             for i in range(0, len(probas), 4):
@@ -269,29 +314,19 @@ class ImageProcessingWorker(QObject):
                 "image": qst_path,
                 "filled": filled,
                 "centers": [list(map(int, pt)) for pt in centers_sorted],
-                "douteux": {}
+                "douteux": {q: [float(s) for s in scores] for q, scores in self.douteux.items()}
             })
 
             with open(meta_path, "w") as f:
                 json.dump(existing, f, indent=2)
 
             correction_path = join(self.project_path, "toeic_correction.csv")
-            if exists(correction_path):
-                update_score_in_meta(meta_path, filled, correction_path)
-                print(f"[INFO] Scores mis à jour dans meta.json.")
-            else:
-                print(f"[WARN] Fichier toeic_correction.csv introuvable dans le projet.")
-                
-            
-            douteux_centers = []
-            if hasattr(self, "douteux") and self.douteux:
-                for q in self.douteux:
-                    start_idx = question_to_index.get(q)
-                    if start_idx is not None:
-                        douteux_centers.extend(
-                            [(int(pt[0]), int(pt[1])) for pt in centers_sorted[start_idx:start_idx + 4]]
-                        )
-            cm.trace_circles(img_questions, centers_sorted, filled, qst_path, douteux_centers=douteux_centers)
+            with self.profile.stage("scoring"):
+                if exists(correction_path):
+                    update_score_in_meta(meta_path, filled, correction_path)
+                    print(f"[INFO] Scores mis à jour dans meta.json.")
+                else:
+                    print(f"[WARN] Fichier toeic_correction.csv introuvable dans le projet.")
 
         except Exception as e:
             print(f" Erreur détection cercles (bas) : {e}")
@@ -0,0 +1,96 @@
+# item_analysis.py
+import csv
+
+import numpy as np
+
+from meta_updater import iter_copy_metas
+from score_export import CHOICES, NB_QUESTIONS, answer_key_indices, response_matrix
+
+ITEM_COLUMNS = ["question", "key", "p_value", "point_biserial",
+                "pct_A", "pct_B", "pct_C", "pct_D", "pct_blank", "pct_multiple"]
+
+
+def load_response_tensor(project_path, metas=None):
+    """
+    (N, 200, 4) boolean tensor of the marked bubbles of every copy of a project
+    :param metas: copy metadata already read (the project is not read again), None to read it
+    """
+    if metas is None:
+        metas = (meta for _, meta in iter_copy_metas(project_path))
+    matrices = [response_matrix(meta.get("filled", [])) for meta in metas]
+    if not matrices:
+        return np.zeros((0, NB_QUESTIONS, 4), dtype=bool)
+    return np.stack(matrices)
+
+
+def item_statistics(responses, key):
+    """
+    Per-question statistics computed in one vectorized pass
+    :param responses: (N, 200, 4) boolean tensor
+    :param key: (200,) index of the right answer, -1 when unknown
+    :return: dict of (200,) arrays (p_value, point_biserial, pct_blank, pct_multiple)
+             and distractors (200, 4): share of copies marking each choice
+    """
+    n = responses.shape[0]
+    if n == 0:
+        empty = np.full(NB_QUESTIONS, np.nan)
+        return {"p_value": empty, "point_biserial": empty, "distractors": np.zeros((NB_QUESTIONS, 4)),
+                "pct_blank": empty, "pct_multiple": empty, "copies": 0}
+
+    marks = responses.sum(axis=2)                                 # (N, 200)
+    correct = (marks == 1) & (responses.argmax(axis=2) == key)   # (N, 200)
+    x = correct.astype(np.float64)
+    total = x.sum(axis=1)                                         # score brut par copie
+
+    p_value = x.mean(axis=0)
+    # corrélation point-bisériale entre réussite à l'item et score total
+    # (somme des écarts du total nulle → pas besoin de centrer x)
+    cov = x.T @ (total - total.mean()) / n
+    with np.errstate(invalid="ignore", divide="ignore"):
+        r_pb = cov / (x.std(axis=0) * total.std())
+
+    unknown = key < 0
+    return {
+        "p_value": np.where(unknown, np.nan, p_value),
+        "point_biserial": np.where(unknown | ~np.isfinite(r_pb), np.nan, r_pb),
+        "distractors": responses.mean(axis=0),
+        "pct_blank": (marks == 0).mean(axis=0),
+        "pct_multiple": (marks > 1).mean(axis=0),
+        "copies": n,
+    }
+
+
+def project_item_statistics(project_path, responses=None):
+    """
+    Item statistics of a project, with its answer key
+    """
+    key = answer_key_indices(project_path)
+    if responses is None:
+        responses = load_response_tensor(project_path)
+    return item_statistics(responses, key), key
+
+
+def item_rows(stats, key):
+    """
+    Table rows (one per question) matching ITEM_COLUMNS
+    """
+    rows = []
+    for q in range(NB_QUESTIONS):
+        rows.append([
+            q + 1,
+            CHOICES[key[q]] if key[q] >= 0 else "",
+            stats["p_value"][q],
+            stats["point_biserial"][q],
+            *stats["distractors"][q],
+            stats["pct_blank"][q],
+            stats["pct_multiple"][q],
+        ])
+    return rows
+
+
+def export_item_statistics(stats, key, path):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(ITEM_COLUMNS)
+        for row in item_rows(stats, key):
+            writer.writerow([round(float(v), 4) if isinstance(v, (float, np.floating)) else v for v in row])
@@ -0,0 +1,290 @@
+# jobs.py
+"""
+Persistent PDF import jobs.
+
+Each PDF import is journaled in <project>/.jobs/<id>.json: for every page,
+whether it was rendered (and to which image) and graded (and into which copy
+folder). The journal is rewritten atomically (temporary file, fsync,
+os.replace) after every change, so a crash leaves either the previous or the
+new state, never a truncated file. When the project is opened again,
+unfinished jobs resume at their first unfinished page, reusing the pages
+already rendered. Each page records the copy folder it is graded into as soon as
+the folder is created; on resume, a folder left half-written by the crash (it
+still holds the INCOMPLETE_MARKER file) is removed so its page is graded again.
+A page whose grading raised is retried the same way, up to MAX_PAGE_ATTEMPTS times.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from os.path import basename, exists, isdir, join
+
+JOBS_DIR = ".jobs"
+INGEST_DIR = ".ingest"   # registre du dossier surveillé et rapports des pages ignorées
+INCOMPLETE_MARKER = ".incomplete"   # posé à la création d'un dossier copy_N, retiré une fois la copie notée
+# une page en erreur est retentée à la reprise, jusqu'à MAX_PAGE_ATTEMPTS échecs ("failed")
+PAGE_DONE = ("graded", "skipped", "failed")
+MAX_PAGE_ATTEMPTS = 3
+# un marqueur plus récent peut appartenir à une copie en cours de correction dans un autre
+# processus (hot_folder.py sans interface) : il n'est pas considéré comme orphelin
+ORPHAN_GRACE_S = 600
+
+
+def jobs_dir(project_path):
+    path = join(project_path, JOBS_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def ingest_dir(project_path):
+    path = join(project_path, INGEST_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def atomic_write_json(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def job_id(pdf_path):
+    """Same file (name, size, mtime) → same job"""
+    st = os.stat(pdf_path)
+    key = f"{basename(pdf_path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class ImportJob:
+    """
+    Journal of one PDF import; safe to update from the rendering and grading threads
+    """
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+        # réentrant : les méthodes qui modifient le journal appellent save() sans relâcher le verrou
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(path, json.load(f))
+
+    @classmethod
+    def open(cls, project_path, source, ledger_key=None):
+        """
+        The unfinished job of this PDF if there is one, a new job otherwise
+        """
+        jid = job_id(source)
+        path = join(jobs_dir(project_path), f"{jid}.json")
+        if exists(path):
+            try:
+                job = cls.load(path)
+                if not job.finished:
+                    job.release_copy_dirs()
+                    print(f"[INFO] Reprise de l'import {basename(source)} à la page {job.first_unfinished()}")
+                    with job._lock:
+                        if job.data["state"] != "running":
+                            job.data["state"] = "running"
+                            job.save()
+                    return job
+            except Exception as e:
+                print(f"[WARN] Journal d'import illisible ({path}), import recommencé : {e}")
+        job = cls(path, {
+            "id": jid,
+            "source": source,
+            "base_name": os.path.splitext(basename(source))[0],
+            "ledger_key": ledger_key,
+            "total": None,
+            "pages": {},
+            "state": "running",
+            "created": time.time(),
+        })
+        job.save()
+        return job
+
+    @property
+    def id(self):
+        return self.data["id"]
+
+    @property
+    def source(self):
+        return self.data["source"]
+
+    @property
+    def total(self):
+        return self.data["total"]
+
+    @property
+    def finished(self):
+        return self.data["state"] == "done"
+
+    def save(self):
+        with self._lock:
+            self.data["updated"] = time.time()
+            atomic_write_json(self.path, self.data)
+
+    def page(self, n):
+        return self.data["pages"].get(str(n), {})
+
+    def set_total(self, total):
+        with self._lock:
+            self.data["total"] = total
+            self.save()
+
+    def mark_rendered(self, n, image):
+        with self._lock:
+            self.data["pages"].setdefault(str(n), {}).update({"rendered": True, "image": image})
+            self.save()
+
+    def mark_grading(self, n, copy_dir):
+        """
+        Record the copy folder a page is being graded into (called when the folder is
+        created, and again if it is renamed), so a resume knows which folder it owns
+        """
+        with self._lock:
+            self.data["pages"].setdefault(str(n), {}).update({"status": "grading", "copy_dir": copy_dir})
+            self.save()
+
+    def mark_graded(self, n, status="graded", copy_dir=None):
+        """
+        :param status: "graded", "skipped" (pre-filter) or "error" (retried when the job
+                       resumes, "failed" after MAX_PAGE_ATTEMPTS errors)
+        :return: True if this was the last unfinished page (the job is then done)
+        """
+        with self._lock:
+            page = self.data["pages"].setdefault(str(n), {})
+            if status == "error":
+                page["errors"] = page.get("errors", 0) + 1
+                if page["errors"] >= MAX_PAGE_ATTEMPTS:
+                    print(f"[ERREUR] Page {n} de {basename(self.source)} abandonnée après {page['errors']} échecs")
+                    status = "failed"
+                # dossier laissé par la correction avortée : nettoyé à la reprise (release_copy_dirs)
+                copy_dir = copy_dir or page.get("copy_dir")
+            page.update({"status": status, "copy_dir": copy_dir})
+            done = self.total is not None and all(
+                self.page(i).get("status") in PAGE_DONE for i in range(1, self.total + 1))
+            if done:
+                self.data["state"] = "done"
+            self.save()
+        return done
+
+    def release_copy_dirs(self):
+        """
+        Copy folders owned by the pages left unfinished: a folder still holding the marker
+        is removed (its page is graded again), a complete one is kept and its page marked graded
+        :return: removed folders
+        """
+        removed = []
+        with self._lock:
+            for page in self.data["pages"].values():
+                copy_dir = page.get("copy_dir")
+                if page.get("status") in PAGE_DONE or not copy_dir or not isdir(copy_dir):
+                    continue
+                if exists(join(copy_dir, INCOMPLETE_MARKER)):
+                    shutil.rmtree(copy_dir, ignore_errors=True)
+                    page["copy_dir"] = None
+                    removed.append(copy_dir)
+                elif exists(join(copy_dir, "meta.json")):
+                    # arrêt entre la fin de la correction et l'écriture du journal
+                    page["status"] = "graded"
+            self.save()
+        if removed:
+            print(f"[INFO] {len(removed)} dossier(s) de copie inachevé(s) de {basename(self.source)} supprimé(s)")
+        return removed
+
+    def cancel(self):
+        """
+        Cancelled by the user: not resumed automatically, but importing the same PDF again resumes it
+        """
+        with self._lock:
+            if not self.finished:
+                self.data["state"] = "cancelled"
+                self.save()
+
+    def close_if_done(self):
+        """
+        Mark the job done if no page is left (empty PDF, every page already graded)
+        :return: True if the job was closed by this call
+        """
+        with self._lock:
+            if self.finished or self.total is None or self.first_unfinished() <= self.total:
+                return False
+            self.data["state"] = "done"
+            self.save()
+        return True
+
+    def page_for_image(self, image):
+        with self._lock:
+            for n, page in self.data["pages"].items():
+                if page.get("image") == image:
+                    return int(n)
+        return None
+
+    def is_page_done(self, n):
+        return self.page(n).get("status") in PAGE_DONE
+
+    def first_unfinished(self):
+        if self.total is None:
+            return 1
+        return next((n for n in range(1, self.total + 1) if not self.is_page_done(n)), self.total + 1)
+
+    def rendered_image(self, n):
+        """Image of an already rendered page, None if it must be rendered (again)"""
+        page = self.page(n)
+        image = page.get("image")
+        return image if page.get("rendered") and image and exists(image) else None
+
+
+def unfinished_jobs(project_path):
+    """
+    Jobs interrupted before all their pages were graded, oldest first
+    """
+    folder = join(project_path, JOBS_DIR)
+    if not isdir(folder):
+        return []
+    jobs = []
+    for fname in sorted(os.listdir(folder)):
+        if not fname.endswith(".json"):
+            continue
+        try:
+            job = ImportJob.load(join(folder, fname))
+        except Exception as e:
+            print(f"[WARN] Journal d'import illisible ({fname}) : {e}")
+            continue
+        if job.data["state"] != "running":
+            continue
+        if not exists(job.source):
+            print(f"[WARN] Import interrompu de {job.source} non repris : fichier introuvable")
+            continue
+        jobs.append(job)
+    return sorted(jobs, key=lambda j: j.data.get("created", 0))
+
+
+def clean_orphan_copies(project_path, grace=ORPHAN_GRACE_S):
+    """
+    Remove the copy folders whose grading never finished (crash, closed app)
+    :param grace: seconds; more recent markers may belong to a copy being graded by another process
+    :return: removed folders
+    """
+    removed = []
+    now = time.time()
+    for fname in os.listdir(project_path):
+        folder = join(project_path, fname)
+        marker = join(folder, INCOMPLETE_MARKER)
+        try:
+            if not isdir(folder) or now - os.path.getmtime(marker) <= grace:
+                continue
+        except OSError:
+            continue   # pas de marqueur (copie complète), ou retiré entre-temps
+        shutil.rmtree(folder, ignore_errors=True)
+        removed.append(folder)
+    if removed:
+        print(f"[INFO] {len(removed)} dossier(s) de copie incomplet(s) supprimé(s)")
+    return removed
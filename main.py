@@ -1,11 +1,15 @@
 import os
 import sys
+import time
 import constants as cons
 from PySide6 import QtWidgets, QtCore
 from PySide6.QtGui import QIcon
 from os.path import isdir, join
 from fileDialog import UploadFile
-from project_dialog import ProjectDialog
+
+# project_dialog et cohort_dialog (cv2, numpy, modèle…) sont importés à l'ouverture
+# d'un projet ou des statistiques : la fenêtre principale s'affiche sans eux
+STARTUP_PROBE = "EEC_STARTUP_PROBE"
 
 
 class App(QtWidgets.QWidget):
@@ -28,6 +32,10 @@ class App(QtWidgets.QWidget):
         self.change_dir_button.clicked.connect(self.change_project_dir)
         self.main_layout.addWidget(self.change_dir_button)
 
+        self.cohort_button = QtWidgets.QPushButton("📊 Statistiques de cohorte")
+        self.cohort_button.clicked.connect(self.show_cohort)
+        self.main_layout.addWidget(self.cohort_button)
+
         self.scroll_area.setWidget(self.content_widget)
         self.main_layout.addWidget(self.scroll_area)
 
@@ -71,7 +79,7 @@ class App(QtWidgets.QWidget):
         """
         return sorted(
             f for f in os.listdir(self.project_dir)
-            if isdir(join(self.project_dir, f))
+            if isdir(join(self.project_dir, f)) and not f.startswith(".")
         )
 
     def setup_dirs(self):
@@ -132,10 +140,21 @@ class App(QtWidgets.QWidget):
         """
         opens dialog for the selected project
         """
+        from project_dialog import ProjectDialog
+
         project_path = join(self.project_dir, project_name)
         dialog = ProjectDialog(project_name, project_path, self)
         dialog.exec()
 
+    def show_cohort(self):
+        """
+        opens the cross-project statistics
+        """
+        from cohort_dialog import CohortDialog
+
+        dialog = CohortDialog(self.project_dir, self)
+        dialog.exec()
+
     def create_new_project(self):
         """
         opens project creation dialog
@@ -150,4 +169,13 @@ if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
     widget = App()
     widget.show()
+    if os.environ.get(STARTUP_PROBE):
+        # mesure du démarrage (startup_check.py) : fenêtre affichée, modules chargés, puis sortie
+        # la variable contient l'instant de lancement (time.time()) fixé par startup_check.py
+        def report_startup():
+            elapsed = time.time() - float(os.environ[STARTUP_PROBE])
+            modules = ' '.join(sorted(m for m in sys.modules if '.' not in m))
+            print(f"[STARTUP] first_window {elapsed:.3f} {modules}", flush=True)
+            app.quit()
+        QtCore.QTimer.singleShot(0, report_startup)
     sys.exit(app.exec())
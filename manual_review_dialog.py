@@ -1,7 +1,158 @@
+import time
+from collections import defaultdict
+
+import numpy as np
 from PySide6 import QtWidgets, QtCore, QtGui
 
+from overlay import CIRCLE_RADIUS, base_image_path
+from tiled_viewer import FileImageSource, TiledImageView
+
+CHOICES = "ABCD"
+COLOR_DOUBTFUL = QtGui.QColor(255, 255, 0)
+COLOR_FILLED = QtGui.QColor(0, 200, 0)
+COLOR_MODIFIED = QtGui.QColor(0, 0, 255)
+
+
+class AnswerGridModel(QtCore.QAbstractTableModel):
+    """
+    200 x 4 answer grid: one row per question, one column per choice.
+    Only the visible cells are painted by the view, no widget per bubble.
+    """
+    bubbleToggled = QtCore.Signal(int)
+
+    def __init__(self, filled, douteux=None, parent=None, modified_questions=None):
+        super().__init__(parent)
+        self.filled = [bool(v) for v in filled]
+        self.initial = list(self.filled)
+        self.doubtful = {int(q) for q in (douteux or {})}
+        # questions corrigées lors d'une révision précédente (affichées comme modifiées)
+        self.modified_before = {int(q) for q in (modified_questions or [])}
+        self.n_questions = len(self.filled) // 4
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else self.n_questions
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else 4
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        i = index.row() * 4 + index.column()
+        if role == QtCore.Qt.DisplayRole:
+            return CHOICES[index.column()]
+        if role == QtCore.Qt.UserRole:
+            return self.filled[i]
+        if role == QtCore.Qt.BackgroundRole:
+            if self.was_modified(index.row() + 1):
+                return QtGui.QBrush(QtGui.QColor(200, 220, 255))
+            if index.row() + 1 in self.doubtful:
+                return QtGui.QBrush(QtGui.QColor(255, 245, 160))
+        return None
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role != QtCore.Qt.DisplayRole:
+            return None
+        if orientation == QtCore.Qt.Vertical:
+            return f"Q{section + 1}"
+        return CHOICES[section]
+
+    def flags(self, index):
+        return QtCore.Qt.ItemIsEnabled
+
+    def is_modified(self, q_num):
+        base = (q_num - 1) * 4
+        return self.filled[base:base + 4] != self.initial[base:base + 4]
+
+    def was_modified(self, q_num):
+        """Modified now or in an earlier review"""
+        return q_num in self.modified_before or self.is_modified(q_num)
+
+    def toggle(self, i):
+        self.filled[i] = not self.filled[i]
+        row = i // 4
+        self.dataChanged.emit(self.index(row, 0), self.index(row, 3))
+        self.bubbleToggled.emit(i)
+
+
+class BubbleDelegate(QtWidgets.QStyledItemDelegate):
+    """
+    Paints a bubble (letter in a circle, dark when filled) and toggles it on click
+    """
+
+    def paint(self, painter, option, index):
+        background = index.data(QtCore.Qt.BackgroundRole)
+        if background is not None:
+            painter.fillRect(option.rect, background)
+
+        filled = index.data(QtCore.Qt.UserRole)
+        radius = min(option.rect.width(), option.rect.height()) * 0.38
+        center = QtCore.QPointF(option.rect.center())
+
+        painter.save()
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.setPen(QtGui.QPen(QtGui.QColor(60, 60, 60), 1))
+        painter.setBrush(QtGui.QColor(40, 40, 40) if filled else QtCore.Qt.NoBrush)
+        painter.drawEllipse(center, radius, radius)
+        painter.setPen(QtCore.Qt.white if filled else QtCore.Qt.black)
+        painter.drawText(option.rect, QtCore.Qt.AlignCenter, index.data(QtCore.Qt.DisplayRole))
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QtCore.QEvent.MouseButtonRelease and event.button() == QtCore.Qt.LeftButton:
+            model.toggle(index.row() * 4 + index.column())
+            return True
+        return False
+
+    def sizeHint(self, option, index):
+        return QtCore.QSize(30, 24)
+
+
+class BubbleIndex:
+    """
+    Spatial hash of the bubble centres, to find the bubble under a click
+    """
+
+    def __init__(self, centers, cell=32):
+        self.cell = cell
+        self.centers = np.asarray(centers, dtype=int).reshape(-1, 2)
+        self.buckets = defaultdict(list)
+        for i, (x, y) in enumerate(self.centers):
+            self.buckets[(x // cell, y // cell)].append(i)
+
+    def nearest(self, x, y, max_dist=CIRCLE_RADIUS + 2):
+        cx, cy = int(x) // self.cell, int(y) // self.cell
+        best, best_d2 = None, max_dist ** 2
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for i in self.buckets.get((cx + dx, cy + dy), ()):
+                    px, py = self.centers[i]
+                    d2 = (px - x) ** 2 + (py - y) ** 2
+                    if d2 <= best_d2:
+                        best, best_d2 = i, d2
+        return best
+
+
+class BubbleView(TiledImageView):
+    """
+    Tiled view that pans on drag and reports simple clicks in scene coordinates
+    """
+    clicked = QtCore.Signal(QtCore.QPointF)
+
+    def mousePressEvent(self, event):
+        self._press_pos = event.position().toPoint()
+        super().mousePressEvent(event)
+
+    def mouseReleaseEvent(self, event):
+        super().mouseReleaseEvent(event)
+        pos = event.position().toPoint()
+        if event.button() == QtCore.Qt.LeftButton and (pos - self._press_pos).manhattanLength() < 4:
+            self.clicked.emit(self.mapToScene(pos))
+
+
 class ManualReviewDialog(QtWidgets.QDialog):
-    def __init__(self, image_path, filled, centers, parent=None):
+    def __init__(self, image_path, filled, centers, parent=None, douteux=None, modified_questions=None):
+        self._opened_at = time.perf_counter()
         super().__init__(parent)
         self.setWindowFlag(QtCore.Qt.WindowCloseButtonHint, False)
         self.setWindowModality(QtCore.Qt.ApplicationModal)
@@ -11,50 +162,55 @@ class ManualReviewDialog(QtWidgets.QDialog):
         self.image_path = image_path
         self.filled_init = filled
         self.centers = centers
-        self.checkboxes = {}
-        self.modified_questions = set()
+        self.modified_questions = set()   # modifiées pendant cette révision (les précédentes sont dans le modèle)
+        self.time_to_interactive_ms = None
 
-        layout = QtWidgets.QHBoxLayout(self)
+        self.model = AnswerGridModel(filled, douteux, self, modified_questions)
+        self.model.bubbleToggled.connect(self.on_bubble_toggled)
+        self.doubtful_rows = sorted(q - 1 for q in self.model.doubtful if 0 < q <= self.model.n_questions)
+        self.next_doubtful = 0
 
-        # Partie gauche
-        self.scene = QtWidgets.QGraphicsScene()
+        layout = QtWidgets.QHBoxLayout(self)
 
-        QtGui.QPixmapCache.clear()
-        QtCore.QCoreApplication.processEvents()
-        self.pixmap = QtGui.QPixmap(self.image_path)
+        # Partie gauche : image brute (aperçu puis tuiles) + repères vectoriels (cliquables)
+        self.view = BubbleView(FileImageSource(base_image_path(self.image_path)))
+        self.scene = self.view.scene()
 
-        self.scene.addPixmap(self.pixmap)
+        self.bubble_index = BubbleIndex(centers)
+        self.markers = {}
+        pen = QtGui.QPen(COLOR_DOUBTFUL, 2)
+        for q in self.model.doubtful:
+            for i in range((q - 1) * 4, min(q * 4, len(self.bubble_index.centers))):
+                x, y = self.bubble_index.centers[i]
+                self.scene.addEllipse(x - CIRCLE_RADIUS - 3, y - CIRCLE_RADIUS - 3,
+                                      2 * CIRCLE_RADIUS + 6, 2 * CIRCLE_RADIUS + 6, pen)
+        for i, v in enumerate(self.model.filled):
+            if v:
+                self.update_marker(i)
 
-        self.view = QtWidgets.QGraphicsView()
-        self.view.setScene(self.scene)
         self.view.setRenderHints(QtGui.QPainter.Antialiasing | QtGui.QPainter.SmoothPixmapTransform)
         self.view.setDragMode(QtWidgets.QGraphicsView.ScrollHandDrag)
+        self.view.clicked.connect(self.on_image_clicked)
         layout.addWidget(self.view, stretch=3)
 
-        # Partie droite : checkbox 200 questions
-        scroll = QtWidgets.QScrollArea()
-        scroll_widget = QtWidgets.QWidget()
-        form_layout = QtWidgets.QFormLayout(scroll_widget)
-
-        for q_num in range(1, 201):
-            hbox = QtWidgets.QHBoxLayout()
-            cb_list = []
-            base_idx = (q_num - 1) * 4
-            for i, letter in enumerate("ABCD"):
-                cb = QtWidgets.QCheckBox(letter)
-                if self.filled_init[base_idx + i]:
-                    cb.setChecked(True)
-                cb_list.append(cb)
-                hbox.addWidget(cb)
-            form_layout.addRow(f"Q{q_num}", hbox)
-            self.checkboxes[q_num] = cb_list
-
-        scroll.setWidget(scroll_widget)
-        scroll.setWidgetResizable(True)
-        layout.addWidget(scroll, stretch=2)
+        # Partie droite : grille virtuelle des 200 questions
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(self.model)
+        self.table.setItemDelegate(BubbleDelegate(self.table))
+        self.table.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.table.verticalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(24)
+        self.table.horizontalHeader().setSectionResizeMode(QtWidgets.QHeaderView.Fixed)
+        self.table.horizontalHeader().setDefaultSectionSize(34)
+        layout.addWidget(self.table, stretch=2)
 
         # validation et cancel
         btn_box = QtWidgets.QVBoxLayout()
+        self.doubtful_btn = QtWidgets.QPushButton(f"Next doubtful ({len(self.doubtful_rows)})")
+        self.doubtful_btn.setEnabled(bool(self.doubtful_rows))
+        self.doubtful_btn.clicked.connect(self.goto_next_doubtful)
+        btn_box.addWidget(self.doubtful_btn)
+
         validate_btn = QtWidgets.QPushButton("Confirm")
         validate_btn.clicked.connect(self.on_validate)
         btn_box.addWidget(validate_btn)
@@ -63,24 +219,65 @@ class ManualReviewDialog(QtWidgets.QDialog):
         btn_cancel = QtWidgets.QPushButton("Cancel")
         btn_cancel.clicked.connect(self.reject)
         btn_box.addWidget(btn_cancel)
+        btn_box.addStretch()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self.time_to_interactive_ms is None:
+            QtCore.QTimer.singleShot(0, self._on_interactive)
+
+    def _on_interactive(self):
+        self.time_to_interactive_ms = (time.perf_counter() - self._opened_at) * 1000
+        print(f"[PERF] Révision manuelle interactive en {self.time_to_interactive_ms:.0f} ms")
+        self.goto_next_doubtful()
+
+    def goto_next_doubtful(self):
+        """
+        Scroll the grid and the image to the next doubtful question
+        """
+        if not self.doubtful_rows:
+            return
+        row = self.doubtful_rows[self.next_doubtful % len(self.doubtful_rows)]
+        self.next_doubtful += 1
+        self.table.scrollTo(self.model.index(row, 0), QtWidgets.QAbstractItemView.PositionAtCenter)
+        if row * 4 < len(self.bubble_index.centers):
+            x, y = self.bubble_index.centers[row * 4]
+            self.view.centerOn(float(x), float(y))
+
+    def on_image_clicked(self, pos):
+        i = self.bubble_index.nearest(pos.x(), pos.y())
+        if i is not None and i < len(self.model.filled):
+            self.model.toggle(i)
+            self.table.scrollTo(self.model.index(i // 4, i % 4))
 
+    def on_bubble_toggled(self, i):
+        # la couleur dépend de l'état de toute la question
+        start = (i // 4) * 4
+        for j in range(start, start + 4):
+            self.update_marker(j)
 
+    def update_marker(self, i):
+        """
+        Show the current state of bubble i on the image
+        """
+        marker = self.markers.pop(i, None)
+        if marker is not None:
+            self.scene.removeItem(marker)
+        if not self.model.filled[i] or i >= len(self.bubble_index.centers):
+            return
+        x, y = self.bubble_index.centers[i]
+        color = COLOR_MODIFIED if self.model.was_modified(i // 4 + 1) else COLOR_FILLED
+        self.markers[i] = self.scene.addEllipse(x - CIRCLE_RADIUS, y - CIRCLE_RADIUS,
+                                                2 * CIRCLE_RADIUS, 2 * CIRCLE_RADIUS, QtGui.QPen(color, 2))
 
     def get_user_filled(self):
-        filled = []
-        for q_num in range(1, 201):
-            cb_list = self.checkboxes[q_num]
-            filled += [cb.isChecked() for cb in cb_list]
-        return filled
+        return list(self.model.filled)
 
     def on_validate(self):
         self.final_filled = self.get_user_filled()
 
-        for q_num in range(1, 201):
-            base_idx = (q_num - 1) * 4
-            old_vals = self.filled_init[base_idx:base_idx + 4]
-            new_vals = self.final_filled[base_idx:base_idx + 4]
-            if old_vals != new_vals:
+        for q_num in range(1, self.model.n_questions + 1):
+            if self.model.is_modified(q_num):
                 self.modified_questions.add(q_num)
 
-        self.accept()
\ No newline at end of file
+        self.accept()
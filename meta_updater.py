@@ -3,6 +3,8 @@ import json
 import os
 import unicodedata
 
+from jobs import INCOMPLETE_MARKER
+
 TOEIC_STRUCTURE = {
     "listening": {
         "range": (1, 100),
@@ -40,9 +42,7 @@ def get_toeic_table():
 
 def compute_detailed_scores(filled, correction_path, choices_per_question=4):
     try:
-        with open(correction_path, newline='') as f:
-            reader = csv.reader(f)
-            corrections = [(int(row[0]), row[1].strip().upper()) for row in reader]
+        corrections = load_corrections(correction_path)
 
         letter_to_index = {chr(65 + i): i for i in range(choices_per_question)}
 
@@ -116,3 +116,54 @@ def rename_folder_from_meta(copy_dir):
             print(f"[WARN] Dossier déjà existant ou inchangé.")
     except Exception as e:
         print(f"[ERREUR] Renommage dossier : {e}")
+
+
+def copy_summary(meta, folder_name="", model_version=None):
+    """
+    Summary of a copy shown in the project list: name, scaled total, doubtful flag and
+    stale flag (graded by a model older than model_version, the current one)
+    """
+    graded_by = meta.get("model_version")
+    return {
+        "nom": meta.get("nom", folder_name),
+        "scaled_total": meta.get("scaled_total", 0),
+        "doubtful": bool(meta.get("douteux")) and not meta.get("reviewed"),
+        "stale": model_version is not None and graded_by is not None and graded_by < model_version,
+        "model_version": graded_by,
+    }
+
+
+def iter_copy_dirs(project_path):
+    """
+    Yields (folder name, meta.json path) for every graded copy of a project.
+    Only stat calls: no file is opened.
+    """
+    with os.scandir(project_path) as it:
+        entries = sorted((e.name for e in it if e.is_dir() and not e.name.startswith(".")))
+    for name in entries:
+        meta_path = os.path.join(project_path, name, "meta.json")
+        # copie en cours de correction, ou laissée à moitié écrite par un arrêt (voir jobs.py)
+        if not os.path.exists(meta_path) or os.path.exists(os.path.join(project_path, name, INCOMPLETE_MARKER)):
+            continue
+        yield name, meta_path
+
+
+def iter_copy_metas(project_path):
+    """
+    Yields (folder name, metadata) for every graded copy of a project, one file at a time
+    """
+    for name, meta_path in iter_copy_dirs(project_path):
+        try:
+            with open(meta_path, "r") as f:
+                yield name, json.load(f)
+        except Exception as e:
+            print(f"[ERREUR] Lecture {meta_path} : {e}")
+
+
+def load_corrections(correction_path):
+    """
+    Reads a correction csv as a list of (question number, letter)
+    """
+    with open(correction_path, newline='') as f:
+        reader = csv.reader(f)
+        return [(int(row[0]), row[1].strip().upper()) for row in reader if len(row) >= 2]
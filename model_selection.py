@@ -0,0 +1,173 @@
+# model_selection.py
+"""
+Trains several candidate bubble classifiers on the same train / test split and
+reports, for each one, accuracy, false positives / negatives per class, model
+size, load time and batched inference time per patch. The chosen candidate can
+then be exported as circle_patch_classifier.joblib with its sidecar metadata.
+
+Usage : python model_selection.py [--store patch_store] [--report model_selection.json]
+                                  [--export auto|NAME] [--max-us 50]
+"""
+import argparse
+import io
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from circle_classifier import DEFAULT_META, MODEL_FILE, ThresholdClassifier, load_model_meta, save_model_meta
+from patch_features import PAGE_BATCH, compute_features, inference_us
+from train_circle_classifier import calibrate_cascade, load_store_dataset, load_strict_dataset
+
+# nom -> (jeu de caractéristiques, fabrique du modèle)
+CANDIDATES = {
+    "rf_100": ("raw", lambda: RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=42)),
+    "rf_50_d12": ("raw", lambda: RandomForestClassifier(n_estimators=50, max_depth=12, class_weight='balanced',
+                                                        random_state=42)),
+    "rf_20_d8": ("raw", lambda: RandomForestClassifier(n_estimators=20, max_depth=8, class_weight='balanced',
+                                                       random_state=42)),
+    "rf_50_down10": ("down10", lambda: RandomForestClassifier(n_estimators=50, class_weight='balanced',
+                                                              random_state=42)),
+    "hgb": ("raw", lambda: HistGradientBoostingClassifier(max_iter=100, random_state=42)),
+    "logreg_down10": ("down10", lambda: make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000,
+                                                                                           class_weight='balanced'))),
+    "logreg_radial": ("radial", lambda: make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000,
+                                                                                           class_weight='balanced'))),
+    "rf_50_compact": ("compact", lambda: RandomForestClassifier(n_estimators=50, class_weight='balanced',
+                                                                random_state=42)),
+    "logreg_compact": ("compact", lambda: make_pipeline(StandardScaler(), LogisticRegression(max_iter=1000,
+                                                                                             class_weight='balanced'))),
+    "threshold_dark": ("radial", lambda: ThresholdClassifier(column=-1)),
+}
+
+
+def class_errors(y_true, y_pred):
+    """
+    Accuracy and, for each class, its support, false positives and false negatives
+    """
+    report = {"accuracy": round(float((y_true == y_pred).mean()), 5) if len(y_true) else None}
+    for label, name in [(1, "filled"), (0, "empty")]:
+        report[name] = {
+            "support": int((y_true == label).sum()),
+            "false_positives": int(((y_pred == label) & (y_true != label)).sum()),
+            "false_negatives": int(((y_pred != label) & (y_true == label)).sum()),
+        }
+    return report
+
+
+def evaluate_candidate(name, X_train, y_train, X_test, y_test):
+    features, factory = CANDIDATES[name]
+    train_patches = X_train.reshape(-1, 30, 30)
+    test_patches = X_test.reshape(-1, 30, 30)
+
+    model = factory()
+    start = time.perf_counter()
+    model.fit(compute_features(train_patches, features), y_train)
+    fit_s = time.perf_counter() - start
+
+    y_pred = model.predict(compute_features(test_patches, features))
+
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    size = buffer.tell()
+    buffer.seek(0)
+    start = time.perf_counter()
+    joblib.load(buffer)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    result = {
+        "name": name,
+        "features": features,
+        **class_errors(y_test, y_pred),
+        "model_bytes": size,
+        "load_ms": round(load_ms, 2),
+        "inference_us_per_patch": round(inference_us(model, test_patches, features), 3),
+        "fit_seconds": round(fit_s, 2),
+    }
+    return model, result
+
+
+def choose(results, max_us=None):
+    """
+    Most accurate candidate within the latency budget, the faster one on ties
+    """
+    pool = [r for r in results if max_us is None or r["inference_us_per_patch"] <= max_us] or results
+    return min(pool, key=lambda r: (-r["accuracy"], r["inference_us_per_patch"]))["name"]
+
+
+def export_model(model, result, X_all, output=MODEL_FILE):
+    """
+    Write the model atomically, then its sidecar (features, metrics) and a fresh cascade calibration
+    """
+    tmp_file = output + ".tmp"
+    joblib.dump(model, tmp_file)
+    os.replace(tmp_file, output)
+
+    meta = load_model_meta(output)
+    meta["version"] = int(meta.get("version", 1)) + 1
+    meta["features"] = result["features"]
+    meta["candidate"] = result["name"]
+    meta["selection"] = {k: v for k, v in result.items() if k not in ("name", "features")}
+    meta.pop("n_estimators", None)
+    if hasattr(model, "n_estimators"):
+        meta["n_estimators"] = model.n_estimators
+    # les seuils de l'ancien modèle ne valent plus rien
+    meta["cascade"] = dict(DEFAULT_META["cascade"])
+    save_model_meta(meta, output)
+    print(f"[✔] {result['name']} exporté dans : {output} (version {meta['version']})")
+    calibrate_cascade(model, X_all, model_file=output)
+
+
+def print_table(results):
+    print(f"\n{'modèle':<16}{'exactitude':>11}{'FP rempli':>10}{'FN rempli':>10}"
+          f"{'taille (ko)':>12}{'charg. (ms)':>12}{'µs/patch':>10}")
+    for r in results:
+        print(f"{r['name']:<16}{r['accuracy']:>11.4f}{r['filled']['false_positives']:>10}"
+              f"{r['filled']['false_negatives']:>10}{r['model_bytes'] / 1024:>12.0f}"
+              f"{r['load_ms']:>12.1f}{r['inference_us_per_patch']:>10.2f}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Comparaison des classifieurs de cases (exactitude / latence)")
+    parser.add_argument("--store", default=None,
+                        help="base de patchs (patch_store.py) à utiliser à la place des dossiers PNG")
+    parser.add_argument("--candidates", nargs="+", default=list(CANDIDATES), choices=list(CANDIDATES))
+    parser.add_argument("--report", default="model_selection.json")
+    parser.add_argument("--export", default=None, metavar="auto|NAME",
+                        help="exporter le modèle choisi (auto : le plus exact sous --max-us)")
+    parser.add_argument("--max-us", type=float, default=None, help="budget d'inférence par patch (µs)")
+    parser.add_argument("--output", default=MODEL_FILE)
+    args = parser.parse_args()
+
+    if args.store:
+        X_train, X_test, y_train, y_test = load_store_dataset(args.store)
+    else:
+        X_train, X_test, y_train, y_test = load_strict_dataset()
+
+    models, results = {}, []
+    for name in args.candidates:
+        print(f"[INFO] Entraînement de {name}…")
+        models[name], result = evaluate_candidate(name, X_train, y_train, X_test, y_test)
+        results.append(result)
+    print_table(results)
+
+    chosen = None
+    if args.export:
+        chosen = choose(results, args.max_us) if args.export == "auto" else args.export
+        if chosen not in models:
+            raise SystemExit(f"[ERREUR] Candidat non évalué : {chosen}")
+
+    with open(args.report, "w") as f:
+        json.dump({"train": len(y_train), "test": len(y_test), "page_batch": PAGE_BATCH,
+                   "chosen": chosen, "candidates": results}, f, indent=2)
+    print(f"[INFO] Rapport écrit dans {args.report}")
+
+    if chosen:
+        export_model(models[chosen], next(r for r in results if r["name"] == chosen),
+                     np.concatenate([X_train, X_test]), args.output)
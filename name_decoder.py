@@ -0,0 +1,60 @@
+# name_decoder.py
+import numpy as np
+
+from constants import ACCENT_COMBINATIONS, ACCENTS, LETTERS
+
+NAME_ROWS = len(ACCENTS) + len(LETTERS)   # 7 lignes d'accents puis 28 lignes de lettres
+
+# NAME_LUT[a, l] : caractère pour l'accent a (0 = aucun, puis ACCENTS) et la lettre l
+NAME_LUT = np.array([[ACCENT_COMBINATIONS.get((accent, letter), accent + letter) for letter in LETTERS]
+                     for accent in [""] + ACCENTS], dtype=object)
+
+
+def name_grid(probas, n_cols):
+    """
+    Dense (35, n_cols) probability matrix of the name grid. The centres of the
+    name block come row by row (see detect_and_align_circles), so this is a reshape;
+    missing rows are left empty.
+    """
+    probas = np.asarray(probas, dtype=float)
+    grid = np.zeros((NAME_ROWS, n_cols))
+    if n_cols == 0:
+        return grid
+    rows = probas[:len(probas) - len(probas) % n_cols].reshape(-1, n_cols)[:NAME_ROWS]
+    grid[:len(rows)] = rows
+    return grid
+
+
+def _top_two(block):
+    ordered = np.sort(block, axis=0)
+    second = ordered[-2] if len(block) > 1 else np.zeros(block.shape[1])
+    return block.argmax(axis=0), ordered[-1], second
+
+
+def decode_name(grid, threshold=0.5, margin=0.2):
+    """
+    Decode the name grid column by column
+    :param grid: (35, n_cols) probabilities
+    :param threshold: probability above which a bubble is marked
+    :param margin: gap with the runner-up under which a choice is uncertain
+    :return: (name, chars, confidence) where chars / confidence have one entry per column
+    """
+    accents, letters = grid[:len(ACCENTS)], grid[len(ACCENTS):]
+    let_idx, let_top, let_second = _top_two(letters)
+    acc_idx, acc_top, acc_second = _top_two(accents)
+
+    has_letter = let_top > threshold
+    has_accent = acc_top > threshold
+    chars = np.where(has_letter, NAME_LUT[np.where(has_accent, acc_idx + 1, 0), let_idx], " ")
+
+    # confiance : écart au second choix pour une case cochée, distance au seuil pour une colonne vide
+    letter_conf = np.where(has_letter, let_top - let_second, 1.0 - let_top)
+    accent_conf = np.where(has_accent, acc_top - acc_second, 1.0 - acc_top)
+    confidence = np.clip(np.where(has_letter, np.minimum(letter_conf, accent_conf), letter_conf), 0.0, 1.0)
+
+    uncertain = has_letter & (confidence < margin)
+    if uncertain.any():
+        print(f"[WARN] Nom : {int(uncertain.sum())} caractère(s) incertain(s)")
+
+    name = " ".join("".join(chars).strip().split())
+    return name, chars.tolist(), confidence.tolist()
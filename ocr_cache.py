@@ -0,0 +1,92 @@
+# ocr_cache.py
+"""
+OCR of training patches, cached by patch content in a SQLite file and
+spread over a process pool (each Tesseract call starts a process, so the
+work is CPU bound and runs in parallel across cores).
+"""
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+from patch_store import patch_hash
+
+OCR_CONFIG = '--psm 10'   # un seul caractère
+
+
+class OCRCache:
+    """
+    Persistent {(patch hash, lang, config): text} store
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS ocr ("
+                          "hash TEXT, lang TEXT, config TEXT, text TEXT, PRIMARY KEY (hash, lang, config))")
+
+    def get_many(self, hashes, lang, config=OCR_CONFIG):
+        found = {}
+        hashes = list(hashes)
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT hash, text FROM ocr WHERE lang = ? AND config = ? AND hash IN ({','.join('?' * len(chunk))})",
+                [lang, config, *chunk])
+            found.update(rows)
+        return found
+
+    def put_many(self, results, lang, config=OCR_CONFIG):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO ocr VALUES (?, ?, ?, ?)",
+                                  [(h, lang, config, text) for h, text in results])
+
+    def close(self):
+        self.conn.close()
+
+
+def _ocr_batch(batch, lang, config):
+    """
+    Runs in a worker process: OCR of a list of (hash, patch)
+    """
+    import pytesseract
+
+    results = []
+    for h, img in batch:
+        try:
+            results.append((h, pytesseract.image_to_string(img, config=config, lang=lang).strip()))
+        except pytesseract.TesseractError as e:
+            print(f"[ERROR] OCR failed on {h} : {e}")
+    return results
+
+
+def ocr_patches(images, cache_path, lang='fra', config=OCR_CONFIG, workers=None, batch_size=64):
+    """
+    Text recognized in each patch, from the cache when already known
+    :param images: list of 30x30 grayscale patches
+    :return: list of texts (None when OCR failed), in the order of images
+    """
+    from tqdm import tqdm
+
+    hashes = [patch_hash(img) for img in images]
+    cache = OCRCache(cache_path)
+    try:
+        texts = cache.get_many(set(hashes), lang, config)
+        todo = {}
+        for h, img in zip(hashes, images):
+            if h not in texts and h not in todo:
+                todo[h] = img
+        print(f"[INFO] OCR : {len(hashes) - len(todo)} patchs en cache, {len(todo)} à reconnaître")
+
+        items = list(todo.items())
+        batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        if batches:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_ocr_batch, batch, lang, config) for batch in batches]
+                for future in tqdm(futures, desc="OCR", unit="lot"):
+                    results = future.result()
+                    # enregistré au fil de l'eau : une interruption ne perd que les lots en cours
+                    cache.put_many(results, lang, config)
+                    texts.update(results)
+    finally:
+        cache.close()
+    return [texts.get(h) for h in hashes]
@@ -0,0 +1,125 @@
+# overlay.py
+import json
+import threading
+from collections import OrderedDict
+from os.path import basename, dirname, exists, getmtime, join
+
+import cv2
+import numpy as np
+
+COLOR_DOUBTFUL = (0, 255, 255)  # jaune
+COLOR_FILLED = (0, 255, 0)      # vert
+COLOR_MODIFIED = (255, 0, 0)    # bleu
+CIRCLE_RADIUS = 12
+
+
+def question_mask(n_centers, questions):
+    """
+    Boolean mask over the centres belonging to the given question numbers (4 centres per question)
+    """
+    q_of_center = np.arange(n_centers) // 4 + 1
+    return np.isin(q_of_center, np.fromiter((int(q) for q in questions or ()), dtype=int))
+
+
+def render_overlay(img, centers, filled, doubtful=None, modified=None):
+    """
+    Draw the review overlay in a single pass over the marked centres only
+    :param img: block image (gray or BGR), left untouched
+    :param centers: (n, 2) bubble centres
+    :param filled: n booleans
+    :param doubtful: n booleans, drawn in yellow
+    :param modified: n booleans, filled ones drawn in blue instead of green
+    :return: new BGR image
+    """
+    output = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR) if img.ndim == 2 else img.copy()
+    centers = np.asarray(centers, dtype=int).reshape(-1, 2)
+    n = len(centers)
+    filled = np.asarray(filled, dtype=bool)[:n]
+    doubtful = np.zeros(n, bool) if doubtful is None else np.asarray(doubtful, dtype=bool)[:n]
+    modified = np.zeros(n, bool) if modified is None else np.asarray(modified, dtype=bool)[:n]
+
+    for color, mask in ((COLOR_DOUBTFUL, doubtful),
+                        (COLOR_MODIFIED, filled & modified),
+                        (COLOR_FILLED, filled & ~modified)):
+        for x, y in centers[mask]:
+            cv2.circle(output, (int(x), int(y)), CIRCLE_RADIUS, color, 2)
+    return output
+
+
+def base_image_path(path):
+    """
+    Image without overlay for a block: older copies have the overlay burnt into
+    `_questions` / `_name` and keep the raw block in a `_clean` file.
+    """
+    for tag in ("_questions", "_name"):
+        if tag in basename(path) and f"{tag}_clean" not in basename(path):
+            clean = join(dirname(path), basename(path).replace(tag, f"{tag}_clean"))
+            return clean if exists(clean) else path
+    return path
+
+
+class OverlayCache:
+    """
+    In-memory LRU of rendered overlays, keyed by base image and review state,
+    so a block is only rendered again when its image or its answers change.
+    """
+
+    def __init__(self, max_entries=24):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, image_path, centers, filled, douteux_questions=(), modified_questions=(), hide_douteux=False):
+        base = base_image_path(image_path)
+        centers = np.asarray(centers, dtype=int).reshape(-1, 2)
+        doubtful = () if hide_douteux else tuple(sorted(int(q) for q in douteux_questions or ()))
+        modified = tuple(sorted(int(q) for q in modified_questions or ()))
+        key = (base, getmtime(base), centers.tobytes(), np.packbits(np.asarray(filled, dtype=bool)).tobytes(),
+               doubtful, modified)
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                return self.entries[key]
+
+        img = cv2.imread(base, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            return None
+        rendered = render_overlay(img, centers, filled,
+                                  question_mask(len(centers), doubtful),
+                                  question_mask(len(centers), modified))
+
+        with self.lock:
+            self.entries[key] = rendered
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return rendered
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+overlay_cache = OverlayCache()
+
+
+def overlay_for_block(path):
+    """
+    Rendered overlay of a `_questions` or `_name` block from its copy metadata,
+    or None when the file is not a block or has no detection data
+    """
+    name = basename(path).lower()
+    meta_path = join(dirname(path), "meta.json")
+    if "_clean" in name or not exists(meta_path):
+        return None
+
+    with open(meta_path, "r") as f:
+        meta = json.load(f)
+
+    if "_questions" in name and meta.get("centers"):
+        return overlay_cache.get(path, meta["centers"], meta["filled"],
+                                 douteux_questions=meta.get("douteux", {}).keys(),
+                                 modified_questions=meta.get("modified_questions", []))
+    if "_name" in name and meta.get("name_centers"):
+        return overlay_cache.get(path, meta["name_centers"], meta["name_filled"])
+    return None
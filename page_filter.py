@@ -0,0 +1,191 @@
+# page_filter.py
+"""
+Cheap pre-filter run on a thumbnail before the alignment: blank pages,
+pages that are not answer sheets and pages scanned upside down are detected
+in a few milliseconds instead of going through SIFT, Hough and the classifier.
+A page clearly far from every template is rejected on its hash; a page in the
+band between both thresholds is aligned with the nearest template and rejected
+only if that alignment fails.
+
+Calibration : python page_filter.py calibrate SHEETS_DIR [SHEETS_DIR…] [--foreign DIR…]
+"""
+import argparse
+import json
+import os
+import time
+from os.path import basename, join
+
+import cv2
+import numpy as np
+
+from constants import TEMPLATES_DIR
+from jobs import ingest_dir
+from templates import FOREIGN_HASH_DISTANCE, HASH_SIZE, MAX_HASH_DISTANCE
+
+MIN_INK = 0.002         # part minimale de pixels encrés d'une feuille imprimée
+ORIENTATION_MARGIN = 8  # bits d'écart minimum pour préférer la page retournée
+FOREIGN_MARGIN = 3      # bits ajoutés à la feuille la plus éloignée pour conseiller le seuil étranger
+
+SKIP_REASONS = {
+    "unreadable": "image illisible",
+    "blank": "page blanche",
+    "foreign": "pas une feuille de réponses",
+    "alignment": "alignement impossible",
+}
+
+
+class PageSkipped(Exception):
+    """
+    Raised by the worker for a page rejected by the pre-filter
+    """
+
+    def __init__(self, report):
+        super().__init__(f"{report['file']} : {SKIP_REASONS.get(report['status'], report['status'])}")
+        self.report = report
+
+
+def load_thumbnail(path):
+    """
+    Page decoded at 1/8 resolution (the JPEG decoder skips the full-size decode)
+    """
+    return cv2.imread(path, cv2.IMREAD_REDUCED_GRAYSCALE_8)
+
+
+def ink_coverage(thumb):
+    """
+    Share of pixels clearly darker than the paper
+    """
+    paper = float(np.median(thumb))
+    return float((thumb < 0.6 * paper).mean())
+
+
+def check_page(path, registry, max_distance=MAX_HASH_DISTANCE, foreign_distance=FOREIGN_HASH_DISTANCE):
+    """
+    Classify a page before alignment
+    :return: report dict with status "ok", "rotated" (sheet upside down), "uncertain" (between
+             max_distance and foreign_distance: graded with the nearest template, rejected if it
+             cannot be aligned), "blank", "foreign" (beyond foreign_distance) or "unreadable",
+             the ink coverage, the nearest template and its distance
+    """
+    start = time.perf_counter()
+    report = {"file": basename(path), "status": "unreadable", "ink": None, "template": None, "distance": None}
+    thumb = load_thumbnail(path)
+    if thumb is not None:
+        report["ink"] = round(ink_coverage(thumb), 4)
+        if report["ink"] < MIN_INK:
+            report["status"] = "blank"
+        else:
+            upright, d_up = registry.nearest(thumb)
+            flipped, d_flip = registry.nearest(cv2.rotate(thumb, cv2.ROTATE_180))
+            flip = upright is not None and d_flip + ORIENTATION_MARGIN < d_up
+            distance = d_flip if flip else d_up
+            if upright is None or distance > foreign_distance:
+                report.update(status="foreign", distance=distance)
+            elif distance <= max_distance:
+                report.update(status="rotated" if flip else "ok",
+                              template=(flipped if flip else upright).id, distance=distance)
+            else:
+                # zone où feuilles très déformées et autres documents se recouvrent : l'alignement tranche
+                report.update(status="uncertain", template=(flipped if flip else upright).id,
+                              distance=distance, rotated=flip)
+                print(f"[WARN] {report['file']} : écart {distance} > {max_distance}, "
+                      f"essai avec le modèle le plus proche")
+    report["ms"] = round((time.perf_counter() - start) * 1000, 2)
+    return report
+
+
+def record_skipped(project_path, report):
+    """
+    Append a rejected page to <project>/.ingest/skipped.jsonl
+    """
+    try:
+        with open(join(ingest_dir(project_path), "skipped.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({**report, "at": time.strftime("%Y-%m-%dT%H:%M:%S")}) + "\n")
+    except Exception as e:
+        print(f"[WARN] Rapport de page ignorée non enregistré : {e}")
+
+
+# === CALIBRATION DU SEUIL ===
+
+def page_distances(folders, registry):
+    """
+    dHash distance (best orientation) of every image of the folders to its nearest template
+    :return: distances array, number of pages judged blank before hashing
+    """
+    distances, blank = [], 0
+    unbounded = HASH_SIZE * HASH_SIZE
+    for folder in folders:
+        for fname in sorted(os.listdir(folder)):
+            if not fname.lower().endswith((".png", ".jpg", ".jpeg")):
+                continue
+            report = check_page(join(folder, fname), registry, max_distance=unbounded, foreign_distance=unbounded)
+            if report["status"] == "blank":
+                blank += 1
+            elif report["distance"] is not None:
+                distances.append(report["distance"])
+    return np.array(distances, dtype=int), blank
+
+
+def calibrate(sheet_dirs, foreign_dirs=(), registry=None):
+    """
+    Distances of genuine sheets (real scans, synthetic sheets swept in skew and noise) and
+    of other documents, and the two suggested thresholds: sheets below the first are graded
+    directly, pages above the second are rejected on the thumbnail, the band in between is
+    settled by alignment
+    """
+    if registry is None:
+        from templates import default_registry
+        registry = default_registry()
+    genuine, genuine_blank = page_distances(sheet_dirs, registry)
+    foreign, _ = page_distances(foreign_dirs, registry)
+    if not len(genuine):
+        raise ValueError("Aucune feuille de réponses lisible")
+
+    report = {
+        "current_thresholds": {"sheet": MAX_HASH_DISTANCE, "foreign": FOREIGN_HASH_DISTANCE},
+        "genuine": {"pages": len(genuine), "blank": genuine_blank,
+                    "p50": float(np.percentile(genuine, 50)), "p95": float(np.percentile(genuine, 95)),
+                    "max": int(genuine.max()),
+                    "above_sheet": int((genuine > MAX_HASH_DISTANCE).sum()),
+                    "above_foreign": int((genuine > FOREIGN_HASH_DISTANCE).sum())},
+        "foreign": None,
+        # la plupart des feuilles passent sans alignement complet
+        "suggested_sheet": int(np.percentile(genuine, 95)),
+        # aucune feuille connue n'est rejetée sur la vignette
+        "suggested_foreign": int(genuine.max()) + FOREIGN_MARGIN,
+    }
+    if len(foreign):
+        report["foreign"] = {"pages": len(foreign), "min": int(foreign.min()),
+                             "p50": float(np.percentile(foreign, 50)),
+                             "in_band": int(((foreign > report["suggested_sheet"])
+                                             & (foreign <= report["suggested_foreign"])).sum()),
+                             "below_sheet": int((foreign <= report["suggested_sheet"]).sum())}
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Calibration du seuil d'empreinte du pré-filtre")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="distances des feuilles réelles / synthétiques et des autres documents")
+    cal.add_argument("sheet_dirs", nargs="+")
+    cal.add_argument("--foreign", nargs="*", default=[], help="dossiers de pages qui ne sont pas des feuilles")
+    cal.add_argument("--output", default=join(TEMPLATES_DIR, "hash_calibration.json"))
+    cal.add_argument("--note", default="", help="provenance des pages (scanner, lot, synthétiques...)")
+    args = parser.parse_args()
+
+    result = calibrate(args.sheet_dirs, args.foreign)
+    with open(args.output, "w") as f:
+        json.dump({**result, "sheet_dirs": args.sheet_dirs, "foreign_dirs": args.foreign, "note": args.note,
+                   "at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+    g = result["genuine"]
+    print(f"[INFO] Feuilles : {g['pages']} ({g['blank']} jugées blanches), écart p50 {g['p50']:.0f}, "
+          f"p95 {g['p95']:.0f}, max {g['max']}")
+    if g["blank"]:
+        print(f"[WARN] {g['blank']} feuille(s) sous le seuil d'encre MIN_INK={MIN_INK}")
+    if result["foreign"]:
+        fo = result["foreign"]
+        print(f"[INFO] Autres documents : {fo['pages']}, écart min {fo['min']}, {fo['in_band']} dans la zone "
+              f"d'alignement, {fo['below_sheet']} sous le seuil feuille")
+    print(f"[INFO] Seuils conseillés : feuille {result['suggested_sheet']}, étranger {result['suggested_foreign']} "
+          f"(actuels {MAX_HASH_DISTANCE} / {FOREIGN_HASH_DISTANCE})")
+    print(f"[INFO] Calibration écrite dans {args.output}")
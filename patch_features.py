@@ -0,0 +1,154 @@
+# patch_features.py
+import time
+
+import numpy as np
+
+PATCH_SIZE = 30
+INNER_RADIUS = 9      # disque intérieur de la case (rayon du cercle imprimé ≈ 12 px)
+OUTER_RADIUS = 14     # anneau extérieur : le cercle imprimé et ce qui déborde
+DARK_LEVEL = 128      # niveau de gris sous lequel un pixel compte comme encré
+PAGE_BATCH = 800      # 200 questions x 4 cases : un appel au modèle par page
+
+
+def extract_patches(gray, centers, size=PATCH_SIZE):
+    """
+    Cut the size x size patches around every centre in one indexing operation
+    :param gray: grayscale image
+    :param centers: list of (x, y)
+    :return: (N, size, size) uint8 patches and (N,) mask of the patches fully inside the image
+    """
+    pts = np.asarray(centers, dtype=int).reshape(-1, 2)
+    h, w = gray.shape[:2]
+    r = size // 2
+    valid = (pts[:, 0] - r >= 0) & (pts[:, 1] - r >= 0) & (pts[:, 0] + r <= w) & (pts[:, 1] + r <= h)
+
+    offsets = np.arange(-r, size - r)
+    xs = np.clip(pts[:, 0, None] + offsets, 0, w - 1)   # (N, size)
+    ys = np.clip(pts[:, 1, None] + offsets, 0, h - 1)
+    patches = gray[ys[:, :, None], xs[:, None, :]]
+    patches[~valid] = 255
+    return patches, valid
+
+
+def disk_mask(size=PATCH_SIZE, radius=INNER_RADIUS):
+    yy, xx = np.mgrid[:size, :size]
+    c = size // 2
+    return (xx - c) ** 2 + (yy - c) ** 2 <= radius ** 2
+
+
+_inner_mask = disk_mask()
+
+
+def inner_disk_stats(patches):
+    """
+    Mean grey level and dark-pixel ratio of the inner disk of every patch
+    :param patches: (N, 30, 30) array
+    :return: two (N,) arrays
+    """
+    inner = patches[:, _inner_mask]
+    return inner.mean(axis=1), (inner < DARK_LEVEL).mean(axis=1)
+
+
+def downsample(patches, factor=3):
+    """
+    Area downsampling (30x30 -> 10x10 by default) of every patch
+    """
+    n, size = len(patches), patches.shape[1] // factor
+    return patches.reshape(n, size, factor, size, factor).mean(axis=(2, 4), dtype=np.float32)
+
+
+def _ring_matrix(size=PATCH_SIZE, width=3):
+    """
+    (size*size, n_rings) matrix averaging the pixels of each concentric ring
+    """
+    yy, xx = np.mgrid[:size, :size]
+    c = size // 2
+    ring = (np.sqrt((xx - c) ** 2 + (yy - c) ** 2) // width).astype(int).ravel()
+    n_rings = c // width
+    m = np.zeros((size * size, n_rings), dtype=np.float32)
+    inside = ring < n_rings
+    m[np.flatnonzero(inside), ring[inside]] = 1.0
+    return m / m.sum(axis=0)
+
+
+_rings = _ring_matrix()
+
+
+def ring_means(patches):
+    """
+    Mean grey level of the concentric rings (3 px wide) of every patch, in one product
+    """
+    return patches.reshape(len(patches), -1).astype(np.float32) @ _rings
+
+
+def radial_features(patches):
+    mean, dark = inner_disk_stats(patches)
+    return np.column_stack([ring_means(patches), mean, dark]).astype(np.float32)
+
+
+def _downsample_matrix(size=PATCH_SIZE, factor=3):
+    """
+    (size*size, (size/factor)^2) matrix doing the area downsampling as a product
+    """
+    yy, xx = np.mgrid[:size, :size]
+    cell = ((yy // factor) * (size // factor) + xx // factor).ravel()
+    m = np.zeros((size * size, (size // factor) ** 2), dtype=np.float32)
+    m[np.arange(size * size), cell] = 1.0 / factor ** 2
+    return m
+
+
+def _dark_ratio_matrix(size=PATCH_SIZE):
+    """
+    (size*size, 2) matrix giving the inner-disk and outer-ring dark ratios from the dark-pixel mask
+    """
+    inner = disk_mask(size, INNER_RADIUS).ravel()
+    outer = disk_mask(size, OUTER_RADIUS).ravel() & ~inner
+    m = np.column_stack([inner, outer]).astype(np.float32)
+    return m / m.sum(axis=0)
+
+
+# 100 moyennes 3x3 + 5 anneaux sur les niveaux de gris, 2 taux d'encre sur le masque sombre
+_compact_gray = np.hstack([_downsample_matrix(), _rings])
+_compact_dark = _dark_ratio_matrix()
+
+
+def compact_features(patches):
+    """
+    107 features per patch (10x10 downsampling, ring means, inner / outer dark ratios),
+    two matrix products for the whole batch
+    """
+    flat = patches.reshape(len(patches), -1)
+    return np.hstack([flat.astype(np.float32) @ _compact_gray,
+                      (flat < DARK_LEVEL).astype(np.float32) @ _compact_dark])
+
+
+FEATURE_SETS = {
+    "raw": lambda patches: patches.reshape(len(patches), -1),
+    "down10": lambda patches: downsample(patches).reshape(len(patches), -1),
+    "radial": radial_features,
+    "compact": compact_features,
+}
+
+
+def compute_features(patches, name="raw"):
+    """
+    Feature matrix of a batch of patches for the classifier
+    :param patches: (N, 30, 30) uint8
+    :param name: key of FEATURE_SETS (stored in the model sidecar)
+    """
+    if name not in FEATURE_SETS:
+        raise ValueError(f"Jeu de caractéristiques inconnu : {name}")
+    return FEATURE_SETS[name](np.asarray(patches).reshape(-1, PATCH_SIZE, PATCH_SIZE))
+
+
+def inference_us(model, patches, features, batch=PAGE_BATCH, repeat=3):
+    """
+    Best-of-repeat time per patch (µs) of features + predict_proba, by batches of one page
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for i in range(0, len(patches), batch):
+            model.predict_proba(compute_features(patches[i:i + batch], features))
+        best = min(best, time.perf_counter() - start)
+    return best / max(len(patches), 1) * 1e6
@@ -0,0 +1,258 @@
+# patch_store.py
+"""
+Packed dataset of 30x30 bubble patches for the classifier.
+
+All patches live in one uint8 file (patches.u8, appended chunk by chunk and
+read back with a single np.memmap) and a side table (index.csv) gives, for
+each row, its label, source sheet, position in the aligned block, provenance
+and content hash. Deduplication and stratified sampling only read the table.
+
+Usage : python patch_store.py convert dataset_patches patch_store
+"""
+import argparse
+import csv
+import hashlib
+import os
+from os.path import exists, getsize, join
+
+import cv2
+import numpy as np
+
+PATCH_SIZE = 30
+PATCH_BYTES = PATCH_SIZE * PATCH_SIZE
+TABLE_COLUMNS = ["label", "sheet", "x", "y", "source", "hash"]
+
+# dossiers PNG historiques (voir train_circle_classifier.save_patch) et leur label
+PNG_FOLDERS = {"filled": 1, "empty": 0, "empty_with_text": 0, "empty_balanced_chars": 0}
+
+
+def patch_hash(patch):
+    return hashlib.blake2b(np.ascontiguousarray(patch, dtype=np.uint8).tobytes(), digest_size=8).hexdigest()
+
+
+class PatchStore:
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.data_path = join(root, "patches.u8")
+        self.table_path = join(root, "index.csv")
+        self._table = None
+        self._table_dirty = False
+
+    def __len__(self):
+        return len(self.table()["label"])
+
+    def table(self):
+        """
+        Side table as numpy columns (label, sheet, x, y, source, hash), read once
+        """
+        if self._table is None:
+            rows, complete = [], True
+            if exists(self.table_path):
+                with open(self.table_path, newline="", encoding="utf-8") as f:
+                    text = f.read()
+                complete = not text or text.endswith("\n")
+                rows = list(csv.DictReader(text.splitlines()))
+            # une écriture interrompue peut laisser une dernière ligne tronquée, des patchs sans
+            # ligne (octets en fin de patches.u8, ignorés) ou des lignes sans patch (coupées)
+            n_valid = len(rows) if complete else len(rows) - 1
+            n_patches = getsize(self.data_path) // PATCH_BYTES if exists(self.data_path) else 0
+            n = min(n_valid, n_patches)
+            self._table_dirty = n != len(rows) or not complete
+            rows = rows[:n]
+            self._table = {
+                "label": np.array([int(r["label"]) for r in rows], dtype=np.int8),
+                "sheet": np.array([r["sheet"] for r in rows], dtype=object),
+                "x": np.array([int(r["x"]) for r in rows], dtype=np.int32),
+                "y": np.array([int(r["y"]) for r in rows], dtype=np.int32),
+                "source": np.array([r["source"] for r in rows], dtype=object),
+                "hash": np.array([r["hash"] for r in rows], dtype=object),
+            }
+        return self._table
+
+    def patches(self):
+        """
+        All patches as a read-only (N, 30, 30) memory map
+        """
+        n = len(self)
+        if n == 0:
+            return np.zeros((0, PATCH_SIZE, PATCH_SIZE), dtype=np.uint8)
+        return np.memmap(self.data_path, dtype=np.uint8, mode="r", shape=(n, PATCH_SIZE, PATCH_SIZE))
+
+    def append(self, patches, labels, sheet="", positions=None, source="", dedup=True):
+        """
+        Append patches to the store
+        :param patches: (N, 30, 30) uint8
+        :param labels: N labels (1 filled, 0 empty)
+        :param sheet: source sheet (copy folder, file name…), one value or one per patch
+        :param positions: (N, 2) centres in the aligned block
+        :param source: provenance (png import, review correction…)
+        :param dedup: skip patches already stored with the same label
+        :return: number of appended patches
+        """
+        patches = np.ascontiguousarray(patches, dtype=np.uint8).reshape(-1, PATCH_SIZE, PATCH_SIZE)
+        n = len(patches)
+        labels = np.broadcast_to(np.asarray(labels, dtype=np.int8), (n,))
+        sheets = np.broadcast_to(np.asarray(sheet, dtype=object), (n,))
+        sources = np.broadcast_to(np.asarray(source, dtype=object), (n,))
+        positions = np.full((n, 2), -1) if positions is None else np.asarray(positions, dtype=int).reshape(-1, 2)
+        hashes = [patch_hash(p) for p in patches]
+
+        table = self.table()
+        keep = np.ones(n, dtype=bool)
+        if dedup:
+            known = set(zip(table["hash"].tolist(), table["label"].tolist()))
+            for i, key in enumerate(zip(hashes, labels.tolist())):
+                if key in known:
+                    keep[i] = False
+                known.add(key)
+        if not keep.any():
+            return 0
+
+        # patchs d'abord, table ensuite ; une écriture interrompue précédente est d'abord
+        # effacée, sinon la ligne i serait associée au mauvais patch
+        self._reconcile(len(table["label"]))
+        with open(self.data_path, "ab") as f:
+            f.write(patches[keep].tobytes())
+        new_table = not exists(self.table_path) or getsize(self.table_path) == 0
+        with open(self.table_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if new_table:
+                writer.writerow(TABLE_COLUMNS)
+            for i in np.flatnonzero(keep):
+                writer.writerow([int(labels[i]), sheets[i], int(positions[i, 0]), int(positions[i, 1]),
+                                 sources[i], hashes[i]])
+        self._table = None
+        return int(keep.sum())
+
+    def _reconcile(self, n):
+        """
+        Cut patches.u8 and index.csv to the n rows present in both
+        """
+        if exists(self.data_path) and getsize(self.data_path) != n * PATCH_BYTES:
+            print(f"[WARN] {self.data_path} : patchs sans ligne de table supprimés (écriture interrompue)")
+            with open(self.data_path, "r+b") as f:
+                f.truncate(n * PATCH_BYTES)
+        if self._table_dirty:
+            print(f"[WARN] {self.table_path} : lignes sans patch supprimées (écriture interrompue)")
+            table = self.table()
+            tmp_path = self.table_path + ".tmp"
+            with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(TABLE_COLUMNS)
+                for i in range(n):
+                    writer.writerow([int(table["label"][i]), table["sheet"][i], int(table["x"][i]),
+                                     int(table["y"][i]), table["source"][i], table["hash"][i]])
+            os.replace(tmp_path, self.table_path)
+            self._table_dirty = False
+
+    def unique_indices(self):
+        """
+        First occurrence of every distinct (content, label) pair
+        """
+        table = self.table()
+        seen, keep = set(), []
+        for i, key in enumerate(zip(table["hash"].tolist(), table["label"].tolist())):
+            if key not in seen:
+                seen.add(key)
+                keep.append(i)
+        return np.array(keep, dtype=int)
+
+    def sample(self, per_label=None, ratio=None, by="label", indices=None, seed=42):
+        """
+        Stratified sample of row indices, without reading any patch
+        :param per_label: {label: max count}
+        :param ratio: {label: multiple of the smallest class} (e.g. {0: 3} = 3 empty per filled)
+        :param by: extra stratification column ("sheet", "source"), sampled proportionally
+        :param indices: candidate rows (default: unique patches)
+        """
+        table = self.table()
+        rng = np.random.default_rng(seed)
+        indices = self.unique_indices() if indices is None else np.asarray(indices, dtype=int)
+        labels = table["label"][indices]
+        counts = {int(l): int((labels == l).sum()) for l in np.unique(labels)}
+        if not counts:
+            return indices
+
+        smallest = min(counts.values())
+        chosen = []
+        for label, count in counts.items():
+            target = count
+            if ratio and label in ratio:
+                target = min(target, int(smallest * ratio[label]))
+            if per_label and label in per_label:
+                target = min(target, per_label[label])
+            rows = indices[labels == label]
+            if by == "label" or target >= len(rows):
+                chosen.append(rng.choice(rows, size=target, replace=False))
+                continue
+            # répartition proportionnelle à la taille de chaque strate
+            strata = table[by][rows]
+            for value in np.unique(strata):
+                group = rows[strata == value]
+                k = int(round(target * len(group) / len(rows)))
+                chosen.append(rng.choice(group, size=min(k, len(group)), replace=False))
+        return np.sort(np.concatenate(chosen)) if chosen else np.zeros(0, dtype=int)
+
+    def arrays(self, indices=None):
+        """
+        (X, y) for scikit-learn: X is (n, 900) uint8, y the labels
+        """
+        patches = self.patches()
+        table = self.table()
+        if indices is None:
+            indices = np.arange(len(patches))
+        return patches[indices].reshape(len(indices), -1), table["label"][indices].astype(int)
+
+
+def convert_png_folders(base_path, store, folders=PNG_FOLDERS):
+    """
+    Import the historical one-PNG-per-patch folders into a store
+    :return: number of imported patches
+    """
+    total = 0
+    for folder, label in folders.items():
+        folder_path = join(base_path, folder)
+        if not exists(folder_path):
+            continue
+        patches, sheets, positions = [], [], []
+        for fname in sorted(os.listdir(folder_path)):
+            img = cv2.imread(join(folder_path, fname), cv2.IMREAD_GRAYSCALE)
+            if img is None or img.shape != (PATCH_SIZE, PATCH_SIZE):
+                continue
+            patches.append(img)
+            sheets.append(fname)
+            positions.append(_position_from_name(fname))
+        if patches:
+            added = store.append(np.stack(patches), label, sheet=np.array(sheets, dtype=object),
+                                 positions=positions, source=f"png:{folder}")
+            print(f"[INFO] {folder} : {added} patchs importés ({len(patches) - added} doublons)")
+            total += added
+    return total
+
+
+def _position_from_name(fname):
+    """(x, y) from a `<label>_[sheet_]<x>_<y>.png` name, (-1, -1) if absent"""
+    parts = os.path.splitext(fname)[0].split("_")
+    try:
+        return int(parts[-2]), int(parts[-1])
+    except (ValueError, IndexError):
+        return -1, -1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Base de patchs du classifieur de cases")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="importer les dossiers PNG filled/ et empty*/")
+    convert.add_argument("png_dir")
+    convert.add_argument("store_dir")
+    info = sub.add_parser("info", help="résumé de la base")
+    info.add_argument("store_dir")
+    args = parser.parse_args()
+
+    store = PatchStore(args.store_dir)
+    if args.command == "convert":
+        convert_png_folders(args.png_dir, store)
+    table = store.table()
+    print(f"[INFO] {len(store)} patchs — {int((table['label'] == 1).sum())} remplis, "
+          f"{int((table['label'] == 0).sum())} vides, {len(store.unique_indices())} distincts")
@@ -1,6 +1,5 @@
 from PySide6.QtCore import Signal, QObject
-import os, traceback
-import fitz  # PyMuPDF
+import os, threading, traceback
 
 class PDFConversionManager(QObject):
     image_ready = Signal(str)
@@ -8,11 +7,25 @@ class PDFConversionManager(QObject):
     finished = Signal(object)   # object pour éviter tout souci
     error = Signal(str)
 
-    def __init__(self, pdf_path, output_folder, base_name):
+    def __init__(self, pdf_path, output_folder, base_name, job=None, sink=None):
+        """
+        :param job: ImportJob journal (jobs.py): pages already graded are skipped,
+                    pages already rendered are handed over again without re-rendering
+        :param sink: callable(image, cancel_event) receiving every page, blocking while
+                     grading is behind (see GradingPool.submit); False stops the rendering
+        """
         super().__init__()
         self.pdf_path = pdf_path
         self.output_folder = output_folder
         self.base_name = base_name
+        self.job = job
+        self.sink = sink
+        self._cancel = threading.Event()
+        self.cancelled = False
+
+    def cancel(self):
+        """Cooperative stop, before the next page (thread-safe)"""
+        self._cancel.set()
 
     def run(self):
         try:
@@ -21,22 +34,46 @@ class PDFConversionManager(QObject):
             os.makedirs(self.output_folder, exist_ok=True)
             print(f"[PDF] output_folder OK: {self.output_folder}")
 
+            import fitz  # PyMuPDF, chargé au premier import de PDF seulement
             print("[PDF] fitz.open ...")
             doc = fitz.open(self.pdf_path)
             total = len(doc)
             print(f"[PDF] DOC OPENED, pages={total}")
 
             images = []
-            for i, page in enumerate(doc):
-                print(f"[PDF] render page {i+1}/{total}")
-                pix = page.get_pixmap(matrix=fitz.Matrix(4.5, 4.5))
-                img_path = os.path.join(self.output_folder, f"{self.base_name}_{i+1}.jpg")
-                pix.save(img_path, "jpeg")
-                print(f"[PDF] saved: {img_path}")
+            start = 0
+            if self.job is not None:
+                if self.job.total is None:
+                    self.job.set_total(total)
+                # toutes les pages avant la première page non terminée sont déjà notées
+                start = self.job.first_unfinished() - 1
+            for i in range(start, total):
+                if self._cancel.is_set():
+                    print(f"[PDF] annulé avant la page {i+1}/{total}")
+                    self.cancelled = True
+                    break
+                if self.job is not None and self.job.is_page_done(i + 1):
+                    continue
+                img_path = self.job.rendered_image(i + 1) if self.job is not None else None
+                if img_path is None:
+                    print(f"[PDF] render page {i+1}/{total}")
+                    pix = doc.load_page(i).get_pixmap(matrix=fitz.Matrix(4.5, 4.5))
+                    img_path = os.path.join(self.output_folder, f"{self.base_name}_{i+1}.jpg")
+                    pix.save(img_path, "jpeg")
+                    print(f"[PDF] saved: {img_path}")
+                    if self.job is not None:
+                        self.job.mark_rendered(i + 1, img_path)
+                else:
+                    print(f"[PDF] page {i+1}/{total} déjà rendue : {img_path}")
                 images.append(img_path)
 
                 print(f"[PDF] emit image_ready: {img_path}")
                 self.image_ready.emit(img_path)
+                # contre-pression : bloque tant que la file de correction est pleine
+                if self.sink is not None and not self.sink(img_path, self._cancel):
+                    print(f"[PDF] annulé pendant l'attente de la page {i+1}/{total}")
+                    self.cancelled = True
+                    break
                 print(f"[PDF] emit progress: {i+1}/{total}")
                 self.progress.emit(i + 1, total)
 
@@ -0,0 +1,92 @@
+# profile_dialog.py
+from PySide6 import QtWidgets
+from PySide6.QtWidgets import QFileDialog
+
+from page_filter import SKIP_REASONS
+from profiling import (PROFILE_METRICS, aggregate_profiles, aggregate_skipped, export_profile_csv,
+                       export_profile_json, load_project_timings, load_skipped_pages)
+
+metric_labels = {
+    "wall_ms": "Temps réel (ms)",
+    "cpu_ms": "CPU (ms)",
+    "bytes_read": "Octets lus",
+    "bytes_written": "Octets écrits"
+}
+
+
+class ProfileDialog(QtWidgets.QDialog):
+    def __init__(self, project_path, parent=None):
+        """
+        Shows the batch profile (p50 / p95 / max per stage) of a project
+        :param project_path: path of the project
+        :param parent: parent
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Profil de performance")
+        self.setMinimumSize(700, 400)
+        self.layout = QtWidgets.QVBoxLayout(self)
+
+        self.profile = aggregate_profiles(load_project_timings(project_path))
+        # pages rejetées avant l'alignement : pas de dossier de copie, coût lu dans skipped.jsonl
+        self.profile["skipped"] = aggregate_skipped(load_skipped_pages(project_path))
+
+        export_btn = QtWidgets.QPushButton("📁 Exporter le profil (JSON / CSV)")
+        export_btn.clicked.connect(self.export_profile)
+        self.layout.addWidget(export_btn)
+
+        self.layout.addWidget(QtWidgets.QLabel(f"⏱️ Copies profilées : {self.profile['copies']}"))
+
+        headers = ["Étape"]
+        for m in PROFILE_METRICS:
+            headers += [f"{metric_labels[m]} p50", "p95", "max"]
+        rows = []
+        for stage, metrics in self.profile["stages"].items():
+            row = [stage]
+            for m in PROFILE_METRICS:
+                row += [f"{metrics[m][s]:.1f}" for s in ("p50", "p95", "max")]
+            rows.append(row)
+        self.layout.addWidget(self.create_table(headers, rows))
+
+        skipped = self.profile["skipped"]
+        if skipped["pages"]:
+            reasons = ", ".join(f"{SKIP_REASONS.get(status, status)} : {n}"
+                                for status, n in skipped["by_status"].items())
+            text = f"🚫 Pages ignorées par le pré-filtre : {skipped['pages']} ({reasons})"
+            if skipped["prefilter_ms"]:
+                ms = skipped["prefilter_ms"]
+                text += f"\n    pré-filtre p50 {ms['p50']:.1f} ms, p95 {ms['p95']:.1f} ms, max {ms['max']:.1f} ms"
+            self.layout.addWidget(QtWidgets.QLabel(text))
+
+        close_btn = QtWidgets.QPushButton("Fermer")
+        close_btn.clicked.connect(self.accept)
+        self.layout.addWidget(close_btn)
+
+    def create_table(self, headers, rows):
+        table = QtWidgets.QTableWidget()
+        table.setRowCount(len(rows))
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        table.verticalHeader().setVisible(False)
+
+        for row_idx, row in enumerate(rows):
+            for col_idx, val in enumerate(row):
+                table.setItem(row_idx, col_idx, QtWidgets.QTableWidgetItem(val))
+
+        table.resizeColumnsToContents()
+        return table
+
+    def export_profile(self):
+        if not self.profile["copies"] and not self.profile["skipped"]["pages"]:
+            QtWidgets.QMessageBox.warning(self, "Export", "Aucune copie profilée.")
+            return
+
+        path, selected = QFileDialog.getSaveFileName(
+            self, "Exporter le profil", "profil.json", "JSON (*.json);;CSV (*.csv)")
+        if not path:
+            return
+        if path.lower().endswith(".csv") or selected.startswith("CSV"):
+            export_profile_csv(self.profile, path)
+        else:
+            export_profile_json(self.profile, path)
+        QtWidgets.QMessageBox.information(self, "Export terminé", f"Fichier exporté :\n{path}")
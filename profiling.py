@@ -0,0 +1,208 @@
+# profiling.py
+import csv
+import json
+import os
+import threading
+import time
+from os.path import exists, getsize, isdir, join
+
+import numpy as np
+
+from jobs import INGEST_DIR
+
+# pile des étapes actives, par thread (chaque worker a la sienne)
+_local = threading.local()
+
+PROFILE_METRICS = ["wall_ms", "cpu_ms", "bytes_read", "bytes_written"]
+
+
+def _active_stages():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+class StageTimer:
+    """
+    Context manager measuring one pipeline stage: wall time, CPU time of the
+    calling thread and bytes read/written through record_read/record_write.
+    Nested stages are subtracted from their parent so every stage reports
+    its own cost only.
+    """
+
+    def __init__(self, profile, name):
+        self.profile = profile
+        self.name = name
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+
+    def __enter__(self):
+        self.bytes_read = 0
+        self.bytes_written = 0
+        _active_stages().append(self)
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.thread_time() - self.cpu_start
+        stack = _active_stages()
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        self.profile.add(self.name,
+                         wall - self.child_wall,
+                         cpu - self.child_cpu,
+                         self.bytes_read,
+                         self.bytes_written)
+        return False
+
+
+class CopyProfile:
+    """
+    Timings of a single copy, accumulated per stage name.
+    """
+
+    def __init__(self):
+        self.stages = {}
+
+    def stage(self, name):
+        return StageTimer(self, name)
+
+    def add(self, name, wall, cpu, bytes_read=0, bytes_written=0):
+        entry = self.stages.setdefault(name, {m: 0 for m in PROFILE_METRICS})
+        entry["wall_ms"] += wall * 1000.0
+        entry["cpu_ms"] += cpu * 1000.0
+        entry["bytes_read"] += bytes_read
+        entry["bytes_written"] += bytes_written
+
+    def to_dict(self):
+        return {
+            name: {
+                "wall_ms": round(v["wall_ms"], 3),
+                "cpu_ms": round(v["cpu_ms"], 3),
+                "bytes_read": int(v["bytes_read"]),
+                "bytes_written": int(v["bytes_written"]),
+            }
+            for name, v in self.stages.items()
+        }
+
+
+def record_read(path):
+    """Attribute the size of a file just read to the innermost active stage."""
+    stack = _active_stages()
+    if stack and exists(path):
+        stack[-1].bytes_read += getsize(path)
+
+
+def record_write(path):
+    """Attribute the size of a file just written to the innermost active stage."""
+    stack = _active_stages()
+    if stack and exists(path):
+        stack[-1].bytes_written += getsize(path)
+
+
+# === PROFIL DE LOT ===
+
+def load_project_timings(project_path):
+    """
+    Collect the per-copy timings stored in every meta.json of a project
+    :param project_path:
+    :return: list of {stage: metrics} dicts
+    """
+    timings = []
+    for name in os.listdir(project_path):
+        meta_path = join(project_path, name, "meta.json")
+        if not isdir(join(project_path, name)) or not exists(meta_path):
+            continue
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+        except Exception as e:
+            print(f"[ERREUR] Lecture {meta_path} : {e}")
+            continue
+        if meta.get("timings"):
+            timings.append(meta["timings"])
+    return timings
+
+
+def load_skipped_pages(project_path):
+    """
+    Reports of the pages rejected by the pre-filter (<project>/.ingest/skipped.jsonl):
+    they never get a copy folder, so their cost is only recorded there
+    """
+    path = join(project_path, INGEST_DIR, "skipped.jsonl")
+    reports = []
+    if not exists(path):
+        return reports
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                reports.append(json.loads(line))
+            except ValueError:
+                continue   # ligne interrompue
+    return reports
+
+
+def aggregate_skipped(reports):
+    """
+    Count of rejected pages per reason and pre-filter time (p50 / p95 / max, ms)
+    """
+    by_status = {}
+    for r in reports:
+        by_status[r.get("status")] = by_status.get(r.get("status"), 0) + 1
+    ms = np.array([r["ms"] for r in reports if r.get("ms") is not None], dtype=float)
+    prefilter = None
+    if len(ms):
+        p50, p95 = np.percentile(ms, [50, 95])
+        prefilter = {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "max": round(float(ms.max()), 3)}
+    return {"pages": len(reports), "by_status": by_status, "prefilter_ms": prefilter}
+
+
+def aggregate_profiles(timings):
+    """
+    Aggregate per-copy timings into a batch profile
+    :param timings: list of {stage: metrics} dicts
+    :return: {stage: {metric: {"p50", "p95", "max"}}, "copies": n}
+    """
+    stages = []
+    for copy_timings in timings:
+        for stage in copy_timings:
+            if stage not in stages:
+                stages.append(stage)
+
+    profile = {"copies": len(timings), "stages": {}}
+    for stage in stages:
+        values = np.array([
+            [t.get(stage, {}).get(m, 0) for m in PROFILE_METRICS]
+            for t in timings
+        ], dtype=float)
+        p50, p95 = np.percentile(values, [50, 95], axis=0)
+        vmax = values.max(axis=0)
+        profile["stages"][stage] = {
+            m: {"p50": round(float(p50[i]), 3),
+                "p95": round(float(p95[i]), 3),
+                "max": round(float(vmax[i]), 3)}
+            for i, m in enumerate(PROFILE_METRICS)
+        }
+    return profile
+
+
+def export_profile_json(profile, path):
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+
+
+def export_profile_csv(profile, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["stage"] + [f"{m}_{s}" for m in PROFILE_METRICS for s in ("p50", "p95", "max")])
+        for stage, metrics in profile["stages"].items():
+            writer.writerow([stage] + [metrics[m][s] for m in PROFILE_METRICS for s in ("p50", "p95", "max")])
+        prefilter = profile.get("skipped", {}).get("prefilter_ms")
+        if prefilter:
+            # pages ignorées : seul le temps réel du pré-filtre est connu
+            writer.writerow(["skipped_prefilter"] + [prefilter[s] for s in ("p50", "p95", "max")]
+                            + [""] * (3 * (len(PROFILE_METRICS) - 1)))
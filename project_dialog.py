@@ -4,22 +4,33 @@ import json
 import os
 import sys
 import shutil
-from os.path import join, basename, splitext, isdir, dirname, isfile, exists
+import threading
+from collections import deque
+from os.path import join, basename, splitext, isdir, dirname, isfile
 
-import cv2
-from PySide6 import QtWidgets as w, QtGui, QtCore, QtWidgets
-from PySide6.QtCore import QThread
+from PySide6 import QtWidgets as w, QtCore, QtWidgets
+from PySide6.QtCore import QThread, Signal
 
 from image_dialog import ImageViewerDialog
-from image_worker import ImageProcessingWorker
+from tiled_viewer import ArrayImageSource, FileImageSource
 from pdf_manager import PDFConversionManager
 from manual_review_dialog import ManualReviewDialog
 from meta_updater import update_score_in_meta
-import circle_manager as cm
+from overlay import overlay_for_block
+from copy_loader import CopyListModel, DirectoryLoader, EntryRole
 from stats import StatsDialog
+from profile_dialog import ProfileDialog
+from templates import default_registry
+from page_filter import SKIP_REASONS
+from review_harvest import harvest_review
+from review_queue import ReviewQueueDialog, collect_review_queue
+from hot_folder import HotFolderWatcher, ProcessedLedger, load_watch_dir, save_watch_dir
+from jobs import ImportJob, clean_orphan_copies, job_id, unfinished_jobs
 
 
 class ProjectDialog(w.QDialog):
+    reviewQueueScanned = Signal(set)   # dossiers douteux de tout le projet (scan en arrière-plan)
+
     def __init__(self, project_name, project_path, parent=None):
         """
         Itinializes project dialog.
@@ -27,13 +38,26 @@ class ProjectDialog(w.QDialog):
         :param project_path: path of the project
         :param parent: parent
         """
-        self.image_jobs = {}   # {path: (thread, worker)}
         self.pdf_thread = None
         self.pdf_worker = None
-        self.image_threads = []   # pour conserver des refs jusqu’au cleanup
+        self.pool = None   # threads de correction alimentés par une file bornée
+        self.image_backlog = deque()   # images importées en attente de place dans la file
+        self.queue_depth = (0, 0)   # (pages en attente, pages en cours de correction)
+        self.render_progress = (0, 0)
+        self.import_queue = deque()   # (fichier source, clé du registre ou None)
+        self.current_job = None   # journal de l'import PDF en cours de rendu
+        self.active_jobs = {}   # id -> ImportJob, du rendu jusqu'à la dernière page notée
+        self.page_jobs = {}   # page rendue -> (ImportJob, numéro de page)
+        self.image_keys = {}   # image à corriger -> clé du registre
+        self.watch_thread = None
+        self.watcher = None
+        self.skipped_pages = []   # rapports du pré-filtre (pages blanches, autres documents)
+        self.doubtful_copies = set()   # dossiers des copies ayant encore des questions douteuses
+        self.review_queue_dialog = None
+        self.reviewed_copies = set()   # révisées depuis l'ouverture (le scan initial peut les compter encore)
 
         super().__init__(parent)
-        self.template = cv2.imread("resources/templates/Answer_sheet.jpg")
+        self.template = default_registry()   # modèles de feuilles, reconnus page par page
 
         self.project_name = project_name
         self.project_path = project_path
@@ -42,7 +66,19 @@ class ProjectDialog(w.QDialog):
 
         self.current_view_path = self.project_path
         self.copy_data = {}
+        self.loader_generation = 0
+        self.loader_thread = None
+        self.loader = None
+        self.ledger = ProcessedLedger(project_path)
+        # avant la première lecture du dossier : restes d'une copie interrompue par un arrêt
+        clean_orphan_copies(project_path)
         self.initUI()
+        self.resume_jobs()
+        self.scan_review_queue()
+
+        watch_dir = load_watch_dir(project_path)
+        if watch_dir and isdir(watch_dir):
+            self.start_watching(watch_dir)
 
     def initUI(self):
         """
@@ -51,20 +87,39 @@ class ProjectDialog(w.QDialog):
         """
         layout = w.QVBoxLayout(self)
 
-        self.add_file_btn = w.QPushButton("add a student copy")
+        self.add_file_btn = w.QPushButton("add student copies")
         self.add_file_btn.clicked.connect(self.add_copy_to_project)
 
+        self.watch_btn = w.QPushButton("Surveiller un dossier…")
+        self.watch_btn.clicked.connect(self.toggle_watch)
+
         self.global_stats_btn = w.QPushButton("Statistiques globales")
         self.global_stats_btn.clicked.connect(self.show_global_stats)
 
-        self.file_list = w.QListWidget()
-        self.file_list.itemDoubleClicked.connect(self.handle_item_double_click)
+        self.profile_btn = w.QPushButton("Profil de performance")
+        self.profile_btn.clicked.connect(self.show_profile)
+
+        self.review_queue_btn = w.QPushButton("Copies à vérifier")
+        self.review_queue_btn.clicked.connect(self.show_review_queue)
+
+        self.file_model = CopyListModel(self)
+        self.file_list = w.QListView()
+        self.file_list.setModel(self.file_model)
+        self.file_list.setUniformItemSizes(True)
+        self.file_list.setEditTriggers(w.QAbstractItemView.NoEditTriggers)
+        self.file_list.doubleClicked.connect(self.handle_item_double_click)
 
         self.progress_bar = w.QProgressBar()
         self.progress_bar.setVisible(False)
         self.progress_bar.setMinimum(0)
         self.progress_bar.setValue(0)
 
+        self.queue_label = w.QLabel()
+        self.queue_label.setVisible(False)
+        self.cancel_btn = w.QPushButton("Annuler l'import")
+        self.cancel_btn.setVisible(False)
+        self.cancel_btn.clicked.connect(self.cancel_import)
+
         self.stats_display = QtWidgets.QTextEdit()
         self.stats_display.setReadOnly(True)
         self.stats_display.setFixedHeight(130)
@@ -73,9 +128,14 @@ class ProjectDialog(w.QDialog):
         file_zone = QtWidgets.QWidget()
         file_layout = QtWidgets.QVBoxLayout(file_zone)
         file_layout.addWidget(self.add_file_btn)
+        file_layout.addWidget(self.watch_btn)
         file_layout.addWidget(self.global_stats_btn)
+        file_layout.addWidget(self.profile_btn)
+        file_layout.addWidget(self.review_queue_btn)
         file_layout.addWidget(self.file_list)
         file_layout.addWidget(self.progress_bar)
+        file_layout.addWidget(self.queue_label)
+        file_layout.addWidget(self.cancel_btn)
         file_layout.setContentsMargins(0, 0, 0, 0)
 
         splitter.addWidget(file_zone)
@@ -86,6 +146,22 @@ class ProjectDialog(w.QDialog):
 
         self.load_existing_copies()
 
+    def done(self, result):
+        """
+        Stop the background directory scan, the folder watch and the imports when the dialog closes
+        """
+        self.stop_directory_loader()
+        self.stop_watching()
+        # fermeture en cours d'import : le journal reprendra à la réouverture du projet
+        if self.pdf_worker is not None:
+            self.pdf_worker.cancel()
+        if self.pdf_thread is not None:
+            self.pdf_thread.quit()
+            self.pdf_thread.wait()
+        if self.pool is not None:
+            self.pool.shutdown()
+        super().done(result)
+
     def open_review_dialog(self, path=None):
         """
         Open the manual review dialog for a selected student copy
@@ -94,6 +170,8 @@ class ProjectDialog(w.QDialog):
         """
         if path is None:
             path = self.get_selected_image_path()
+        if path and path not in self.copy_data:
+            self.load_copy_record(path)
 
         if not path or path not in self.copy_data:
             QtWidgets.QMessageBox.warning(self, "Révision manuelle", "Veuillez sélectionner une copie valide.")
@@ -108,36 +186,26 @@ class ProjectDialog(w.QDialog):
             print(f"[FATAL] filled = {len(filled)}, centers = {len(centers)}")
             raise ValueError("filled et centers ont des tailles différentes")
 
-        dialog = ManualReviewDialog(image_path, filled, centers, self)
+        douteux = data.get("douteux", {})
+        modified_before = set(data.get("modified_questions", []))
+
+        dialog = ManualReviewDialog(image_path, filled, centers, self,
+                                    douteux=douteux, modified_questions=modified_before)
         if dialog.exec_():
             data["filled"] = dialog.final_filled
-            # Recalcul des doutes restants (uniquement pour les questions non modifiées)
-            douteux_centers = []
-            if hasattr(self, "douteux") and self.douteux:
-                question_to_index = {q: q * 4 for q in range(len(centers) // 4)}
-                for q in self.douteux.copy():
-                    if q in dialog.modified_questions:
-                        self.douteux.pop(q, None)
-                    elif q in question_to_index:
-                        start_idx = question_to_index[q]
-                        douteux_centers += [(int(pt[0]), int(pt[1])) for pt in centers[start_idx:start_idx + 4]]
-
-            clean_path = image_path.replace("_questions", "_questions_clean")
-            if not os.path.exists(clean_path):
-                print("[WARN] Image _clean non trouvée, fallback vers originale")
-                clean_path = image_path
-
-            img_clean = cv2.imread(clean_path)
-            cm.trace_circles(
-                img_clean,
-                centers,
-                dialog.final_filled,
-                image_path,
-                modified_questions=dialog.modified_questions,
-                douteux_centers=douteux_centers
-            )
-
+            data["modified_questions"] = sorted(modified_before | dialog.modified_questions)
+            try:
+                harvest_review(image_path, centers, dialog.final_filled, dialog.modified_questions,
+                               self.project_path)
+            except Exception as e:
+                print(f"[WARN] Collecte des corrections impossible : {e}")
+            # Recalcul des doutes restants (uniquement pour les questions non modifiées) ;
+            # la copie a été vue : elle quitte la file de révision
+            data["douteux"] = {q: s for q, s in douteux.items() if q not in dialog.modified_questions}
             self.copy_data[path] = data
+            self.doubtful_copies.discard(os.path.dirname(path))
+            self.reviewed_copies.add(os.path.dirname(path))
+            self.update_review_queue_button()
 
             # Mise à jour de meta.json
             meta_path = os.path.join(os.path.dirname(path), "meta.json")
@@ -145,7 +213,9 @@ class ProjectDialog(w.QDialog):
                 with open(meta_path, "r") as f:
                     meta = json.load(f)
                 meta["filled"] = data["filled"]
-                meta["douteux"] = self.douteux
+                meta["douteux"] = data["douteux"]
+                meta["reviewed"] = True
+                meta["modified_questions"] = data["modified_questions"]
                 with open(meta_path, "w") as f:
                     json.dump(meta, f, indent=2)
                 print(f"[INFO] meta.json mis à jour après révision.")
@@ -164,25 +234,39 @@ class ProjectDialog(w.QDialog):
             except Exception as e:
                 print(f"[ERREUR] Mise à jour meta.json : {e}")
 
+    def load_copy_record(self, path):
+        """
+        Review data of a question block from its copy's meta.json (copy not opened in the list)
+        """
+        meta_path = os.path.join(os.path.dirname(path), "meta.json")
+        try:
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            self.copy_data[path] = {
+                "image": path,
+                "filled": meta["filled"],
+                "centers": meta["centers"],
+                "modified_questions": meta.get("modified_questions", []),
+                "douteux": {int(q): s for q, s in (meta.get("douteux") or {}).items()},
+            }
+        except Exception as e:
+            print(f"[ERREUR] Chargement {meta_path} : {e}")
+
     def get_selected_image_path(self):
         """
         Return the file path corresponding to the currently selected item in the list
         :return:
         """
-        item = self.file_list.currentItem()
-        if not item:
+        index = self.file_list.currentIndex()
+        if not index.isValid():
             return None
-        name = item.text()
-        for path in self.copy_data:
-            if basename(path) == name:
-                return path
-        return None
+        path = index.data(QtCore.Qt.UserRole)
+        return path if path in self.copy_data else None
 
-    def open_image(self, item):
+    def open_image(self, path):
         """
         Open an image in a viewer dialog when a list item is double-clicked
         """
-        path = item.data(QtCore.Qt.UserRole)
         print(f"[DEBUG] Tentative d'ouverture : {path}")
 
         if not path or not isfile(path):
@@ -190,137 +274,227 @@ class ProjectDialog(w.QDialog):
             QtWidgets.QMessageBox.warning(self, "Erreur", "Fichier introuvable.")
             return
 
+        # surcouche (cercles) rendue à la demande, gardée en cache mémoire
         try:
-            viewer = ImageViewerDialog(path, self)  # (path, parent)
-            viewer.exec()
-            return
-        except TypeError:
-            pass
-
-        pixmap = QtGui.QPixmap(path)
-        if pixmap.isNull():
-            print("[DEBUG] QPixmap a échoué à charger l'image.")
+            overlay = overlay_for_block(path)
+            source = ArrayImageSource(overlay) if overlay is not None else FileImageSource(path)
+        except ValueError as e:
+            print(f"[DEBUG] {e}")
             QtWidgets.QMessageBox.warning(self, "Erreur", "Impossible d'ouvrir l'image.")
             return
 
-        viewer = ImageViewerDialog(pixmap, basename(path), self)
+        viewer = ImageViewerDialog(source, basename(path), self)
         viewer.exec()
 
 
+    def start_directory_loader(self, folder, mode, first_entries=()):
+        """
+        Reset the list and scan `folder` in a background thread, page by page
+        :param folder: folder to scan
+        :param mode: "project" (copy folders) or "copy" (files of a copy)
+        :param first_entries: entries shown immediately (e.g. back button)
+        """
+        self.stop_directory_loader()
+        self.loader_generation += 1
+
+        self.loader_thread = QThread(self)
+        self.loader = DirectoryLoader(folder, mode, self.loader_generation)
+        self.loader.moveToThread(self.loader_thread)
+        self.file_model.reset(self.loader)
+        self.file_model.append_entries(list(first_entries))
+
+        self.loader.page_ready.connect(self.on_entries_loaded)
+        self.loader.finished.connect(self.loader_thread.quit)
+        self.loader_thread.started.connect(self.loader.run)
+        self.loader_thread.finished.connect(self.loader.deleteLater)
+        self.loader_thread.finished.connect(self.loader_thread.deleteLater)
+        self.loader_thread.start()
+
+    def stop_directory_loader(self):
+        if self.loader is not None:
+            self.loader.stop()
+        if self.loader_thread is not None and self.loader_thread.isRunning():
+            self.loader_thread.quit()
+            self.loader_thread.wait()
+        self.loader_thread = None
+        self.loader = None
+
+    def on_entries_loaded(self, generation, entries):
+        """
+        Callback: a page of entries is ready (ignored if the user navigated elsewhere)
+        """
+        if generation != self.loader_generation:
+            return
+        for entry in entries:
+            if "record" in entry:
+                entry["record"]["douteux"] = {int(q): s for q, s in entry.get("douteux", {}).items()}
+                self.copy_data[entry["path"]] = entry["record"]
+            if entry["kind"] == "dir" and (entry.get("summary") or {}).get("doubtful"):
+                self.doubtful_copies.add(entry["path"])
+        self.update_review_queue_button()
+        self.file_model.append_entries(entries)
+
+        for entry in entries:
+            if entry["kind"] == "file":
+                self.add_item_buttons(entry["path"])
+            if "record" in entry:
+                self.display_stats(entry["path"])
+
     def load_existing_copies(self):
         """
         load and display all subdirectories
         """
-        self.file_list.clear()
         self.current_view_path = self.project_path
+        self.start_directory_loader(self.project_path, "project")
 
-        for name in os.listdir(self.project_path):
-            dir_path = join(self.project_path, name)
-            if isdir(dir_path):
-                item = w.QListWidgetItem(f"[Dossier] {name}")
-                item.setData(QtCore.Qt.UserRole, dir_path)
-                self.file_list.addItem(item)
-
-    def display_files_in_directory(self, item):
+    def display_files_in_directory(self, entry):
         """
         show all files in directory
-        :param item:
+        :param entry:
         :return:
         """
-        if not item.text().startswith("[Dossier] "):
+        if entry["kind"] != "dir":
             return
 
-        folder_name = item.text().replace("[Dossier] ", "")
-        folder_path = join(self.project_path, folder_name)
-        self.file_list.clear()
+        folder_path = entry["path"]
+        self.current_view_path = folder_path
+        self.stats_display.setVisible(False)
 
         # Bouton retour
-        back_item = w.QListWidgetItem("⬅️ Retour")
-        back_item.setData(QtCore.Qt.UserRole, self.project_path)
-        self.file_list.addItem(back_item)
-
-        selected_stats_file = None  # pour afficher les stats plus bas
-
-        for file in os.listdir(folder_path):
-            if not file.lower().endswith((".jpg", ".jpeg", ".png")):
-                continue
-
-            full_path = join(folder_path, file)
-            meta_path = join(folder_path, "meta.json")
-
-            # Charger les données si "_questions" présent
-            if "_questions" in file.lower() and exists(meta_path):
-                selected_stats_file = full_path  # <- on garde le fichier avec stats
-                try:
-                    with open(meta_path, "r") as f:
-                        data = json.load(f)
-                    self.copy_data[full_path] = {
-                        "image": full_path,
-                        "filled": data["filled"],
-                        "centers": data["centers"]
-                    }
-                    self.douteux = data.get("douteux", {})
-                except Exception as e:
-                    print(f"[ERREUR] Chargement meta.json : {e}")
-
-            self.addItem(full_path)
-
-        if selected_stats_file:
-            self.display_stats(selected_stats_file)
-        else:
-            self.stats_display.setVisible(False)
+        back_entry = {"kind": "back", "path": self.project_path}
+        self.start_directory_loader(folder_path, "copy", [back_entry])
 
     def refresh_file_list(self):
         """
         Refresh the list of images in project folder
         :return:
         """
-        self.file_list.clear()
-        for file in os.listdir(self.project_path):
-            if file.endswith(('.pdf', '.jpg', '.jpeg', '.png')):
-                self.file_list.addItem(file)
+        self.stop_directory_loader()
+        self.file_model.reset()
+        self.file_model.append_entries([
+            {"kind": "file", "path": join(self.project_path, file)}
+            for file in os.listdir(self.project_path)
+            if file.endswith(('.pdf', '.jpg', '.jpeg', '.png'))
+        ])
 
     def add_copy_to_project(self):
         """
-        Open file dialog to import pdf or image to the project
-        uses pdf conversion if necessary
+        Open file dialog to import pdfs or images to the project
+        (several files can be selected, they are queued like watched files)
         :return:
         """
         dialog = w.QFileDialog(self)
         dialog.setNameFilter("PDF or Images (*.pdf *.png *.jpg *.jpeg)")
-        dialog.setFileMode(w.QFileDialog.FileMode.ExistingFile)
+        dialog.setFileMode(w.QFileDialog.FileMode.ExistingFiles)
 
         if dialog.exec():
-            selected_file = dialog.selectedFiles()[0]
-            ext = splitext(selected_file)[1].lower()
+            for selected_file in dialog.selectedFiles():
+                self.enqueue_file(selected_file)
+
+    def enqueue_file(self, source, key=None):
+        """
+        Add a pdf or an image to the import queue
+        :param source: file to import
+        :param key: ledger key of a watched file, recorded once the file is ingested
+        """
+        self.import_queue.append((source, key))
+        self.start_next_import()
+
+    def resume_jobs(self):
+        """
+        Queue the interrupted PDF imports again: they resume at their first unfinished page
+        """
+        jobs = unfinished_jobs(self.project_path)
+        if jobs:
+            self.stats_display.setPlainText(
+                f"⏯️ Reprise de {len(jobs)} import(s) interrompu(s) :\n" +
+                "\n".join(f"   - {basename(job.source)} (page {job.first_unfinished()})" for job in jobs))
+            self.stats_display.setVisible(True)
+        for job in jobs:
+            self.enqueue_file(job.source, job.data.get("ledger_key"))
+
+    def start_next_import(self):
+        """
+        Start the queued imports: images right away, PDFs one at a time
+        """
+        while self.import_queue and self.pdf_thread is None:
+            source, key = self.import_queue.popleft()
+            if splitext(source)[1].lower() == ".pdf":
+                # avant ImportJob.open : la reprise supprime les dossiers des pages inachevées,
+                # y compris celles encore en cours de correction après une annulation
+                jid = job_id(source)
+                if jid in self.active_jobs or any(job.id == jid for job, _ in self.page_jobs.values()):
+                    print(f"[INFO] {basename(source)} déjà en cours d'import")
+                    continue
+                job = ImportJob.open(self.project_path, source, key)
+                self.start_pdf_conversion(source, job)
+            else:
+                path = join(self.project_path, basename(source))
+                shutil.copy(source, path)
+                if key is not None:
+                    self.image_keys[path] = (key, source)
+                self.process_image(path)
 
-            if ext == ".pdf":
-                base_name = splitext(basename(selected_file))[0]
+    def start_pdf_conversion(self, selected_file, job):
+        base_name = splitext(basename(selected_file))[0]
+        self.current_job = job
+        self.active_jobs[job.id] = job
 
-                self.pdf_thread = QThread(self)
-                self.pdf_worker = PDFConversionManager(selected_file, self.project_path, base_name)
-                self.pdf_worker.moveToThread(self.pdf_thread)
+        self.pdf_thread = QThread(self)
+        # le rendu attend dans submit tant que la file de correction est pleine
+        self.pdf_worker = PDFConversionManager(selected_file, self.project_path, base_name, job=job,
+                                               sink=self.grading_pool().submit)
+        self.pdf_worker.moveToThread(self.pdf_thread)
 
-                self.pdf_worker.image_ready.connect(self.on_image_ready)
-                self.pdf_worker.progress.connect(self.update_progress)
-                self.pdf_worker.finished.connect(self.on_pdf_conversion_done)
-                self.pdf_worker.error.connect(self.on_pdf_conversion_error)
+        self.pdf_worker.image_ready.connect(self.on_image_ready)
+        self.pdf_worker.progress.connect(self.update_progress)
+        self.pdf_worker.finished.connect(self.on_pdf_conversion_done)
+        self.pdf_worker.error.connect(self.on_pdf_conversion_error)
 
-                self.pdf_worker.finished.connect(self.pdf_thread.quit)
+        self.pdf_worker.finished.connect(self.pdf_thread.quit)
 
-                self.pdf_thread.finished.connect(self.pdf_worker.deleteLater)
-                self.pdf_thread.finished.connect(self.pdf_thread.deleteLater)
+        self.pdf_thread.finished.connect(self.pdf_worker.deleteLater)
+        self.pdf_thread.finished.connect(self.pdf_thread.deleteLater)
 
-                self.pdf_thread.started.connect(self.pdf_worker.run)
+        self.pdf_thread.started.connect(self.pdf_worker.run)
 
-                self.progress_bar.setVisible(True)
-                self.progress_bar.setValue(0)
-                self.pdf_thread.start()
+        self.render_progress = (0, 0)
+        self.progress_bar.setValue(0)
+        self.pdf_thread.start()
+        self.update_import_status()
 
-            else:
-                path = join(self.project_path, basename(selected_file))
-                shutil.copy(selected_file, path)
-                self.process_image(path)
+    def toggle_watch(self):
+        """
+        Choose the folder watched for this project, or stop watching
+        """
+        if self.watcher is not None:
+            self.stop_watching()
+            save_watch_dir(self.project_path, None)
+            return
+
+        folder = w.QFileDialog.getExistingDirectory(self, "Dossier à surveiller")
+        if folder:
+            save_watch_dir(self.project_path, folder)
+            self.start_watching(folder)
+
+    def start_watching(self, folder):
+        self.watch_thread = QThread(self)
+        self.watcher = HotFolderWatcher(folder, self.ledger)
+        self.watcher.moveToThread(self.watch_thread)
+        self.watcher.file_ready.connect(self.enqueue_file)
+        self.watch_thread.started.connect(self.watcher.start)
+        self.watch_thread.finished.connect(self.watcher.deleteLater)
+        self.watch_thread.start()
+        self.watch_btn.setText(f"Arrêter la surveillance ({basename(folder) or folder})")
+        print(f"[WATCH] Surveillance de {folder}")
+
+    def stop_watching(self):
+        if self.watch_thread is not None:
+            self.watch_thread.quit()
+            self.watch_thread.wait()
+        self.watch_thread = None
+        self.watcher = None
+        self.watch_btn.setText("Surveiller un dossier…")
 
     def show_global_stats(self):
         """
@@ -330,85 +504,205 @@ class ProjectDialog(w.QDialog):
         dialog = StatsDialog(self.project_path, self)
         dialog.exec()
 
-    def start_image_processing(self, path):
-        print("[PD] start_image_processing", path)
-        thread = QThread(self)
-        worker = ImageProcessingWorker(path, self.template, self.project_path)
-        worker.moveToThread(thread)
-
-        # Brancher les signaux AVANT de démarrer
-        worker.progress.connect(self.update_progress)
-        worker.processed.connect(self.on_image_processed)
-        worker.needManualReview.connect(self.on_need_manual_review)
-        worker.error.connect(self.on_image_error)
-
-        thread.started.connect(worker.run)
-        # Arrêt du thread sur fin OU erreur
-        worker.processed.connect(thread.quit)
-        worker.error.connect(thread.quit)
-
-        # Cleanup Qt
-        thread.finished.connect(worker.deleteLater)
-        thread.finished.connect(thread.deleteLater)
-
-        # ✅ Garder des références Python vivantes
-        self.image_jobs[path] = (thread, worker)
-
-        # Nettoyage de notre registre quand le thread a fini
-        def _cleanup():
-            self.image_jobs.pop(path, None)
-        thread.finished.connect(_cleanup)
+    def show_profile(self):
+        """
+        Open dialog window showing the per-stage timing profile of the graded copies
+        :return:
+        """
+        dialog = ProfileDialog(self.project_path, self)
+        dialog.exec()
 
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setValue(0)
-        print("[PD] thread.start() (image)")
-        thread.start()
+    def grading_pool(self):
+        """
+        Grading threads fed through a bounded queue, created on first import
+        """
+        if self.pool is None:
+            # image_worker (cv2, classifieur) n'est chargé qu'au premier import de copies
+            from grading_pool import GradingPool
+
+            self.pool = GradingPool(self.template, self.project_path, on_copy_dir=self.record_copy_dir, parent=self)
+            self.pool.processed.connect(self.on_image_processed)
+            self.pool.needManualReview.connect(self.on_need_manual_review)
+            self.pool.skipped.connect(self.on_page_skipped)
+            self.pool.failed.connect(self.on_page_failed)
+            self.pool.error.connect(self.on_image_error)
+            self.pool.depth.connect(self.on_queue_depth)
+        return self.pool
+
+    def feed_pool(self):
+        """
+        Move imported images into the grading queue as long as it has room (never blocks the GUI)
+        """
+        pool = self.grading_pool()
+        while self.image_backlog and pool.try_submit(self.image_backlog[0]):
+            self.image_backlog.popleft()
+
+    def on_queue_depth(self, waiting, running):
+        self.queue_depth = (waiting, running)
+        self.feed_pool()
+        self.update_import_status()
+
+    def update_import_status(self):
+        """
+        Progress of both stages: PDF rendering, then grading queue and pages in progress
+        """
+        waiting, running = self.queue_depth
+        rendering = self.pdf_thread is not None
+        active = rendering or waiting or running or self.image_backlog
+        self.progress_bar.setVisible(rendering)
+        self.cancel_btn.setVisible(bool(active))
+        self.queue_label.setVisible(bool(active))
+        if active:
+            current, total = self.render_progress
+            text = f"Rendu PDF : {current}/{total} — " if rendering else ""
+            text += f"file de correction : {waiting}/{self.grading_pool().max_pending} — en cours : {running}"
+            pending = len(self.image_backlog) + len(self.import_queue)
+            if pending:
+                text += f" — en attente : {pending}"
+            self.queue_label.setText(text)
+
+    def cancel_import(self):
+        """
+        Stop rendering and grading cooperatively: the pages being graded are finished,
+        the others stay unfinished in their journal (importing the PDF again resumes it)
+        """
+        if self.pdf_worker is not None:
+            self.pdf_worker.cancel()
+        if self.current_job is not None:
+            self.current_job.cancel()
+        dropped = self.pool.drain() if self.pool is not None else []
+        dropped += list(self.image_backlog)
+        self.image_backlog.clear()
+        self.import_queue.clear()
+        for path in dropped:
+            self.page_jobs.pop(path, None)
+            self.image_keys.pop(path, None)
+        print(f"[INFO] Import annulé : {len(dropped)} page(s) non corrigée(s)")
+        self.stats_display.setPlainText(f"⏹️ Import annulé : {len(dropped)} page(s) non corrigée(s).\n"
+                                        f"Réimporter le PDF reprend à la première page non corrigée.")
+        self.stats_display.setVisible(True)
+        self.update_import_status()
 
-            
-      
     def on_image_processed(self, result: dict):
         # Mise à jour des données
         path = result["image"]
         self.copy_data[path] = {
             "image": result["image"],
             "filled": result["filled"],
-            "centers": result["centers"]
+            "centers": result["centers"],
+            "timings": result.get("timings", {}),
+            "douteux": {int(q): s for q, s in (result.get("douteux") or {}).items()},
         }
-        self.douteux = result["douteux"]
 
-        # Ajout dans la liste UI
-        copy_dir = result["copy_dir"]
-        final_name = os.path.basename(copy_dir)
-        item = QtWidgets.QListWidgetItem(f"[Dossier] {final_name}")
-        item.setData(QtCore.Qt.UserRole, copy_dir)
-        self.file_list.addItem(item)
+        ledger_entry = self.image_keys.pop(result.get("source"), None)
+        if ledger_entry is not None:
+            self.ledger.add(*ledger_entry, pages=1)
+        self.finish_job_page(result.get("source"), "graded", result["copy_dir"])
 
-        self.progress_bar.setVisible(False)
+        # Ajout dans la liste UI (si on affiche la racine du projet)
+        copy_dir = result["copy_dir"]
+        if self.current_view_path == self.project_path and self.file_model.find_path(copy_dir) == -1:
+            self.file_model.append_entries([{"kind": "dir", "path": copy_dir, "summary": result.get("summary")}])
 
     def on_need_manual_review(self, path, douteux):
-        self.douteux = douteux
-        self.open_review_dialog(path)
+        """
+        A graded copy has doubtful questions: queued for review, never a popup during a batch
+        """
+        self.doubtful_copies.add(dirname(path))
+        self.update_review_queue_button()
+        if self.review_queue_dialog is not None and self.review_queue_dialog.isVisible():
+            self.review_queue_dialog.add_copy(dirname(path))
+
+    def scan_review_queue(self):
+        """
+        Count the doubtful copies of the whole project in a background thread: the list only
+        pages its entries in as the user scrolls
+        """
+        self.reviewQueueScanned.connect(self.on_review_queue_scanned)
+        threading.Thread(target=lambda: self.reviewQueueScanned.emit(
+            {item["copy_dir"] for item in collect_review_queue(self.project_path)}), daemon=True).start()
+
+    def on_review_queue_scanned(self, copy_dirs):
+        self.doubtful_copies |= copy_dirs - self.reviewed_copies
+        self.update_review_queue_button()
+
+    def update_review_queue_button(self):
+        count = len(self.doubtful_copies)
+        self.review_queue_btn.setText(f"Copies à vérifier ({count})" if count else "Copies à vérifier")
+
+    def show_review_queue(self):
+        """
+        Non-modal list of the doubtful copies, most uncertain first (grading goes on meanwhile)
+        """
+        if self.review_queue_dialog is None:
+            self.review_queue_dialog = ReviewQueueDialog(self.project_path, self.open_review_dialog, self)
+        else:
+            self.review_queue_dialog.refresh()
+        self.review_queue_dialog.show()
+        self.review_queue_dialog.raise_()
+
+    def on_page_skipped(self, report):
+        """
+        A page was rejected by the pre-filter: listed in the side panel, no popup during a batch
+        """
+        ledger_entry = self.image_keys.pop(join(self.project_path, report["file"]), None)
+        if ledger_entry is not None:
+            self.ledger.add(*ledger_entry, pages=0, skipped=report["status"])
+        self.finish_job_page(join(self.project_path, report["file"]), "skipped")
+        self.skipped_pages.append(report)
+        lines = [f"   - {r['file']} : {SKIP_REASONS.get(r['status'], r['status'])}" for r in self.skipped_pages]
+        self.stats_display.setPlainText(f"⚠️ Pages ignorées ({len(self.skipped_pages)}) :\n" + "\n".join(lines))
+        self.stats_display.setVisible(True)
+
+    def on_page_failed(self, path):
+        self.finish_job_page(path, "error")
+
+    def finish_job_page(self, image, status, copy_dir=None):
+        """
+        Record in its job journal that a rendered PDF page is graded (or skipped, or failed);
+        the watched file is recorded in the ledger once its last page is done
+        """
+        entry = self.page_jobs.pop(image, None)
+        if entry is None:
+            return
+        job, n = entry
+        if job.mark_graded(n, status, copy_dir):
+            self.complete_job(job)
+
+    def record_copy_dir(self, image, copy_dir):
+        """
+        Called from a grading thread when the copy folder of a page is created or renamed:
+        its job journal records it, so a resume removes the folder if the grading did not finish
+        """
+        for job in tuple(self.active_jobs.values()):
+            n = job.page_for_image(image)
+            if n is not None:
+                job.mark_grading(n, copy_dir)
+                return
+
+    def complete_job(self, job):
+        print(f"[INFO] Import terminé : {basename(job.source)}")
+        self.active_jobs.pop(job.id, None)
+        if job.data.get("ledger_key") is not None:
+            self.ledger.add(job.data["ledger_key"], job.source, pages=job.total)
 
     def on_image_error(self, msg):
-        self.progress_bar.setVisible(False)
         QtWidgets.QMessageBox.critical(self, "Erreur traitement", msg)
 
     def process_image(self, path):
-        self.start_image_processing(path)
+        self.image_backlog.append(path)
+        self.feed_pool()
+        self.update_import_status()
 
 
-    def addItem(self, path):
+    def add_item_buttons(self, path):
         """
-        Adds an item to list display
-        (only adds one element contrary to refreshfromlist who completely refresh list)
+        Adds the edit buttons of a block image to its row in the list
         """
-        name = basename(path)
-        if self.file_list.findItems(name, QtCore.Qt.MatchExactly):
+        row = self.file_model.find_path(path)
+        if row == -1:
             return
-
-        item = w.QListWidgetItem(name)
-        item.setData(QtCore.Qt.UserRole, path)
-        self.file_list.addItem(item)
+        name = basename(path)
 
         widget = None
         layout = None
@@ -436,8 +730,7 @@ class ProjectDialog(w.QDialog):
         if widget:
             layout.setContentsMargins(0, 0, 0, 0)
             widget.setLayout(layout)
-            item.setSizeHint(widget.sizeHint())
-            self.file_list.setItemWidget(item, widget)
+            self.file_list.setIndexWidget(self.file_model.index(row), widget)
 
     def edit_student_name(self, path):
         """
@@ -468,15 +761,19 @@ class ProjectDialog(w.QDialog):
         Callback
         """
         print(f"[PD] on_image_ready: {path}")
-
-        # ⚡ Lancer le même pipeline que pour une image classique
-        self.process_image(path)
+        # la page est déjà dans la file de correction (GradingPool.submit, depuis le thread de rendu)
+        if self.current_job is not None:
+            self.page_jobs[path] = (self.current_job, self.current_job.page_for_image(path))
 
     def on_pdf_conversion_done(self, image_paths):
         print("[PD] on_pdf_conversion_done ENTER")
         try:
-            self.progress_bar.setVisible(False)
             print(f"[PD] pages converted: {len(image_paths)}")
+            if self.pdf_worker is not None and self.pdf_worker.cancelled and self.current_job is not None:
+                self.active_jobs.pop(self.current_job.id, None)
+            # PDF sans page à noter (vide, ou déjà entièrement noté)
+            if self.current_job is not None and self.current_job.close_if_done():
+                self.complete_job(self.current_job)
 
         finally:
             if self.pdf_thread and self.pdf_thread.isRunning():
@@ -484,44 +781,60 @@ class ProjectDialog(w.QDialog):
                 self.pdf_thread.wait()
             self.pdf_thread = None
             self.pdf_worker = None
+            self.current_job = None
             print("[PD] on_pdf_conversion_done EXIT")
+            self.update_import_status()
+            self.start_next_import()
 
 
 
     def on_pdf_conversion_error(self, message):
         print("[PD] on_pdf_conversion_error ENTER")
-        self.progress_bar.setVisible(False)
         print("[PD] ERROR MESSAGE:", message)
+        if self.pdf_thread and self.pdf_thread.isRunning():
+            self.pdf_thread.quit()
+            self.pdf_thread.wait()
+        self.pdf_thread = None
+        self.pdf_worker = None
+        # le journal garde les pages déjà rendues : reprise au prochain import ou à la réouverture
+        if self.current_job is not None:
+            self.active_jobs.pop(self.current_job.id, None)
+        self.current_job = None
+        self.update_import_status()
         w.QMessageBox.critical(self, "Erreur de conversion", message)
         print("[PD] on_pdf_conversion_error EXIT")
+        self.start_next_import()
 
     def update_progress(self, current, total):
         """
         Update progress bar during operation
         """
+        self.render_progress = (current, total)
         self.progress_bar.setMaximum(total)
         self.progress_bar.setValue(current)
+        self.update_import_status()
 
-    def handle_item_double_click(self, item):
+    def handle_item_double_click(self, index):
         """
         Double click event for list items
-        :param item:
+        :param index:
         :return:
         """
-        path = item.data(QtCore.Qt.UserRole)
+        entry = index.data(EntryRole)
+        path = entry["path"]
 
-        if item.text().startswith("⬅️"):
+        if entry["kind"] == "back":
             self.stats_display.setVisible(False)
             self.load_existing_copies()
             return
 
         # Si c’est un dossier on peut y aller
         if isdir(path):
-            self.display_files_in_directory(item)
+            self.display_files_in_directory(entry)
             return
 
         # Si c’est une image on peut la voir
-        self.open_image(item)
+        self.open_image(path)
 
         if "_questions" in os.path.basename(path).lower():
             self.display_stats(path)
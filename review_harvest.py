@@ -0,0 +1,56 @@
+# review_harvest.py
+"""
+Bubbles corrected in the manual review are the classifier's mistakes: their
+patches are added to a training store shared by every project, from which
+train_circle_classifier.py --incremental grows new trees.
+"""
+from os.path import basename, dirname, join
+
+import cv2
+import numpy as np
+
+from overlay import base_image_path
+from patch_features import extract_patches
+from patch_store import PatchStore
+
+REVIEW_STORE_DIR = join(".training", "review_patches")
+REVIEW_SOURCE = "review"
+
+
+def review_store_path(project_path):
+    """
+    Store of corrected patches, next to the projects (writable, unlike the bundled resources)
+    """
+    return join(dirname(project_path), REVIEW_STORE_DIR)
+
+
+def harvest_review(image_path, centers, final_filled, modified_questions, project_path):
+    """
+    Add the 4 bubbles of every modified question, labelled by the teacher, to the review store
+    :param image_path: question block of the copy
+    :param centers: bubble centres in the aligned block
+    :param final_filled: answers after review
+    :param modified_questions: question numbers changed by the teacher
+    :return: number of stored patches
+    """
+    if not modified_questions:
+        return 0
+    centers = np.asarray(centers, dtype=int).reshape(-1, 2)
+    rows = np.array([i for q in sorted(modified_questions) for i in range((q - 1) * 4, q * 4)
+                     if i < len(centers) and i < len(final_filled)], dtype=int)
+    if rows.size == 0:
+        return 0
+
+    gray = cv2.imread(base_image_path(image_path), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        print(f"[WARN] Bloc introuvable pour la collecte des corrections : {image_path}")
+        return 0
+
+    patches, valid = extract_patches(gray, centers[rows])
+    labels = np.asarray(final_filled, dtype=np.int8)[rows]
+    store = PatchStore(review_store_path(project_path))
+    added = store.append(patches[valid], labels[valid],
+                         sheet=f"{basename(project_path)}/{basename(dirname(image_path))}",
+                         positions=centers[rows][valid], source=REVIEW_SOURCE)
+    print(f"[INFO] {added} case(s) corrigée(s) ajoutée(s) à la base d'entraînement")
+    return added
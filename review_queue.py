@@ -0,0 +1,143 @@
+# review_queue.py
+"""
+Doubtful copies waiting for a manual review, most uncertain first.
+
+Grading never opens a review dialog: the copies with doubtful questions are
+collected here and the teacher works through them during or after the batch.
+"""
+import json
+from os.path import basename, exists, join
+
+from PySide6 import QtCore, QtWidgets
+
+from meta_updater import iter_copy_metas
+
+
+def question_margin(scores):
+    """Gap between the two highest probabilities of a question (0 = undecidable)"""
+    top = sorted((float(s) for s in scores), reverse=True)
+    return top[0] - top[1] if len(top) > 1 else 1.0
+
+
+def copy_uncertainty(douteux):
+    """
+    Uncertainty of a copy: sum over its doubtful questions of 1 - margin,
+    so many and tight doubts come first
+    """
+    return sum(1.0 - question_margin(scores) for scores in (douteux or {}).values())
+
+
+def review_item(copy_dir, meta):
+    """
+    Queue entry of a graded copy, None if it has no doubt or was already reviewed
+    """
+    douteux = meta.get("douteux") or {}
+    if not douteux or meta.get("reviewed") or not meta.get("image"):
+        return None
+    return {
+        "copy_dir": copy_dir,
+        # le dossier a pu être renommé après l'enregistrement du chemin du bloc
+        "image": join(copy_dir, basename(meta["image"])),
+        "nom": meta.get("nom") or basename(copy_dir),
+        "douteux": {int(q): s for q, s in douteux.items()},
+        "uncertainty": round(copy_uncertainty(douteux), 3),
+    }
+
+
+def collect_review_queue(project_path):
+    """
+    Doubtful copies of a project, most uncertain first
+    """
+    items = []
+    for name, meta in iter_copy_metas(project_path):
+        item = review_item(join(project_path, name), meta)
+        if item is not None:
+            items.append(item)
+    return sorted(items, key=lambda item: -item["uncertainty"])
+
+
+class ReviewQueueDialog(QtWidgets.QDialog):
+    def __init__(self, project_path, review, parent=None):
+        """
+        Non-modal list of the copies to review
+        :param project_path: path of the project
+        :param review: callable(image path) opening the manual review of a copy
+        :param parent: parent
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Copies à vérifier")
+        self.setMinimumSize(500, 400)
+        self.project_path = project_path
+        self.review = review
+        self.items = []
+
+        layout = QtWidgets.QVBoxLayout(self)
+        self.info_label = QtWidgets.QLabel()
+        layout.addWidget(self.info_label)
+
+        self.table = QtWidgets.QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(["Copie", "Questions douteuses", "Incertitude"])
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.cellDoubleClicked.connect(lambda row, _: self.review_row(row))
+        layout.addWidget(self.table)
+
+        buttons = QtWidgets.QHBoxLayout()
+        review_btn = QtWidgets.QPushButton("Réviser la copie")
+        review_btn.clicked.connect(lambda: self.review_row(self.table.currentRow()))
+        next_btn = QtWidgets.QPushButton("Réviser la plus incertaine")
+        next_btn.clicked.connect(lambda: self.review_row(0))
+        close_btn = QtWidgets.QPushButton("Fermer")
+        close_btn.clicked.connect(self.close)
+        buttons.addWidget(review_btn)
+        buttons.addWidget(next_btn)
+        buttons.addWidget(close_btn)
+        layout.addLayout(buttons)
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reload the queue from the copies' metadata (new copies graded meanwhile included)
+        """
+        self.items = collect_review_queue(self.project_path)
+        self.render()
+
+    def add_copy(self, copy_dir):
+        """
+        Insert a copy graded while the queue is open (reads only its own meta.json)
+        """
+        meta_path = join(copy_dir, "meta.json")
+        if not exists(meta_path):
+            return
+        try:
+            with open(meta_path, "r") as f:
+                item = review_item(copy_dir, json.load(f))
+        except Exception as e:
+            print(f"[ERREUR] Lecture {meta_path} : {e}")
+            return
+        if item is None:
+            return
+        self.items = sorted([i for i in self.items if i["copy_dir"] != copy_dir] + [item],
+                            key=lambda i: -i["uncertainty"])
+        self.render()
+
+    def render(self):
+        self.table.setRowCount(len(self.items))
+        for row, item in enumerate(self.items):
+            questions = ", ".join(f"Q{q}" for q in sorted(item["douteux"]))
+            for col, value in enumerate([item["nom"], questions, f"{item['uncertainty']:.2f}"]):
+                cell = QtWidgets.QTableWidgetItem(value)
+                if col == 2:
+                    cell.setTextAlignment(QtCore.Qt.AlignRight | QtCore.Qt.AlignVCenter)
+                self.table.setItem(row, col, cell)
+        self.table.resizeColumnsToContents()
+        self.info_label.setText(f"🔎 {len(self.items)} copie(s) à vérifier, la plus incertaine en premier")
+
+    def review_row(self, row):
+        if not 0 <= row < len(self.items):
+            return
+        self.review(self.items[row]["image"])
+        self.refresh()
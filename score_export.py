@@ -0,0 +1,150 @@
+# score_export.py
+import csv
+import os
+from os.path import exists, join, splitext
+
+import numpy as np
+
+from meta_updater import iter_copy_metas, load_corrections
+
+NB_QUESTIONS = 200
+CHOICES = "ABCD"
+SCORE_COLUMNS = ["Nom", "raw_score", "scaled_listening", "scaled_reading", "scaled_total",
+                 "part1", "part2", "part3", "part4", "part5", "part6", "part7"]
+EXPORT_FORMATS = {".xlsx": "xlsx", ".csv": "csv", ".parquet": "parquet"}
+
+
+def answer_key_indices(project_path):
+    """
+    Index (0-3) of the right answer for each question, -1 when unknown
+    """
+    key = np.full(NB_QUESTIONS, -1, dtype=int)
+    correction_path = join(project_path, "toeic_correction.csv")
+    if exists(correction_path):
+        for q_num, letter in load_corrections(correction_path):
+            if 1 <= q_num <= NB_QUESTIONS and letter and letter in CHOICES:
+                key[q_num - 1] = CHOICES.index(letter)
+    return key
+
+
+def response_matrix(filled):
+    """
+    (200, 4) boolean matrix of the marked bubbles of a copy
+    """
+    f = np.zeros(NB_QUESTIONS * 4, dtype=bool)
+    values = np.asarray(filled[:NB_QUESTIONS * 4], dtype=bool)
+    f[:len(values)] = values
+    return f.reshape(NB_QUESTIONS, 4)
+
+
+def export_header(include_responses=False, include_correctness=False):
+    header = list(SCORE_COLUMNS)
+    if include_responses:
+        header += [f"Q{q}" for q in range(1, NB_QUESTIONS + 1)]
+    if include_correctness:
+        header += [f"Q{q}_ok" for q in range(1, NB_QUESTIONS + 1)]
+    return header
+
+
+def iter_export_rows(project_path, include_responses=False, include_correctness=False):
+    """
+    Yields one export row (list) per copy, reading the meta.json files one by one
+    """
+    key = answer_key_indices(project_path) if include_correctness else None
+
+    for name, meta in iter_copy_metas(project_path):
+        subparts = meta.get("subparts", {})
+        row = [meta.get("nom", name), meta.get("raw_score"), meta.get("scaled_listening"),
+               meta.get("scaled_reading"), meta.get("scaled_total")]
+        row += [subparts.get(f"part{i}") for i in range(1, 8)]
+
+        if include_responses or include_correctness:
+            responses = response_matrix(meta.get("filled", []))
+        if include_responses:
+            row += ["".join(CHOICES[c] for c in np.flatnonzero(r)) for r in responses]
+        if include_correctness:
+            ok = (responses.sum(axis=1) == 1) & (responses.argmax(axis=1) == key)
+            row += ok.astype(int).tolist()
+        yield row
+
+
+def _write_csv(path, header, rows):
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def _write_xlsx(path, header, rows):
+    from openpyxl import Workbook
+
+    # mode write-only : les lignes sont écrites au fil de l'eau, sans garder la feuille en mémoire
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Résultats")
+    ws.append(header)
+    count = 0
+    for row in rows:
+        ws.append(row)
+        count += 1
+    wb.save(path)
+    return count
+
+
+def _write_parquet(path, header, rows, batch_size=500):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("L'export Parquet nécessite le paquet pyarrow.")
+
+    types = {"Nom": pa.string()}
+    for col in header:
+        if col not in types:
+            is_answer = col.startswith("Q") and not col.endswith("_ok")
+            types[col] = pa.string() if is_answer else pa.int64()
+    schema = pa.schema([(col, types[col]) for col in header])
+
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, schema) as writer:
+        for row in rows:
+            batch.append(row)
+            count += 1
+            if len(batch) >= batch_size:
+                writer.write_batch(_record_batch(pa, schema, batch))
+                batch = []
+        if batch:
+            writer.write_batch(_record_batch(pa, schema, batch))
+    return count
+
+
+def _record_batch(pa, schema, batch):
+    columns = list(zip(*batch))
+    return pa.record_batch([pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema)
+
+
+def export_scores(project_path, path, include_responses=False, include_correctness=False):
+    """
+    Stream the scores of a project to xlsx, csv or parquet (chosen from the extension)
+    :param project_path: path of the project
+    :param path: output file
+    :param include_responses: add the 200 marked answers (Q1..Q200)
+    :param include_correctness: add 200 right (1) / wrong (0) columns
+    :return: number of exported copies
+    """
+    fmt = EXPORT_FORMATS.get(splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Format d'export inconnu : {path}")
+
+    header = export_header(include_responses, include_correctness)
+    rows = iter_export_rows(project_path, include_responses, include_correctness)
+    writer = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}[fmt]
+    count = writer(path, header, rows)
+
+    if count == 0 and exists(path):
+        os.remove(path)
+    return count
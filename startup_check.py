@@ -0,0 +1,89 @@
+# startup_check.py
+"""
+Cold-start budget of the desktop app: time until the main window is shown, and
+heavy modules that must not be loaded before it (they are imported at first
+use: the grading stack when copies are imported, PyMuPDF on the first PDF…).
+
+Runs the app (source or PyInstaller build) with EEC_STARTUP_PROBE set to the
+launch instant: main.py prints the elapsed time and the loaded modules once the
+window is shown, then quits. Exits with 1 when the budget is exceeded or a heavy
+module is loaded at startup.
+
+Usage : python startup_check.py [--budget 3.0] [--runs 3] [--exe dist/main/main] [--importtime]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from os.path import abspath, dirname
+
+HEAVY_MODULES = ("cv2", "sklearn", "joblib", "fitz", "pandas", "scipy", "project_dialog", "image_worker")
+MARKER = "[STARTUP] first_window"
+
+
+def time_to_first_window(command, timeout=60.0):
+    """
+    Time (s) from launch to the window being shown, measured by the app itself from
+    the launch instant passed in EEC_STARTUP_PROBE, and the top-level modules then loaded
+    """
+    env = dict(os.environ, EEC_STARTUP_PROBE=repr(time.time()))
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    out = subprocess.run(command, capture_output=True, text=True, timeout=timeout,
+                         cwd=dirname(abspath(__file__)), env=env)
+    for line in out.stdout.splitlines():
+        if line.startswith(MARKER):
+            elapsed, *modules = line[len(MARKER):].split()
+            return float(elapsed), set(modules)
+    raise RuntimeError(f"Pas de fenêtre affichée (code {out.returncode}) : {' '.join(command)}\n{out.stderr[-2000:]}")
+
+
+def import_profile(top=10):
+    """
+    Slowest cumulative imports of main.py (python -X importtime), in µs
+    """
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                         capture_output=True, text=True, cwd=dirname(abspath(__file__)))
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((int(cumulative), name.strip()))
+        except ValueError:
+            continue   # ligne d'en-tête
+    return sorted(rows, reverse=True)[:top]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Budget de démarrage de l'application")
+    parser.add_argument("--budget", type=float, default=3.0, help="temps max avant la première fenêtre (s)")
+    parser.add_argument("--runs", type=int, default=3, help="lancements (le meilleur est retenu)")
+    parser.add_argument("--exe", default=None, help="exécutable PyInstaller (par défaut : python main.py)")
+    parser.add_argument("--importtime", action="store_true", help="afficher les imports les plus lents")
+    args = parser.parse_args()
+
+    command = [abspath(args.exe)] if args.exe else [sys.executable, "main.py"]
+    if args.importtime and not args.exe:
+        for cumulative, name in import_profile():
+            print(f"[INFO] {cumulative / 1000:8.1f} ms  {name}")
+
+    timings, heavy = [], set()
+    for run in range(args.runs):
+        elapsed, modules = time_to_first_window(command)
+        timings.append(elapsed)
+        heavy |= modules & set(HEAVY_MODULES)
+        print(f"[INFO] Lancement {run + 1} : première fenêtre en {elapsed:.2f} s")
+
+    best = min(timings)
+    failed = False
+    if heavy:
+        print(f"[ERREUR] Modules lourds chargés avant la première fenêtre : {', '.join(sorted(heavy))}")
+        failed = True
+    if best > args.budget:
+        print(f"[ERREUR] Démarrage {best:.2f} s > budget {args.budget:.2f} s")
+        failed = True
+    if not failed:
+        print(f"[✔] Démarrage {best:.2f} s (budget {args.budget:.2f} s), aucun module lourd chargé")
+    sys.exit(1 if failed else 0)
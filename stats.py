@@ -1,13 +1,14 @@
 # stats.py
 
 import os
-import json
 import numpy as np
-from os.path import join
 from PySide6 import QtWidgets
-import pandas as pd
 from PySide6.QtWidgets import QFileDialog
 
+from item_analysis import export_item_statistics, item_rows, load_response_tensor, project_item_statistics
+from meta_updater import iter_copy_metas
+from score_export import export_scores
+
 part_names = [
     "part1", "part2", "part3", "part4",
     "part5", "part6", "part7"
@@ -45,14 +46,19 @@ class StatsDialog(QtWidgets.QDialog):
         self.setMinimumSize(600, 400)
         self.layout = QtWidgets.QVBoxLayout(self)
 
-        export_btn = QtWidgets.QPushButton("📁 Exporter vers Excel")
-        export_btn.clicked.connect(lambda: export_scores_to_excel(project_path, self))
+        export_btn = QtWidgets.QPushButton("📁 Exporter (Excel / CSV / Parquet)")
+        export_btn.clicked.connect(lambda: export_scores_to_file(project_path, self))
         self.layout.addWidget(export_btn)
 
-        scores = self.load_scores(project_path)
+        scores, responses = self.load_scores(project_path)
+
+        tabs = QtWidgets.QTabWidget()
+        self.layout.addWidget(tabs)
 
-        self.layout.addWidget(QtWidgets.QLabel("📊 Scores bruts (par sous-partie)"))
-        self.layout.addWidget(self.create_table(
+        scores_tab = QtWidgets.QWidget()
+        scores_layout = QtWidgets.QVBoxLayout(scores_tab)
+        scores_layout.addWidget(QtWidgets.QLabel("📊 Scores bruts (par sous-partie)"))
+        scores_layout.addWidget(self.create_table(
             headers=["Section", "Moyenne", "Médiane", "Min", "Max"],
             rows=[
                 [part_labels[part]] + compute_stats([s["subparts"].get(part, 0) for s in scores])
@@ -60,38 +66,75 @@ class StatsDialog(QtWidgets.QDialog):
             ]
         ))
 
-        self.layout.addWidget(QtWidgets.QLabel("📈 Scores échelonnés (globaux)"))
-        self.layout.addWidget(self.create_table(
+        scores_layout.addWidget(QtWidgets.QLabel("📈 Scores échelonnés (globaux)"))
+        scores_layout.addWidget(self.create_table(
             headers=["Section", "Moyenne", "Médiane", "Min", "Max"],
             rows=[
                 [label] + compute_stats([s.get(key, 0) for s in scores])
                 for key, label in global_keys
             ]
         ))
+        tabs.addTab(scores_tab, "Scores")
+
+        self.item_stats, self.item_key = project_item_statistics(project_path, responses)
+        tabs.addTab(self.create_item_tab(), "Analyse des items")
 
         close_btn = QtWidgets.QPushButton("Fermer")
         close_btn.clicked.connect(self.accept)
         self.layout.addWidget(close_btn)
 
     def load_scores(self, project_path):
-        scores = []
-        for name in os.listdir(project_path):
-            dir_path = join(project_path, name)
-            meta_path = join(dir_path, "meta.json")
-            if not os.path.exists(meta_path):
-                continue
-            try:
-                with open(meta_path, "r") as f:
-                    meta = json.load(f)
-                scores.append({
-                    "subparts": meta.get("subparts", {}),
-                    "scaled_listening": meta.get("scaled_listening", 0),
-                    "scaled_reading": meta.get("scaled_reading", 0),
-                    "scaled_total": meta.get("scaled_total", 0)
-                })
-            except Exception as e:
-                print(f"[ERREUR] Lecture {meta_path} : {e}")
-        return scores
+        """
+        Reads every meta.json once
+        :return: list of score dicts and the (N, 200, 4) response tensor
+        """
+        scores, metas = [], []
+        for name, meta in iter_copy_metas(project_path):
+            scores.append({
+                "subparts": meta.get("subparts", {}),
+                "scaled_listening": meta.get("scaled_listening", 0),
+                "scaled_reading": meta.get("scaled_reading", 0),
+                "scaled_total": meta.get("scaled_total", 0)
+            })
+            metas.append({"filled": meta.get("filled", [])})
+        return scores, load_response_tensor(project_path, metas)
+
+    def create_item_tab(self):
+        """
+        Per-question difficulty, discrimination, choice frequencies and blank / multiple rates
+        """
+        tab = QtWidgets.QWidget()
+        layout = QtWidgets.QVBoxLayout(tab)
+
+        export_btn = QtWidgets.QPushButton("📁 Exporter l'analyse des items (CSV)")
+        export_btn.clicked.connect(self.export_item_analysis)
+        layout.addWidget(export_btn)
+
+        def fmt(v, pct=False):
+            if np.isnan(v):
+                return "N/A"
+            return f"{v * 100:.1f} %" if pct else f"{v:.2f}"
+
+        rows = []
+        for q, key, p, r, a, b, c, d, blank, multi in item_rows(self.item_stats, self.item_key):
+            rows.append([f"Q{q}", key, fmt(p), fmt(r)] + [fmt(v, pct=True) for v in (a, b, c, d, blank, multi)])
+
+        layout.addWidget(self.create_table(
+            headers=["Question", "Réponse", "Difficulté (p)", "Discrimination (r_pb)",
+                     "A", "B", "C", "D", "Vide", "Multiple"],
+            rows=rows
+        ))
+        return tab
+
+    def export_item_analysis(self):
+        if not self.item_stats["copies"]:
+            QtWidgets.QMessageBox.warning(self, "Export", "Aucune copie valide trouvée.")
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Exporter l'analyse des items", "analyse_items.csv",
+                                              "CSV (*.csv)")
+        if path:
+            export_item_statistics(self.item_stats, self.item_key, path)
+            QtWidgets.QMessageBox.information(self, "Export terminé", f"Fichier exporté :\n{path}")
 
     def create_table(self, headers, rows):
         table = QtWidgets.QTableWidget()
@@ -110,36 +153,45 @@ class StatsDialog(QtWidgets.QDialog):
         table.resizeColumnsToContents()
         return table
 
-def export_scores_to_excel(project_path, parent=None):
-    rows = []
-    for name in os.listdir(project_path):
-        dir_path = join(project_path, name)
-        meta_path = join(dir_path, "meta.json")
-        if not os.path.exists(meta_path):
-            continue
-        try:
-            with open(meta_path, "r") as f:
-                meta = json.load(f)
-            row = {
-                "Nom": meta.get("nom", name),
-                "raw_score": meta.get("raw_score", None),
-                "scaled_listening": meta.get("scaled_listening", None),
-                "scaled_reading": meta.get("scaled_reading", None),
-                "scaled_total": meta.get("scaled_total", None)
-            }
-            subparts = meta.get("subparts", {})
-            for k in ["part1", "part2", "part3", "part4", "part5", "part6", "part7"]:
-                row[k] = subparts.get(k, None)
-            rows.append(row)
-        except Exception as e:
-            print(f"[ERREUR] Lecture {meta_path} : {e}")
-
-    if not rows:
-        QtWidgets.QMessageBox.warning(parent, "Export", "Aucune copie valide trouvée.")
+class ExportOptionsDialog(QtWidgets.QDialog):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Options d'export")
+        layout = QtWidgets.QVBoxLayout(self)
+
+        self.responses_cb = QtWidgets.QCheckBox("Inclure les réponses (200 colonnes)")
+        self.correctness_cb = QtWidgets.QCheckBox("Inclure la matrice juste / faux (200 colonnes)")
+        layout.addWidget(self.responses_cb)
+        layout.addWidget(self.correctness_cb)
+
+        buttons = QtWidgets.QDialogButtonBox(QtWidgets.QDialogButtonBox.Ok | QtWidgets.QDialogButtonBox.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+
+def export_scores_to_file(project_path, parent=None):
+    options = ExportOptionsDialog(parent)
+    if not options.exec():
         return
 
-    df = pd.DataFrame(rows)
-    path, _ = QFileDialog.getSaveFileName(parent, "Exporter en Excel", "resultats.xlsx", "Fichiers Excel (*.xlsx)")
-    if path:
-        df.to_excel(path, index=False)
-        QtWidgets.QMessageBox.information(parent, "Export terminé", f"Fichier exporté :\n{path}")
\ No newline at end of file
+    path, selected = QFileDialog.getSaveFileName(
+        parent, "Exporter les résultats", "resultats.xlsx",
+        "Fichiers Excel (*.xlsx);;CSV (*.csv);;Parquet (*.parquet)")
+    if not path:
+        return
+    if not os.path.splitext(path)[1]:
+        path += selected[selected.index("*") + 1:-1]
+
+    try:
+        count = export_scores(project_path, path,
+                              include_responses=options.responses_cb.isChecked(),
+                              include_correctness=options.correctness_cb.isChecked())
+    except Exception as e:
+        QtWidgets.QMessageBox.critical(parent, "Export", f"Échec de l'export :\n{e}")
+        return
+
+    if not count:
+        QtWidgets.QMessageBox.warning(parent, "Export", "Aucune copie valide trouvée.")
+        return
+    QtWidgets.QMessageBox.information(parent, "Export terminé", f"{count} copies exportées :\n{path}")
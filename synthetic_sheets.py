@@ -0,0 +1,243 @@
+# synthetic_sheets.py
+"""
+Generates synthetic filled answer sheets with their ground truth, used by benchmark.py.
+
+Usage : python synthetic_sheets.py OUTPUT_DIR --count 1000 [--seed 0]
+"""
+import argparse
+import json
+import os
+from os.path import exists, join
+
+import cv2
+import numpy as np
+
+import circle_manager as cm
+from alignment import NAME_BLOCK, QUESTION_BLOCK, estimate_homography
+from constants import ACCENT_COMBINATIONS, ACCENTS, BASE_DIR, LETTERS, TEMPLATE_PATH
+
+SHEET_PATHS = [TEMPLATE_PATH, join(BASE_DIR, "Answer_sheet2.jpg")]
+
+NAME_ROWS = len(ACCENTS) + len(LETTERS)  # 7 accents + 28 lettres
+NB_QUESTIONS = 200
+CHOICES = "ABCD"
+
+
+# === GÉOMÉTRIE DE LA FEUILLE ===
+
+def reference_layout(template):
+    """
+    Bubble centres of the reference template, in page coordinates
+    :param template: reference template (BGR)
+    :return: name grid (35, n_cols, 2) and questions (200, 4, 2)
+    """
+    y0, y1, x0, x1 = NAME_BLOCK
+    name_centers = cm.detect_and_align_circles(template[y0:y1, x0:x1]) + [x0, y0]
+    n_cols = len(name_centers) // NAME_ROWS
+    if n_cols * NAME_ROWS != len(name_centers):
+        raise ValueError(f"Grille du nom inattendue : {len(name_centers)} cercles")
+
+    y0, y1, x0, x1 = QUESTION_BLOCK
+    q_centers = cm.detect_and_align_circles(template[y0:y1, x0:x1]) + [x0, y0]
+    if len(q_centers) != NB_QUESTIONS * 4:
+        raise ValueError(f"Grille des questions inattendue : {len(q_centers)} cercles")
+
+    # grille 25 lignes x 8 groupes x 4 choix, numérotée colonne par colonne (Q = col * 25 + ligne + 1)
+    questions = q_centers.reshape(25, 8, 4, 2).transpose(1, 0, 2, 3).reshape(NB_QUESTIONS, 4, 2)
+    return name_centers.reshape(NAME_ROWS, n_cols, 2), questions
+
+
+def map_layout(points, sheet, template):
+    """
+    Project reference-template points onto another blank sheet
+    """
+    if sheet is template:
+        return points
+    M = estimate_homography(sheet, template)
+    if M is None:
+        raise ValueError("Impossible d'aligner la feuille sur le template")
+    pts = points.reshape(-1, 1, 2).astype(np.float32)
+    mapped = cv2.perspectiveTransform(pts, np.linalg.inv(M))
+    return np.rint(mapped).astype(int).reshape(points.shape)
+
+
+# === MARQUAGE ===
+
+def draw_mark(img, center, rng, kind="full"):
+    """
+    Draw a pencil mark on a bubble
+    :param kind: "full", "partial" (both count as filled) or "erased" (counts as empty)
+    """
+    x, y = int(center[0]), int(center[1])
+    angle = float(rng.uniform(0, 180))
+    if kind == "full":
+        v = int(rng.integers(15, 90))
+        axes = (int(rng.integers(9, 13)), int(rng.integers(8, 12)))
+        cv2.ellipse(img, (x, y), axes, angle, 0, 360, (v, v, v), -1)
+    elif kind == "partial":
+        v = int(rng.integers(40, 110))
+        axes = (int(rng.integers(8, 11)), int(rng.integers(4, 7)))
+        cv2.ellipse(img, (x, y), axes, angle, 0, 360, (v, v, v), -1)
+    elif kind == "erased":
+        v = int(rng.integers(170, 215))
+        axes = (int(rng.integers(8, 12)), int(rng.integers(7, 11)))
+        cv2.ellipse(img, (x, y), axes, angle, 0, 360, (v, v, v), -1)
+
+
+def random_name_part(rng, max_len):
+    plain = [c for c in LETTERS if c.isalpha()]
+    accented = list(ACCENT_COMBINATIONS.items())
+    chars = []
+    for _ in range(int(rng.integers(3, max_len + 1))):
+        if rng.random() < 0.1:
+            (accent, letter), combined = accented[rng.integers(len(accented))]
+            chars.append((accent, letter, combined))
+        else:
+            letter = plain[rng.integers(len(plain))]
+            chars.append(("", letter, letter))
+    return chars
+
+
+def fill_name(img, name_grid, rng):
+    """
+    Mark a random surname and first name on the name grid
+    :return: expected decoded name
+    """
+    n_cols = name_grid.shape[1]
+    half = n_cols // 2
+    parts = []
+    for start in (0, half):
+        chars = random_name_part(rng, min(10, half - 1))
+        for offset, (accent, letter, _) in enumerate(chars):
+            col = start + offset
+            draw_mark(img, name_grid[len(ACCENTS) + LETTERS.index(letter), col], rng)
+            if accent:
+                draw_mark(img, name_grid[ACCENTS.index(accent), col], rng)
+        parts.append("".join(c for _, _, c in chars))
+    return " ".join(parts)
+
+
+def fill_answers(img, questions, rng, p_blank=0.03, p_multi=0.01, p_partial=0.05, p_erased=0.05):
+    """
+    Mark random answers on the question grid
+    :return: list of 200 answers ("" = blank, several letters = multiple marks) and the 800 filled flags
+    """
+    answers = []
+    filled = np.zeros((NB_QUESTIONS, 4), dtype=bool)
+    for q in range(NB_QUESTIONS):
+        r = rng.random()
+        if r < p_blank:
+            chosen = []
+        elif r < p_blank + p_multi:
+            chosen = sorted(rng.choice(4, size=2, replace=False).tolist())
+        else:
+            chosen = [int(rng.integers(4))]
+
+        for c in chosen:
+            draw_mark(img, questions[q, c], rng, "partial" if rng.random() < p_partial else "full")
+            filled[q, c] = True
+
+        # trace gommée sur une autre case
+        if rng.random() < p_erased:
+            others = [c for c in range(4) if c not in chosen]
+            draw_mark(img, questions[q, others[rng.integers(len(others))]], rng, "erased")
+
+        answers.append("".join(CHOICES[c] for c in chosen))
+    return answers, filled.ravel().tolist()
+
+
+# === DÉGRADATIONS ===
+
+def distort(img, rng, max_angle=3.0, max_skew=0.015, noise_sigma=6.0):
+    """
+    Apply rotation, perspective skew, blur and scanner noise
+    """
+    h, w = img.shape[:2]
+    corners = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    jitter = rng.uniform(-max_skew, max_skew, (4, 2)) * [w, h]
+    P = cv2.getPerspectiveTransform(corners, (corners + jitter).astype(np.float32))
+    R = np.vstack([cv2.getRotationMatrix2D((w / 2, h / 2), float(rng.uniform(-max_angle, max_angle)), 1.0),
+                   [0, 0, 1]])
+    out = cv2.warpPerspective(img, R @ P, (w, h), borderValue=(255, 255, 255))
+
+    if rng.random() < 0.5:
+        out = cv2.GaussianBlur(out, (3, 3), 0)
+
+    noise = rng.normal(0, noise_sigma, out.shape[:2])[..., None]
+    return np.clip(out.astype(np.float32) + noise, 0, 255).astype(np.uint8)
+
+
+# === GÉNÉRATION ===
+
+def generate(output_dir, count, seed=0, sheet_paths=None, max_angle=3.0, max_skew=0.015, noise_sigma=6.0):
+    """
+    Generate `count` synthetic sheets in output_dir with ground_truth.jsonl and answer_key.csv
+    :param max_angle, max_skew, noise_sigma: distortion range (see distort), raised to sweep
+                                            the pre-filter threshold (page_filter.py calibrate)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    template = cv2.imread(TEMPLATE_PATH)
+    if template is None:
+        raise FileNotFoundError(TEMPLATE_PATH)
+    name_grid, questions = reference_layout(template)
+
+    sheets = []
+    for path in sheet_paths or SHEET_PATHS:
+        if not exists(path):
+            print(f"[WARN] Feuille introuvable : {path}")
+            continue
+        sheet = template if path == TEMPLATE_PATH else cv2.imread(path)
+        try:
+            sheets.append((os.path.basename(path), sheet,
+                           map_layout(name_grid, sheet, template),
+                           map_layout(questions, sheet, template)))
+        except ValueError as e:
+            print(f"[WARN] {path} ignorée : {e}")
+
+    if not sheets:
+        raise RuntimeError("Aucune feuille de base utilisable")
+
+    key = [CHOICES[i] for i in rng.integers(4, size=NB_QUESTIONS)]
+    with open(join(output_dir, "answer_key.csv"), "w") as f:
+        f.write("\n".join(f"{i},{c}" for i, c in enumerate(key, 1)))
+
+    with open(join(output_dir, "ground_truth.jsonl"), "w") as gt:
+        for i in range(count):
+            sheet_name, sheet, sheet_name_grid, sheet_questions = sheets[i % len(sheets)]
+            img = sheet.copy()
+            name = fill_name(img, sheet_name_grid, rng)
+            answers, filled = fill_answers(img, sheet_questions, rng)
+            img = distort(img, rng, max_angle, max_skew, noise_sigma)
+
+            fname = f"sheet_{i + 1:05d}.jpg"
+            quality = int(rng.integers(35, 95))
+            cv2.imwrite(join(output_dir, fname), img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+
+            gt.write(json.dumps({
+                "file": fname,
+                "sheet": sheet_name,
+                "jpeg_quality": quality,
+                "name": name,
+                "answers": answers,
+                "filled": filled,
+            }, ensure_ascii=False) + "\n")
+
+            if (i + 1) % 100 == 0:
+                print(f"[INFO] {i + 1}/{count} feuilles générées")
+
+    print(f"[INFO] {count} feuilles synthétiques dans {output_dir}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Génère des copies synthétiques avec vérité terrain")
+    parser.add_argument("output_dir")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-angle", type=float, default=3.0, help="rotation max (degrés)")
+    parser.add_argument("--max-skew", type=float, default=0.015, help="déplacement max des coins (part de la page)")
+    parser.add_argument("--noise", type=float, default=6.0, help="écart-type du bruit de scanner")
+    args = parser.parse_args()
+    generate(args.output_dir, args.count, args.seed, max_angle=args.max_angle, max_skew=args.max_skew,
+             noise_sigma=args.noise)
@@ -0,0 +1,201 @@
+# templates.py
+"""
+Registry of the answer-sheet templates (sheet revisions).
+
+Each template is described in resources/templates/templates.json by its image,
+its block rectangles (y0, y1, x0, x1) and its bubble layout. Its SIFT features
+are computed once and cached on disk; a 256-bit difference hash of the page
+is used to pick the right template before the expensive alignment runs.
+"""
+import json
+import os
+import threading
+from os.path import exists, getmtime, join
+
+import cv2
+import numpy as np
+
+from alignment import NAME_BLOCK, QUESTION_BLOCK, sift_features, to_gray
+from constants import TEMPLATES_DIR
+
+MANIFEST = "templates.json"
+HASH_SIZE = 16
+# seuils en bits différents sur 256, calibrés avec python page_filter.py calibrate
+# (resources/templates/hash_calibration.json) : jusqu'à MAX_HASH_DISTANCE la page est une
+# feuille ; au-delà de FOREIGN_HASH_DISTANCE, un autre document rejeté sur la vignette ;
+# entre les deux, l'alignement tranche
+MAX_HASH_DISTANCE = 74
+FOREIGN_HASH_DISTANCE = 92
+# empreintes du modèle tourné : un scan de travers ne s'éloigne pas de sa feuille
+HASH_ANGLES = (-8, -6, -4, -2, 0, 2, 4, 6, 8)
+
+DEFAULT_LAYOUT = {"name_rows": 35, "question_rows": 25, "question_cols": 8, "choices": 4}
+DEFAULT_MANIFEST = [{
+    "id": "toeic_v1",
+    "image": "Answer_sheet.jpg",
+    "name_block": list(NAME_BLOCK),
+    "question_block": list(QUESTION_BLOCK),
+    "layout": DEFAULT_LAYOUT,
+}]
+
+
+def page_hash(gray):
+    """
+    Difference hash of a page: sign of the horizontal gradient of a 17x16 thumbnail (256 bits)
+    """
+    small = cv2.resize(gray, (HASH_SIZE + 1, HASH_SIZE), interpolation=cv2.INTER_AREA)
+    return np.packbits(small[:, 1:] > small[:, :-1])
+
+
+def hash_distance(a, b):
+    return int(np.unpackbits(np.bitwise_xor(a, b)).sum())
+
+
+def rotated_hashes(gray, angles=HASH_ANGLES):
+    """
+    Difference hashes of an image rotated by each angle (degrees), computed on a 1/8 thumbnail
+    """
+    small = cv2.resize(gray, None, fx=1 / 8, fy=1 / 8, interpolation=cv2.INTER_AREA)
+    h, w = small.shape[:2]
+    paper = int(np.median(small))
+    hashes = []
+    for angle in angles:
+        M = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+        hashes.append(page_hash(cv2.warpAffine(small, M, (w, h), borderValue=paper)))
+    return hashes
+
+
+class Template:
+    """
+    One sheet revision: image, block rectangles, bubble layout and descriptors
+    """
+
+    def __init__(self, template_id, gray, name_block, question_block, layout, image_path=None):
+        self.id = template_id
+        self.gray = gray
+        self.image_path = image_path
+        self.name_block = tuple(name_block)
+        self.question_block = tuple(question_block)
+        self.layout = {**DEFAULT_LAYOUT, **(layout or {})}
+        self.descriptor = page_hash(gray)
+        self.descriptors = rotated_hashes(gray)
+        self._features = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self):
+        return self.gray.shape[:2]
+
+    def features(self):
+        """
+        SIFT points and descriptors of the template, computed once (cached next to the image)
+        """
+        if self._features is None:
+            with self._lock:
+                if self._features is None:
+                    self._features = self._load_or_compute_features()
+        return self._features
+
+    def _load_or_compute_features(self):
+        cache_path = None
+        if self.image_path:
+            cache_dir = join(os.path.dirname(self.image_path), ".cache")
+            cache_path = join(cache_dir, f"{self.id}.features.npz")
+            if exists(cache_path) and getmtime(cache_path) >= getmtime(self.image_path):
+                try:
+                    data = np.load(cache_path)
+                    return data["points"], data["descriptors"]
+                except Exception as e:
+                    print(f"[WARN] Cache de points du modèle {self.id} illisible : {e}")
+
+        points, descriptors = sift_features(self.gray)
+        if cache_path and descriptors is not None:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                np.savez(cache_path, points=points, descriptors=descriptors)
+            except Exception as e:
+                print(f"[WARN] Cache de points du modèle {self.id} non enregistré : {e}")
+        return points, descriptors
+
+
+class TemplateRegistry:
+    def __init__(self, templates=()):
+        self.templates = list(templates)
+
+    def __len__(self):
+        return len(self.templates)
+
+    @classmethod
+    def load(cls, templates_dir=TEMPLATES_DIR):
+        """
+        Templates listed in the manifest of templates_dir (built-in manifest if absent)
+        """
+        manifest_path = join(templates_dir, MANIFEST)
+        entries = DEFAULT_MANIFEST
+        if exists(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+
+        templates = []
+        for entry in entries:
+            path = join(templates_dir, entry["image"])
+            gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                print(f"[WARN] Modèle {entry['id']} introuvable : {path}")
+                continue
+            templates.append(Template(entry["id"], gray,
+                                      entry.get("name_block", NAME_BLOCK),
+                                      entry.get("question_block", QUESTION_BLOCK),
+                                      entry.get("layout"), path))
+        return cls(templates)
+
+    @classmethod
+    def from_image(cls, img, template_id="template"):
+        """
+        Registry holding a single template image with the default blocks
+        """
+        return cls([Template(template_id, to_gray(img), NAME_BLOCK, QUESTION_BLOCK, DEFAULT_LAYOUT)])
+
+    def get(self, template_id):
+        return next((t for t in self.templates if t.id == template_id), None)
+
+    def nearest(self, gray_page):
+        """
+        Nearest template of a page (any resolution) by difference hash, the distance being
+        the smallest over the template's rotated hashes (HASH_ANGLES)
+        :return: (template, distance), (None, None) for an empty registry
+        """
+        if not self.templates:
+            return None, None
+        descriptor = page_hash(gray_page)
+        distances = [min(hash_distance(descriptor, d) for d in t.descriptors) for t in self.templates]
+        best = int(np.argmin(distances))
+        return self.templates[best], distances[best]
+
+    def match(self, gray_page, max_distance=MAX_HASH_DISTANCE, foreign_distance=FOREIGN_HASH_DISTANCE):
+        """
+        Nearest template of a page, None beyond foreign_distance; between max_distance and
+        foreign_distance it is returned with a warning (the alignment decides)
+        """
+        template, distance = self.nearest(gray_page)
+        if template is None or distance > foreign_distance:
+            return None, distance
+        if distance > max_distance:
+            print(f"[WARN] Page éloignée de tous les modèles (écart {distance} > {max_distance}), "
+                  f"{template.id} essayé")
+        return template, distance
+
+
+_default_registry = None
+_registry_lock = threading.Lock()
+
+
+def default_registry():
+    """
+    Registry of resources/templates, loaded once
+    """
+    global _default_registry
+    with _registry_lock:
+        if _default_registry is None:
+            _default_registry = TemplateRegistry.load()
+    return _default_registry
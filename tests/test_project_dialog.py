@@ -0,0 +1,25 @@
+import os
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PySide6.QtWidgets")
+pytest.importorskip("cv2")
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_skipped_page_is_listed_in_a_fresh_dialog(app, tmp_path):
+    from project_dialog import ProjectDialog
+
+    dialog = ProjectDialog("demo", str(tmp_path))
+    try:
+        dialog.on_page_skipped({"file": "page_1.jpg", "status": "blank"})
+        assert len(dialog.skipped_pages) == 1
+        assert "Pages ignorées (1)" in dialog.stats_display.toPlainText()
+        assert "page_1.jpg" in dialog.stats_display.toPlainText()
+    finally:
+        dialog.done(0)
@@ -0,0 +1,191 @@
+# tiled_viewer.py
+import itertools
+import os
+from collections import OrderedDict
+from os.path import basename, dirname, exists, getmtime, join
+
+import cv2
+from PySide6 import QtCore, QtGui, QtWidgets
+
+TILE_SIZE = 512
+PREVIEW_MAX_SIDE = 1200
+PREVIEW_DIR = ".previews"
+
+
+def ndarray_to_qimage(img):
+    """
+    Converts an OpenCV image (gray or BGR) to a QImage owning its data
+    """
+    h, w = img.shape[:2]
+    fmt = QtGui.QImage.Format_Grayscale8 if img.ndim == 2 else QtGui.QImage.Format_BGR888
+    # copie : le QImage ne possède pas le buffer numpy
+    return QtGui.QImage(img.data, w, h, img.strides[0], fmt).copy()
+
+
+class TileCache:
+    """
+    LRU of decoded tiles shared by all viewers, bounded by a memory budget
+    """
+
+    def __init__(self, budget_bytes=192 * 1024 * 1024):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.tiles = OrderedDict()
+
+    def get(self, key):
+        tile = self.tiles.get(key)
+        if tile is not None:
+            self.tiles.move_to_end(key)
+        return tile
+
+    def put(self, key, tile):
+        if key in self.tiles:
+            self.used_bytes -= self.tiles.pop(key).sizeInBytes()
+        self.tiles[key] = tile
+        self.used_bytes += tile.sizeInBytes()
+        while self.used_bytes > self.budget_bytes and len(self.tiles) > 1:
+            _, old = self.tiles.popitem(last=False)
+            self.used_bytes -= old.sizeInBytes()
+
+
+tile_cache = TileCache()
+
+
+class FileImageSource:
+    """
+    Image file decoded lazily: a downscaled preview (cached on disk next to the
+    artifact) and full-resolution regions read through QImageReader.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        reader = QtGui.QImageReader(path)
+        if not reader.canRead():
+            raise ValueError(f"Impossible d'ouvrir l'image : {path}")
+        self.size = reader.size()
+        self.key = (path, getmtime(path))
+
+    def preview_path(self):
+        return join(dirname(self.path), PREVIEW_DIR, basename(self.path) + ".preview.jpg")
+
+    def preview(self):
+        path = self.preview_path()
+        if exists(path) and getmtime(path) >= self.key[1]:
+            image = QtGui.QImage(path)
+            if not image.isNull():
+                return image
+
+        reader = QtGui.QImageReader(self.path)
+        scaled = self.size.scaled(PREVIEW_MAX_SIDE, PREVIEW_MAX_SIDE, QtCore.Qt.KeepAspectRatio)
+        if scaled.width() < self.size.width():
+            # le décodeur JPEG réduit directement à la lecture
+            reader.setScaledSize(scaled)
+        image = reader.read()
+        try:
+            os.makedirs(dirname(path), exist_ok=True)
+            image.save(path, "JPG", 85)
+        except Exception as e:
+            print(f"[WARN] Aperçu non enregistré : {e}")
+        return image
+
+    def tile(self, rect):
+        reader = QtGui.QImageReader(self.path)
+        reader.setClipRect(rect)
+        return reader.read()
+
+
+class ArrayImageSource:
+    """
+    In-memory image (e.g. a rendered overlay) exposed like a file source
+    """
+    _ids = itertools.count()
+
+    def __init__(self, img):
+        self.img = img
+        self.size = QtCore.QSize(img.shape[1], img.shape[0])
+        self.key = ("array", next(self._ids))
+        self._preview = None
+
+    def preview(self):
+        if self._preview is None:
+            h, w = self.img.shape[:2]
+            ratio = min(1.0, PREVIEW_MAX_SIDE / max(h, w))
+            small = cv2.resize(self.img, (max(1, int(w * ratio)), max(1, int(h * ratio))),
+                               interpolation=cv2.INTER_AREA) if ratio < 1.0 else self.img
+            self._preview = ndarray_to_qimage(small)
+        return self._preview
+
+    def tile(self, rect):
+        return ndarray_to_qimage(self.img[rect.top():rect.bottom() + 1, rect.left():rect.right() + 1])
+
+
+class TiledImageView(QtWidgets.QGraphicsView):
+    """
+    Shows the preview of an image first, then full-resolution tiles of the
+    visible region once the zoom exceeds the preview resolution.
+    """
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.setScene(QtWidgets.QGraphicsScene(self))
+        self.setTransformationAnchor(QtWidgets.QGraphicsView.AnchorUnderMouse)
+        self.setRenderHint(QtGui.QPainter.SmoothPixmapTransform)
+        self.tile_items = {}
+
+        preview = source.preview()
+        self.preview_scale = source.size.width() / max(1, preview.width())
+        self.preview_item = self.scene().addPixmap(QtGui.QPixmap.fromImage(preview))
+        self.preview_item.setScale(self.preview_scale)
+        self.preview_item.setTransformationMode(QtCore.Qt.SmoothTransformation)
+        self.preview_item.setZValue(-2)
+        self.scene().setSceneRect(0, 0, source.size.width(), source.size.height())
+
+        self.horizontalScrollBar().valueChanged.connect(self.update_tiles)
+        self.verticalScrollBar().valueChanged.connect(self.update_tiles)
+
+    def wheelEvent(self, event):
+        factor = 1.25 if event.angleDelta().y() > 0 else 0.8
+        self.scale(factor, factor)
+        self.update_tiles()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_tiles()
+
+    def update_tiles(self):
+        """
+        Load the full-resolution tiles covering the viewport when the preview is too coarse
+        """
+        zoom = self.transform().m11()
+        if zoom * self.preview_scale <= 1.0:
+            for item in self.tile_items.values():
+                self.scene().removeItem(item)
+            self.tile_items.clear()
+            return
+
+        visible = self.mapToScene(self.viewport().rect()).boundingRect().toAlignedRect()
+        visible = visible.intersected(QtCore.QRect(QtCore.QPoint(0, 0), self.source.size))
+        if visible.isEmpty():
+            return
+
+        wanted = set()
+        for ty in range(visible.top() // TILE_SIZE, visible.bottom() // TILE_SIZE + 1):
+            for tx in range(visible.left() // TILE_SIZE, visible.right() // TILE_SIZE + 1):
+                wanted.add((tx, ty))
+                if (tx, ty) in self.tile_items:
+                    continue
+                key = (self.source.key, tx, ty)
+                tile = tile_cache.get(key)
+                if tile is None:
+                    rect = QtCore.QRect(tx * TILE_SIZE, ty * TILE_SIZE, TILE_SIZE, TILE_SIZE)
+                    tile = self.source.tile(rect.intersected(QtCore.QRect(QtCore.QPoint(0, 0), self.source.size)))
+                    tile_cache.put(key, tile)
+                item = self.scene().addPixmap(QtGui.QPixmap.fromImage(tile))
+                item.setPos(tx * TILE_SIZE, ty * TILE_SIZE)
+                item.setZValue(-1)
+                self.tile_items[(tx, ty)] = item
+
+        for pos in list(self.tile_items):
+            if pos not in wanted:
+                self.scene().removeItem(self.tile_items.pop(pos))
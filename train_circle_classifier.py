@@ -1,3 +1,4 @@
+import argparse
 import random
 from collections import defaultdict
 
@@ -10,12 +11,15 @@ import joblib
 
 import os
 import cv2
-import pytesseract
-from tqdm import tqdm
+
+from circle_classifier import load_model_meta, save_model_meta
+from patch_features import FEATURE_SETS, compute_features, extract_patches, inference_us, inner_disk_stats
+from ocr_cache import ocr_patches
+from patch_store import PatchStore
 
 
 # === EXTRACTION DES CASES (patch) ===
-def save_patch(img, center, label, output_dir='dataset_patches', size=30):
+def save_patch(img, center, label, output_dir='dataset_patches', size=30, sheet="sheet"):
     x, y = center
     r = size // 2
     patch = img[y - r:y + r, x - r:x + r]
@@ -24,13 +28,22 @@ def save_patch(img, center, label, output_dir='dataset_patches', size=30):
     label_dir = 'filled' if label else 'empty'
     out_dir = os.path.join(output_dir, label_dir)
     os.makedirs(out_dir, exist_ok=True)
-    filename = f"{label_dir}_{x}_{y}.png"
+    # le nom de la feuille évite que les patchs de deux copies s'écrasent
+    filename = f"{label_dir}_{sheet}_{x}_{y}.png"
     cv2.imwrite(os.path.join(out_dir, filename), patch)
 
 
-def extract_patches_from_image(img_gray, centers, labels, output_dir):
+def extract_patches_from_image(img_gray, centers, labels, output_dir=None, sheet="sheet", store=None):
+    """
+    Save the labelled patches of a block, in a PatchStore when given (PNG folders otherwise)
+    """
+    if store is not None:
+        patches, valid = extract_patches(img_gray, centers)
+        labels = np.asarray(labels, dtype=np.int8)
+        positions = np.asarray(centers, dtype=int).reshape(-1, 2)
+        return store.append(patches[valid], labels[valid], sheet=sheet, positions=positions[valid], source="extract")
     for (x, y), is_filled in zip(centers, labels):
-        save_patch(img_gray, (x, y), is_filled, output_dir=output_dir)
+        save_patch(img_gray, (x, y), is_filled, output_dir=output_dir, sheet=sheet)
 
 
 # === CHARGEMENT + ÉQUILIBRAGE DU DATASET ===
@@ -71,96 +84,228 @@ def load_balanced_dataset(base_path='dataset_patches', size=(30, 30), empty_mult
     return train_test_split(X_all, y_all, test_size=0.2, random_state=42)
 
 
-def predict_filled_patch(patch_30x30, model):
+def load_store_dataset(store_path='patch_store', empty_multiplier=None, test_size=0.2, random_state=42):
+    """
+    Train / test split read from a PatchStore (one memory map, duplicates removed).
+    With empty_multiplier, empty patches are sampled down to that multiple of the filled ones.
+    """
+    store = PatchStore(store_path)
+    ratio = {0: empty_multiplier} if empty_multiplier else None
+    indices = store.sample(ratio=ratio, by="sheet", seed=random_state)
+    X, y = store.arrays(indices)
+    print(f"[INFO] Base {store_path} : {np.sum(y == 1)} remplis — {np.sum(y == 0)} vides")
+    return train_test_split(X, y, test_size=test_size, random_state=random_state, stratify=y)
+
+
+def predict_filled_patch(patch_30x30, model, features="raw"):
     """
     Prend un patch numpy (30x30, en niveaux de gris) et prédit s'il est rempli.
     Retourne un booléen : True = rempli, False = vide
     """
     if patch_30x30.shape != (30, 30):
         raise ValueError("Le patch doit être en 30x30 pixels")
-    flat = patch_30x30.flatten().reshape(1, -1)
-    return model.predict(flat)[0] == 1
+    return model.predict(compute_features(patch_30x30[None], features))[0] == 1
 
 
 # === ENTRAÎNEMENT ===
 
-def train_random_forest(X_train, y_train, X_test, y_test, output_model='circle_patch_classifier.joblib'):
+def fit_random_forest(X_train, y_train, X_test, y_test, features="raw"):
+    """
+    Fit the forest on the given feature set (see patch_features.FEATURE_SETS)
+    :return: model, test accuracy, inference time per patch (µs, by page batches)
+    """
     model = RandomForestClassifier(n_estimators=100, class_weight='balanced', random_state=42)
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-
-    print("\n=== Évaluation ===")
+    model.fit(compute_features(X_train, features), y_train)
+    y_pred = model.predict(compute_features(X_test, features))
+    print(f"\n=== Évaluation ({features}) ===")
     print(classification_report(y_test, y_pred, digits=3))
+    return model, float((y_pred == y_test).mean()), inference_us(model, X_test.reshape(-1, 30, 30), features)
+
+
+def train_random_forest(X_train, y_train, X_test, y_test, output_model='circle_patch_classifier.joblib',
+                        features="raw", baseline=True):
+    """
+    Train, save the model and its feature set; with baseline, also fit the raw-pixel
+    forest on the same split and report the accuracy and inference-time deltas
+    """
+    model, acc, us = fit_random_forest(X_train, y_train, X_test, y_test, features)
+    meta = load_model_meta(output_model)
+    for key in ("candidate", "selection", "baseline_raw"):
+        meta.pop(key, None)
+    meta["features"] = features
+    meta["holdout_accuracy"] = round(acc, 5)
+    meta["inference_us_per_patch"] = round(us, 3)
+    if baseline and features != "raw":
+        _, raw_acc, raw_us = fit_random_forest(X_train, y_train, X_test, y_test, "raw")
+        meta["baseline_raw"] = {"holdout_accuracy": round(raw_acc, 5), "inference_us_per_patch": round(raw_us, 3)}
+        print(f"[INFO] {features} vs raw : exactitude {acc:.4f} / {raw_acc:.4f} ({acc - raw_acc:+.4f}), "
+              f"inférence {us:.2f} / {raw_us:.2f} µs par patch ({us - raw_us:+.2f})")
+
     joblib.dump(model, output_model)
-    print(f"[✔] Modèle sauvegardé dans : {output_model}")
+    meta["version"] = int(meta.get("version", 1)) + 1
+    meta["n_estimators"] = model.n_estimators
+    save_model_meta(meta, output_model)
+    print(f"[✔] Modèle sauvegardé dans : {output_model} (version {meta['version']}, caractéristiques {features})")
+
+
+def incremental_train(review_store, base_store, model_file='circle_patch_classifier.joblib',
+                      new_trees=20, holdout_size=0.2, replay_ratio=1.0, base_holdout=2000,
+                      base_calibration=20000, max_regression=0.001, random_state=42):
+    """
+    Grow new trees on the patches corrected in manual review (warm-started forest).
+    The model is replaced only if it keeps its accuracy (within max_regression) on a
+    held-out sample of the base dataset and does at least as well on held-out corrections;
+    the cascade is then recalibrated on a sample of the base dataset.
+    :param review_store: PatchStore of review corrections (see review_harvest.py)
+    :param base_store: PatchStore of the original dataset (held-out reference, replay and calibration)
+    :param replay_ratio: base patches added per review patch
+    :return: True if the model was replaced
+    """
+    if not base_store:
+        print("[INFO] Base de patchs d'origine requise : sans elle, rien ne garantit que le nouveau "
+              "modèle reste bon hors des corrections, modèle conservé")
+        return False
+    store = PatchStore(review_store)
+    X_new, y_new = store.arrays(store.unique_indices())
+    # le découpage stratifié demande au moins 2 exemples de chaque classe (rempli et vide)
+    counts = np.bincount(y_new, minlength=2)
+    if len(X_new) < 10 or counts[:2].min() < 2:
+        print(f"[INFO] Pas assez de corrections pour un réentraînement incrémental "
+              f"({counts[1]} remplies, {counts[0]} vides)")
+        return False
+    X_train, X_hold, y_train, y_hold = train_test_split(X_new, y_new, test_size=holdout_size,
+                                                        random_state=random_state, stratify=y_new)
+
+    # base d'origine : un échantillon tenu à l'écart (jamais vu par les nouveaux arbres), le reste
+    # sert au rejeu des anciens cas et à la calibration de la cascade
+    base = PatchStore(base_store)
+    rng = np.random.default_rng(random_state)
+    indices = rng.permutation(base.unique_indices())
+    n_hold = min(base_holdout, len(indices) // 2)
+    if n_hold == 0:
+        print("[INFO] Base de patchs d'origine vide, modèle conservé")
+        return False
+    rest = indices[n_hold:]
+    n_replay = min(len(rest), int(len(X_new) * replay_ratio))
+    Xb_hold, yb_hold = base.arrays(np.sort(indices[:n_hold]))
+    Xb_replay, yb_replay = base.arrays(np.sort(rest[:n_replay]))
+    X_train, y_train = np.concatenate([X_train, Xb_replay]), np.concatenate([y_train, yb_replay])
+
+    features = load_model_meta(model_file)["features"]
+    F_train = compute_features(X_train, features)
+    F_hold, Fb_hold = compute_features(X_hold, features), compute_features(Xb_hold, features)
+    old_model = joblib.load(model_file)
+    old_acc = float((old_model.predict(Fb_hold) == yb_hold).mean())
+    old_review = float((old_model.predict(F_hold) == y_hold).mean())
+
+    if not hasattr(old_model, "n_estimators"):
+        print("[INFO] Le modèle actuel n'est pas une forêt : réentraînement incrémental impossible")
+        return False
+
+    # warm start : les arbres existants sont gardés, seuls new_trees arbres sont ajustés sur les cas récents
+    model = joblib.load(model_file)
+    model.set_params(warm_start=True, n_estimators=model.n_estimators + new_trees)
+    model.fit(F_train, y_train)
+    model.set_params(warm_start=False)
+    new_acc = float((model.predict(Fb_hold) == yb_hold).mean())
+    new_review = float((model.predict(F_hold) == y_hold).mean())
+
+    print(f"[INFO] Validation base d'origine ({len(yb_hold)} patchs) : ancien modèle {old_acc:.4f} — "
+          f"nouveau modèle {new_acc:.4f}")
+    print(f"[INFO] Validation corrections ({len(y_hold)} patchs) : ancien modèle {old_review:.4f} — "
+          f"nouveau modèle {new_review:.4f}")
+    if new_acc < old_acc - max_regression or new_review < old_review:
+        print("[INFO] Nouveau modèle moins bon, circle_patch_classifier.joblib conservé")
+        return False
+
+    tmp_file = model_file + ".tmp"
+    joblib.dump(model, tmp_file)
+    os.replace(tmp_file, model_file)
+
+    meta = load_model_meta(model_file)
+    meta["version"] = int(meta.get("version", 1)) + 1
+    meta["n_estimators"] = model.n_estimators
+    meta["holdout_accuracy"] = round(new_acc, 5)
+    meta["review_holdout_accuracy"] = round(new_review, 5)
+    save_model_meta(meta, model_file)
+    print(f"[✔] Modèle mis à jour (version {meta['version']}, {model.n_estimators} arbres)")
+
+    # les seuils de la cascade dépendent du modèle, et de la distribution réelle des cases :
+    # calibrés sur la base d'origine, pas sur les seules corrections (cas difficiles)
+    X_cal, _ = base.arrays(np.sort(rest[:base_calibration]))
+    calibrate_cascade(model, X_cal, model_file=model_file)
+    return True
+
+
+def load_patch_folder(input_dir, patch_size=(30, 30)):
+    """
+    (file name, patch) of every PNG patch of a folder
+    """
+    patches = []
+    for fname in sorted(f for f in os.listdir(input_dir) if f.lower().endswith(".png")):
+        img = cv2.imread(os.path.join(input_dir, fname), cv2.IMREAD_GRAYSCALE)
+        if img is not None and img.shape == patch_size:
+            patches.append((fname, img))
+    return patches
 
 
 def filter_empty_patches_by_ocr(input_dir='dataset_patches/empty',
                                 output_dir='dataset_patches/empty_with_text',
                                 patch_size=(30, 30),
-                                lang='fra'):
+                                lang='fra',
+                                cache_path='dataset_patches/ocr_cache.sqlite',
+                                workers=None):
     """
     Filtre les patchs `empty/` contenant un caractère détecté (lettre, symbole, accent, etc.)
     grâce à Tesseract OCR avec la langue `fra`.
     Copie les patchs détectés dans `output_dir`.
+    L'OCR est fait en parallèle et mis en cache (voir ocr_cache.py).
     """
     os.makedirs(output_dir, exist_ok=True)
 
-    files = [f for f in os.listdir(input_dir) if f.lower().endswith(".png")]
+    patches = load_patch_folder(input_dir, patch_size)
+    texts = ocr_patches([img for _, img in patches], cache_path, lang=lang, workers=workers)
     kept = 0
 
-    for fname in tqdm(files, desc="OCR filtering"):
-        path = os.path.join(input_dir, fname)
-        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-
-        if img is None or img.shape != patch_size:
-            continue
-
-        # Config OCR : mode caractère unique, langue française (accents, symboles...)
-        config = '--psm 10'
-        try:
-            text = pytesseract.image_to_string(img, config=config, lang=lang).strip()
-        except pytesseract.TesseractError as e:
-            print(f"[ERROR] OCR failed on {fname} : {e}")
-            continue
-
+    for (fname, img), text in zip(patches, texts):
         if text:  # au moins un caractère reconnu
             cv2.imwrite(os.path.join(output_dir, fname), img)
             kept += 1
 
-    print(f"[INFO] {kept} patchs conservés sur {len(files)} (avec au moins un caractère OCR détecté)")
+    print(f"[INFO] {kept} patchs conservés sur {len(patches)} (avec au moins un caractère OCR détecté)")
 
 
 def balance_patch_by_ocr_char(input_dir='dataset_patches/empty',
                               output_dir='dataset_patches/empty_balanced_chars',
                               patch_size=(30, 30),
                               lang='fra',
-                              max_chars=35):
+                              max_chars=35,
+                              cache_path='dataset_patches/ocr_cache.sqlite',
+                              workers=None):
     """
     Équilibre les patchs OCR par caractère détecté : autant de W que de Ç, etc.
+    Seuls les max_chars caractères les plus fréquents sont gardés.
     Conserve les noms de fichiers originaux (pour compatibilité Windows).
+    Les résultats OCR viennent du cache partagé avec filter_empty_patches_by_ocr.
     """
     os.makedirs(output_dir, exist_ok=True)
     char_to_patches = defaultdict(list)
 
-    files = [f for f in os.listdir(input_dir) if f.lower().endswith(".png")]
-
-    for fname in tqdm(files, desc="OCR character grouping"):
-        path = os.path.join(input_dir, fname)
-        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-        if img is None or img.shape != patch_size:
-            continue
-
-        config = '--psm 10'
-        try:
-            text = pytesseract.image_to_string(img, config=config, lang=lang).strip()
-        except pytesseract.TesseractError:
-            continue
+    patches = load_patch_folder(input_dir, patch_size)
+    texts = ocr_patches([img for _, img in patches], cache_path, lang=lang, workers=workers)
 
-        if len(text) == 1:
+    for (fname, img), text in zip(patches, texts):
+        if text and len(text) == 1:
             char = text.upper()
             char_to_patches[char].append((fname, img))
 
+    if not char_to_patches:
+        print("[INFO] Aucun caractère reconnu, rien à équilibrer")
+        return
+    if max_chars and len(char_to_patches) > max_chars:
+        most_common = sorted(char_to_patches, key=lambda c: len(char_to_patches[c]), reverse=True)[:max_chars]
+        char_to_patches = {c: char_to_patches[c] for c in most_common}
+
     # Nombre cible par caractère
     total_available_chars = len(char_to_patches)
     total_patches = sum(len(v) for v in char_to_patches.values())
@@ -234,35 +379,105 @@ def classify_question_by_difference(proba_list, min_margin=0.20):
         return [False] * 4  # aucun choix, trop serré
 
 
-def filter_relative_winner(scores, margin=0.2, question_number=None, parent=None):
-    if len(scores) != 4:
-        raise ValueError("Chaque question doit avoir exactement 4 scores")
-
-    max_idx = int(np.argmax(scores))
-    max_val = scores[max_idx]
-    others = [s for i, s in enumerate(scores) if i != max_idx]
+# === CALIBRATION DE LA CASCADE ===
 
-    if all(max_val - o > margin for o in others):
-        return [i == max_idx for i in range(4)]
+def calibrate_cascade(model, X, target_agreement=0.999, model_file='circle_patch_classifier.joblib'):
+    """
+    Chooses the dark-ratio thresholds under which (resp. above which) a patch is
+    declared empty (resp. filled) without the model, keeping the agreement with
+    the model at or above target_agreement on the given patches. The error
+    budget is split between both sides, and the thresholds are written to the
+    sidecar JSON of the model.
+    """
+    patches = np.asarray(X).reshape(-1, 30, 30)
+    _, dark = inner_disk_stats(patches)
+    features = compute_features(patches, load_model_meta(model_file)["features"])
+    labels = model.predict_proba(features)[:, 1] > 0.5
+    n = len(patches)
+    budget = int(np.floor((1 - target_agreement) * n))
+
+    order = np.argsort(dark, kind="stable")
+    d, lab = dark[order], labels[order]
+    cum_filled = np.cumsum(lab)      # modèle "rempli" parmi les k plus clairs
+    cum_empty = np.cumsum(~lab)
+    values = np.unique(d)
+
+    # côté vide : plus grand seuil v tel que #(remplis selon le modèle, dark <= v) <= budget / 2
+    last = np.searchsorted(d, values, side="right") - 1
+    err_empty = cum_filled[last]
+    ok = np.flatnonzero(err_empty <= budget // 2)
+    empty_max = float(values[ok[-1]]) if ok.size else None
+
+    # côté rempli : plus petit seuil v tel que #(vides selon le modèle, dark >= v) <= reste du budget
+    first = np.searchsorted(d, values, side="left")
+    err_filled = cum_empty[-1] - np.where(first > 0, cum_empty[np.maximum(first - 1, 0)], 0)
+    remaining = budget - (int(err_empty[ok[-1]]) if ok.size else 0)
+    ok = np.flatnonzero((err_filled <= remaining) & (values > (empty_max if empty_max is not None else -1)))
+    filled_min = float(values[ok[0]]) if ok.size else None
+
+    empty = dark <= empty_max if empty_max is not None else np.zeros(n, dtype=bool)
+    filled = (dark >= filled_min) & ~empty if filled_min is not None else np.zeros(n, dtype=bool)
+    errors = int((empty & labels).sum() + (filled & ~labels).sum())
+    agreement = 1 - errors / n if n else 1.0
+    coverage = float((empty | filled).mean()) if n else 0.0
+
+    meta = load_model_meta(model_file)
+    meta["cascade"].update({
+        "feature": "dark_ratio",
+        "empty_max": empty_max,
+        "filled_min": filled_min,
+        "agreement": round(agreement, 6),
+        "coverage": round(coverage, 6),
+        "patches": n,
+    })
+    save_model_meta(meta, model_file)
+    print(f"[INFO] Cascade : vide si dark <= {empty_max}, rempli si dark >= {filled_min}")
+    print(f"[INFO] Accord avec le modèle {agreement:.4%} — {coverage:.1%} des patchs tranchés sans le modèle")
+    return meta["cascade"]
 
-    # si doute → on stocke
-    if parent is not None and question_number is not None:
-        parent.douteux[question_number] = scores
-    return [False] * 4
 
 # === MAIN ===
 
 if __name__ == '__main__':
-    X_train, X_test, y_train, y_test = load_strict_dataset(
-        base_path='dataset_patches',
-        filled_subfolder='filled',
-        empty_subfolder='empty_balanced_chars',
-        size=(30, 30)
-    )
+    parser = argparse.ArgumentParser(description="Entraînement du classifieur de cases")
+    parser.add_argument("--calibrate-only", action="store_true",
+                        help="recalibrer la cascade du modèle existant sans le réentraîner")
+    parser.add_argument("--target-agreement", type=float, default=0.999)
+    parser.add_argument("--store", default=None,
+                        help="base de patchs (patch_store.py) à utiliser à la place des dossiers PNG")
+    parser.add_argument("--incremental", metavar="REVIEW_STORE", default=None,
+                        help="ajouter des arbres entraînés sur les corrections de révision (projects/.training/review_patches)")
+    parser.add_argument("--new-trees", type=int, default=20)
+    parser.add_argument("--features", default="compact", choices=list(FEATURE_SETS),
+                        help="caractéristiques des patchs (raw = 900 pixels)")
+    parser.add_argument("--no-baseline", action="store_true",
+                        help="ne pas entraîner la forêt sur pixels bruts pour comparaison")
+    args = parser.parse_args()
+
+    if args.incremental:
+        if not args.store:
+            parser.error("--incremental demande --store : la base d'origine sert de référence de validation")
+        incremental_train(args.incremental, args.store, new_trees=args.new_trees)
+        raise SystemExit(0)
+
+    if args.store:
+        X_train, X_test, y_train, y_test = load_store_dataset(args.store)
+    else:
+        X_train, X_test, y_train, y_test = load_strict_dataset(
+            base_path='dataset_patches',
+            filled_subfolder='filled',
+            empty_subfolder='empty_balanced_chars',
+            size=(30, 30)
+        )
 
     # balance_patch_by_ocr_char()
 
     # X_train, X_test, y_train, y_test = load_balanced_dataset()
 
     print(f"[INFO] Nombre total d’échantillons (entraînement + test) : {len(X_train) + len(X_test)}")
-    train_random_forest(X_train, y_train, X_test, y_test)
+    if not args.calibrate_only:
+        train_random_forest(X_train, y_train, X_test, y_test, features=args.features,
+                            baseline=not args.no_baseline)
+    # les seuils dépendent du modèle : recalibrer après chaque entraînement
+    calibrate_cascade(joblib.load('circle_patch_classifier.joblib'),
+                      np.concatenate([X_train, X_test]), args.target_agreement)